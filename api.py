@@ -0,0 +1,338 @@
+"""Read-only JSON menu API for kiosks and POS terminals.
+
+A small stdlib HTTP server over the same data layer as the Streamlit pages:
+the shared compiled catalog (catalog.get_catalog) for lists and nutrition and
+db.get_recipe for full recipe documents.
+
+    GET /                     {"db", "version"}
+    GET /recipes              recipe index with nutrition; ?category= &temperature= &ok=1
+    GET /recipes/<id>         full recipe document plus "nutrition"
+    GET /ingredients          ingredients with unit and nutrition_per_unit
+    GET /nutrition            {recipe_id: {calories, sugar_g, caffeine_mg}}
+    GET /changes?since=N      documents changed after change seq N (db.changes_since);
+                              without `since`, just the current seq to start syncing from
+
+Every catalog write bumps db.catalog_version(), so a response is fully
+determined by (database, catalog version, URL). That triple (plus the content
+encoding) is the strong ETag; /changes, which also covers inventory, is keyed
+by the change sequence (db.change_seq) instead. A matching If-None-Match gets a 304 without
+building a body, and bodies are cached per version, so clients polling an
+unchanged catalog cost one version check (itself cached for a few seconds)
+and no catalog reads. A /changes page that stopped at a seq still being written
+(a gap, or a tail short of the current seq) can change without the sequence
+moving, so it is sent with no ETag and Cache-Control: no-store, and never cached. Responses are gzip- or, with the optional `brotli`
+package installed, brotli-compressed when the client accepts it.
+
+Usage:
+    python api.py                          # 127.0.0.1:8502
+    python api.py --host 0.0.0.0 --port 9000 --log
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import catalog
+import db
+from config import setting
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+MAX_AGE = int(setting("API_MAX_AGE", 5))
+MAX_CACHED = 2048
+
+
+class NotFound(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+class Volatile:
+    """A handler result that may change without its version moving: sent, never cached or ETagged."""
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+# ----------------------------
+# Resources
+# ----------------------------
+def _version_key() -> Tuple[str, int]:
+    # The version of the catalog the handlers actually serve: with snapshots on it
+    # comes from the shared version file, which db.catalog_version() can lag.
+    return db.get_db().name, catalog.get_catalog().version
+
+
+def root(query: Dict[str, str]) -> Any:
+    name, version = _version_key()
+    return {"db": name, "version": version}
+
+
+def recipes(query: Dict[str, str]) -> Any:
+    cat = catalog.get_catalog()
+    ok = query.get("ok", "").lower() in ("1", "true", "yes")
+    out = []
+    for r in cat.recipes:
+        if query.get("category") and r.category != query["category"]:
+            continue
+        if query.get("temperature") and r.temperature != query["temperature"]:
+            continue
+        if ok and not r.recipe_ok:
+            continue
+        out.append({
+            "_id": r.id, "name": r.name, "category": r.category, "temperature": r.temperature,
+            "size_ml": r.size_ml, "recipe_ok": r.recipe_ok, "season": list(r.season),
+            "nutrition": cat.nutrition(r),
+        })
+    return out
+
+
+def recipe(query: Dict[str, str], recipe_id: str) -> Any:
+    doc = db.get_recipe(recipe_id)
+    if not doc:
+        raise NotFound(f"recipe {recipe_id} not found")
+    return {**doc, "nutrition": catalog.get_catalog().nutrition_of(doc.get("composition") or [])}
+
+
+def ingredients(query: Dict[str, str]) -> Any:
+    return [
+        {"_id": i.id, "name": i.name, "unit": i.unit, "unit_ml": i.unit_ml,
+         "nutrition_per_unit": dict(zip(catalog.NUTRIENTS, i.nutrition))}
+        for i in catalog.get_catalog().ingredients
+    ]
+
+
+def nutrition(query: Dict[str, str]) -> Any:
+    cat = catalog.get_catalog()
+    return {r.id: cat.nutrition(r) for r in cat.recipes}
+
+
+def _changes_key() -> Tuple[str, int]:
+    return db.get_db().name, db.change_seq()
+
+
+def changes(query: Dict[str, str]) -> Any:
+    if "since" not in query:
+        return {"seq": db.change_seq(), "more": False, "gap": False, "changes": []}
+    try:
+        since, limit = int(query["since"]), min(int(query.get("limit", 1000)), 5000)
+    except ValueError:
+        raise BadRequest("since and limit must be integers")
+    if limit < 1:
+        raise BadRequest("limit must be at least 1")
+    result = db.changes_since(since, limit)
+    if result["gap"] or (not result["more"] and result["seq"] < db.change_seq()):
+        # Stopped short of the seq this response is keyed on (a writer has taken a
+        # seq but not inserted its row yet): caching it would pin the client there.
+        return Volatile(result)
+    return result
+
+
+# (path pattern, handler, what the response is versioned by)
+ROUTES: List[Tuple[re.Pattern, Callable[..., Any], Callable[[], Tuple[str, int]]]] = [
+    (re.compile(r"^/$"), root, _version_key),
+    (re.compile(r"^/recipes/?$"), recipes, _version_key),
+    (re.compile(r"^/recipes/(?P<recipe_id>[^/]+)$"), recipe, _version_key),
+    (re.compile(r"^/ingredients/?$"), ingredients, _version_key),
+    (re.compile(r"^/nutrition/?$"), nutrition, _version_key),
+    (re.compile(r"^/changes/?$"), changes, _changes_key),
+]
+
+
+def resolve(path: str) -> Tuple[Callable[..., Any], Dict[str, str], Callable[[], Tuple[str, int]]]:
+    for pattern, fn, version_of in ROUTES:
+        m = pattern.match(path)
+        if m:
+            return fn, {k: unquote(v) for k, v in m.groupdict().items()}, version_of
+    raise NotFound(f"no route for {path}")
+
+
+# ----------------------------
+# Versioned body cache
+# ----------------------------
+class BodyCache:
+    """JSON bodies and their compressed forms, kept per URL for its current version only."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._bodies: Dict[str, Tuple[Tuple[str, int], Dict[str, bytes]]] = {}
+
+    def peek(self, version: Tuple[str, int], url: str, encoding: str) -> Optional[bytes]:
+        """The cached body for this version and encoding (compressing a cached raw body), or None."""
+        with self._lock:
+            cached = self._bodies.get(url)
+            if cached is None or cached[0] != version:
+                return None
+            body = cached[1].get(encoding)
+            raw = cached[1].get("identity")
+        if body is None and raw is not None:
+            body = encode(raw, encoding)
+            with self._lock:
+                cached[1][encoding] = body
+        return body
+
+    def put(self, version: Tuple[str, int], url: str, encoding: str, raw: bytes) -> bytes:
+        """Cache `raw` for this version; returns it in `encoding`."""
+        body = encode(raw, encoding)
+        with self._lock:
+            cached = self._bodies.get(url)
+            if cached is None or cached[0] != version:
+                if len(self._bodies) >= MAX_CACHED:
+                    self._bodies.clear()
+                cached = self._bodies[url] = (version, {})
+            cached[1]["identity"] = raw
+            cached[1][encoding] = body
+        return body
+
+
+def encode(raw: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(raw, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    return raw
+
+
+def negotiate(accept_encoding: str) -> str:
+    """Best supported content coding the client accepts ("identity" if none)."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        m = re.search(r"q=([0-9.]+)", params)
+        if m:
+            q = float(m.group(1))
+        if name:
+            accepted[name.strip().lower()] = q
+    for coding in (("br",) if brotli else ()) + ("gzip",):
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return "identity"
+
+
+def etag_for(version: Tuple[str, int], url: str, encoding: str) -> str:
+    digest = hashlib.sha1(f"{version[0]}\0{version[1]}\0{url}".encode()).hexdigest()[:16]
+    suffix = "" if encoding == "identity" else f"-{encoding}"
+    return f'"v{version[1]}-{digest}{suffix}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+# ----------------------------
+# HTTP
+# ----------------------------
+_cache = BodyCache()
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "CafeCrunchAPI/1"
+    log_requests = False
+
+    def do_GET(self) -> None:
+        self._respond(head=False)
+
+    def do_HEAD(self) -> None:
+        self._respond(head=True)
+
+    def _respond(self, head: bool) -> None:
+        parts = urlsplit(self.path)
+        url = parts.path + (f"?{parts.query}" if parts.query else "")
+        try:
+            fn, params, version_of = resolve(parts.path)
+            version = version_of()
+            encoding = negotiate(self.headers.get("Accept-Encoding", ""))
+            etag = etag_for(version, url, encoding)
+            headers = {
+                "ETag": etag,
+                "Cache-Control": f"public, max-age={MAX_AGE}",
+                "Vary": "Accept-Encoding",
+            }
+            if etag_matches(self.headers.get("If-None-Match", ""), etag):
+                self._send(HTTPStatus.NOT_MODIFIED, headers, b"", head=True)
+                return
+            body = _cache.peek(version, url, encoding)
+            if body is None:
+                query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                result = fn(query, **params)
+                if isinstance(result, Volatile):
+                    body = encode(_json(result.value), encoding)
+                    del headers["ETag"]
+                    headers["Cache-Control"] = "no-store"
+                else:
+                    body = _cache.put(version, url, encoding, _json(result))
+            headers["Content-Type"] = "application/json"
+            if encoding != "identity":
+                headers["Content-Encoding"] = encoding
+            self._send(HTTPStatus.OK, headers, body, head)
+        except NotFound as e:
+            self._send(HTTPStatus.NOT_FOUND, {"Content-Type": "application/json"}, _json({"error": str(e)}), head)
+        except BadRequest as e:
+            self._send(HTTPStatus.BAD_REQUEST, {"Content-Type": "application/json"}, _json({"error": str(e)}), head)
+        except Exception as e:
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"Content-Type": "application/json"},
+                       _json({"error": f"{type(e).__name__}: {e}"}), head)
+
+    def _send(self, status: HTTPStatus, headers: Dict[str, str], body: bytes, head: bool) -> None:
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.log_requests:
+            super().log_message(format, *args)
+
+
+def _json(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def serve(host: str = "127.0.0.1", port: int = 8502, log: bool = False) -> ThreadingHTTPServer:
+    """Bind the server (call serve_forever() on the result, or shutdown() to stop)."""
+    Handler.log_requests = log
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Read-only JSON menu API with ETag / gzip.")
+    parser.add_argument("--host", default=setting("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(setting("API_PORT", 8502)))
+    parser.add_argument("--log", action="store_true", help="log every request to stderr")
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port, args.log)
+    print(f"serving on http://{args.host}:{server.server_address[1]}  (brotli {'on' if brotli else 'off'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""CPU-bound catalog jobs spread across a process pool.
+
+Each job is a function over an index range [start, stop) of a read-only input
+(the recipe list, the compiled Catalog, the inventory items). run_ranges()
+hands that input to every worker once, through the pool initializer (inherited
+for free under fork), so a task carries only its two integers and a result, and
+the partial results are merged in range order. With one worker, or less work
+than one chunk, the job runs inline with no pool at all.
+
+Validation instead streams its input through run_chunks(): recipes are read in
+blocks and shipped to workers a few at a time, so seeding a multi-million-doc
+generated file keeps the flat memory profile of validate.validate_catalog.
+
+Jobs:
+  - validate: validate.validate_recipe for every recipe
+  - nutrition: per-recipe nutrition totals from the compiled catalog
+  - customizations: every milk / syrup / sauce option combination per recipe,
+    with its calorie, sugar and caffeine range
+  - reorder: db.compute_reorder_status for every inventory item (low items only)
+
+Inputs come from the seed files (default, no database needed) or the live
+catalog with --db. seed.py validates through validate() here.
+
+Usage:
+    python batch.py validate --workers 8
+    python batch.py nutrition --db --out nutrition.json
+    python batch.py customizations --recipes data/recipes.jsonl --ingredients data/ingredients.jsonl
+    python batch.py reorder --db
+    python batch.py all --db --out-dir nightly/     # every job, one JSON file each
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import db
+from catalog import NUTRIENTS, Catalog
+from validate import Issue, compile_lookup, read_docs, validate_recipe
+
+R = TypeVar("R")
+
+BASE = Path(__file__).parent
+
+# Chunks per worker: enough to even out uneven recipes without per-task overhead dominating.
+CHUNKS_PER_WORKER = 4
+
+_shared: Any = None
+
+
+def _init_worker(shared: Any) -> None:
+    global _shared
+    _shared = shared
+
+
+def _call(fn: Callable[..., R], *args: Any) -> R:
+    return fn(_shared, *args)
+
+
+def default_workers() -> int:
+    return int(os.environ.get("BATCH_WORKERS") or os.cpu_count() or 1)
+
+
+def ranges(n: int, parts: int) -> List[Tuple[int, int]]:
+    """Split [0, n) into at most `parts` contiguous, near-equal ranges."""
+    parts = max(1, min(parts, n))
+    step, extra = divmod(n, parts)
+    out, start = [], 0
+    for i in range(parts):
+        stop = start + step + (1 if i < extra else 0)
+        if stop > start:
+            out.append((start, stop))
+        start = stop
+    return out
+
+
+def run_ranges(fn: Callable[[Any, int, int], R], n: int, shared: Any,
+               workers: Optional[int] = None, min_chunk: int = 256) -> List[R]:
+    """[fn(shared, start, stop) for each range of [0, n)], computed across a process pool.
+
+    `fn` must be a module-level function (it is pickled by reference) and must not
+    mutate `shared`. Results come back in range order whatever order workers finish.
+    """
+    workers = workers or default_workers()
+    parts = min(workers * CHUNKS_PER_WORKER, max(1, n // min_chunk))
+    spans = ranges(n, parts)
+    if workers <= 1 or len(spans) <= 1:
+        return [fn(shared, start, stop) for start, stop in spans]
+    with ProcessPoolExecutor(max_workers=min(workers, len(spans)), initializer=_init_worker,
+                             initargs=(shared,)) as pool:
+        futures = [pool.submit(_call, fn, start, stop) for start, stop in spans]
+        return [f.result() for f in futures]
+
+
+def run_chunks(fn: Callable[[Any, int, List[Any]], R], items: Iterable[Any], shared: Any,
+               workers: Optional[int] = None, chunk: int = 1000) -> Iterator[R]:
+    """Yield fn(shared, offset, block) for consecutive `chunk`-sized blocks of `items`, in order.
+
+    Unlike run_ranges(), `items` is consumed lazily and only a couple of blocks per
+    worker are in flight, so memory stays flat however long the input stream is.
+    """
+    workers = workers or default_workers()
+    it = iter(items)
+
+    def blocks() -> Iterator[Tuple[int, List[Any]]]:
+        offset = 0
+        while True:
+            block = list(itertools.islice(it, chunk))
+            if not block:
+                return
+            yield offset, block
+            offset += len(block)
+
+    gen = blocks()
+    head = list(itertools.islice(gen, 2))
+    if workers <= 1 or len(head) <= 1:
+        for offset, block in itertools.chain(head, gen):
+            yield fn(shared, offset, block)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as pool:
+        pending: Deque[Future] = deque()
+        for offset, block in itertools.chain(head, gen):
+            pending.append(pool.submit(_call, fn, offset, block))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ----------------------------
+# Jobs (module level so workers can unpickle them)
+# ----------------------------
+def _validate_chunk(known: frozenset, offset: int, docs: List[Dict[str, Any]]) -> Tuple[int, List[Issue]]:
+    issues: List[Issue] = []
+    for i, doc in enumerate(docs, offset):
+        issues.extend(validate_recipe(doc, known, row=i))
+    return len(docs), issues
+
+
+def _nutrition_range(cat: Catalog, start: int, stop: int) -> List[Dict[str, Any]]:
+    return [{"_id": r.id, **cat.nutrition(r)} for r in cat.recipes[start:stop]]
+
+
+def _variants(doc: Dict[str, Any]) -> Iterable[Dict[str, str]]:
+    """Every {default ingredient id: replacement} the recipe's options allow."""
+    defaults = doc.get("defaults") if isinstance(doc.get("defaults"), dict) else {}
+    options = doc.get("options") if isinstance(doc.get("options"), dict) else {}
+    slots = []
+    for default_key, option_key in (("milk_id", "milks"), ("syrup_id", "syrups"), ("sauce_id", "sauces")):
+        default = defaults.get(default_key)
+        choices = [c for c in options.get(option_key) or [] if c]
+        if default and choices:
+            slots.append([(default, c) for c in choices])
+    for combo in itertools.product(*slots):
+        yield dict(combo)
+
+
+def _customize_range(shared: Tuple[Catalog, Sequence[Dict[str, Any]]], start: int, stop: int) -> List[Dict[str, Any]]:
+    cat, recipes = shared
+    out: List[Dict[str, Any]] = []
+    for doc in recipes[start:stop]:
+        comp = [x for x in doc.get("composition") or [] if isinstance(x, dict)]
+        lo = {n: float("inf") for n in NUTRIENTS}
+        hi = {n: float("-inf") for n in NUTRIENTS}
+        count = 0
+        for swap in _variants(doc):
+            totals = cat.nutrition_of(
+                {**x, "ingredient_id": swap.get(x.get("ingredient_id"), x.get("ingredient_id"))} for x in comp
+            )
+            count += 1
+            for n in NUTRIENTS:
+                lo[n] = min(lo[n], totals[n])
+                hi[n] = max(hi[n], totals[n])
+        row: Dict[str, Any] = {"_id": doc.get("_id"), "variants": count}
+        for n in NUTRIENTS:
+            row[f"{n}_min"], row[f"{n}_max"] = lo[n], hi[n]
+        out.append(row)
+    return out
+
+
+def _reorder_range(items: Sequence[Dict[str, Any]], start: int, stop: int) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for item in items[start:stop]:
+        is_low, reco = db.compute_reorder_status(item)
+        if is_low:
+            out.append({
+                "ingredient_id": str(item.get("ingredient_id") or item.get("_id")),
+                "available": int(item.get("available") or max(0, int(item.get("on_hand") or 0) - int(item.get("reserved") or 0))),
+                "reorder_point": int(item.get("reorder_point") or 0),
+                "recommended_order_qty": reco,
+                "lead_time_days": int(item.get("lead_time_days") or 0),
+            })
+    return out
+
+
+# ----------------------------
+# Public entry points
+# ----------------------------
+def validate(recipes: Iterable[Dict[str, Any]], ingredients: Iterable[Dict[str, Any]],
+             workers: Optional[int] = None) -> Dict[str, Any]:
+    """Same report as validate.validate_catalog, computed in parallel.
+
+    `recipes` is streamed (e.g. straight from read_docs), never held in memory whole.
+    """
+    checked = 0
+    issues: List[Issue] = []
+    for n, part in run_chunks(_validate_chunk, recipes, compile_lookup(ingredients), workers):
+        checked += n
+        issues.extend(part)
+    invalid = len({(x.row, x.recipe_id) for x in issues})
+    return {"checked": checked, "invalid": invalid, "issues": issues}
+
+
+def nutrition(cat: Catalog, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """[{"_id", "calories", "sugar_g", "caffeine_mg"}] for every recipe in `cat`."""
+    return [row for part in run_ranges(_nutrition_range, len(cat.recipes), cat, workers) for row in part]
+
+
+def customizations(cat: Catalog, recipes: Sequence[Dict[str, Any]],
+                   workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Per recipe: how many option combinations exist and each nutrient's min / max over them."""
+    recipes = list(recipes)
+    return [row for part in run_ranges(_customize_range, len(recipes), (cat, recipes), workers, min_chunk=64)
+            for row in part]
+
+
+def reorder(items: Sequence[Dict[str, Any]], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Inventory items below their reorder point, with the recommended order quantity."""
+    items = list(items)
+    return [row for part in run_ranges(_reorder_range, len(items), items, workers) for row in part]
+
+
+JOBS = ("validate", "nutrition", "customizations", "reorder")
+
+
+def _load(args: argparse.Namespace, need_inventory: bool) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    if args.db:
+        ing, rec = db.colls()
+        ingredients = list(ing.find({}))
+        recipes = list(rec.find({}).batch_size(1000))
+        items = list(db.inventory().get_many().values()) if need_inventory else []
+    else:
+        ingredients = list(read_docs(args.ingredients))
+        recipes = list(read_docs(args.recipes))
+        items = list(read_docs(args.inventory)) if need_inventory and args.inventory.exists() else []
+    return recipes, ingredients, items
+
+
+def run_job(job: str, recipes: List[Dict[str, Any]], ingredients: List[Dict[str, Any]],
+            items: List[Dict[str, Any]], workers: Optional[int] = None) -> Any:
+    if job == "validate":
+        report = validate(recipes, ingredients, workers)
+        return {**report, "issues": [asdict(x) for x in report["issues"]]}
+    if job == "reorder":
+        return reorder(items, workers)
+    cat = Catalog.build(ingredients, recipes)
+    if job == "nutrition":
+        return nutrition(cat, workers)
+    return customizations(cat, recipes, workers)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run CPU-bound catalog jobs across a process pool.")
+    parser.add_argument("job", choices=JOBS + ("all",))
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: BATCH_WORKERS or CPU count)")
+    parser.add_argument("--recipes", type=Path, default=BASE / "recipes.json")
+    parser.add_argument("--ingredients", type=Path, default=BASE / "ingredients.json")
+    parser.add_argument("--inventory", type=Path, default=BASE / "inventory.json")
+    parser.add_argument("--db", action="store_true", help="read the live MongoDB catalog instead of files")
+    parser.add_argument("--out", type=Path, help="write the job's JSON result here (single job)")
+    parser.add_argument("--out-dir", type=Path, help="write <job>.json for each job here")
+    args = parser.parse_args(argv)
+
+    jobs = JOBS if args.job == "all" else (args.job,)
+    recipes, ingredients, items = _load(args, need_inventory="reorder" in jobs)
+    status = 0
+    for job in jobs:
+        t0 = time.perf_counter()
+        result = run_job(job, recipes, ingredients, items, args.workers)
+        ms = (time.perf_counter() - t0) * 1000
+        rows = result["checked"] if job == "validate" else len(result)
+        print(f"{job:16} {rows:>9} rows {ms:>10.1f} ms")
+        if job == "validate" and result["issues"]:
+            print(f"{'':16} {result['invalid']} invalid recipes, {len(result['issues'])} issues")
+            status = 1
+        out = args.out if args.out and len(jobs) == 1 else (args.out_dir / f"{job}.json" if args.out_dir else None)
+        if out:
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_text(json.dumps(result, indent=2, default=str))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
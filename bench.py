@@ -0,0 +1,214 @@
+"""Benchmarks for the db.py query and aggregation layer.
+
+Loads synthetic catalogs from generator.py into a local mongod (one database per
+size, rebuilt on each run) and times every db.py function.
+
+Usage:
+    python bench.py --sizes 100,10000                      # print latency table
+    python bench.py --save-baseline bench_baseline.json    # record a baseline
+    python bench.py --baseline bench_baseline.json         # exit 1 on p50 regressions
+
+Point it at a throwaway server: --uri defaults to mongodb://localhost:27017 and the
+target databases (cafecrunch_bench_<size>) are dropped and recreated. With
+--backend memory no server is needed (see memstore.py); the catalogs are then
+loaded into the process on every run.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from generator import generate_ingredients, generate_recipes
+
+BATCH = 5000
+SEED = 42
+
+
+# ----------------------------
+# Synthetic catalog
+# ----------------------------
+
+def load_catalog(db, n: int, seed: int = SEED) -> None:
+    """Drop and reload ingredients/recipes with `n` generated recipes (streamed in batches)."""
+    db.drop_collection("ingredients")
+    db.drop_collection("recipes")
+    ings = generate_ingredients(max(60, n // 100), seed)
+    db["ingredients"].insert_many([dict(d) for d in ings], ordered=False)
+    batch: List[Dict[str, Any]] = []
+    for doc in generate_recipes(n, ings, seed):
+        batch.append(doc)
+        if len(batch) >= BATCH:
+            db["recipes"].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        db["recipes"].insert_many(batch, ordered=False)
+    from db import bump_catalog_version
+
+    bump_catalog_version(db)
+
+
+# ----------------------------
+# Cases
+# ----------------------------
+
+def cases(dbm, n: int) -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-arg callable) for every db.py function, sized for an `n`-recipe catalog."""
+    ings = generate_ingredients(max(60, n // 100), SEED)
+    mid = next(generate_recipes(1, ings, SEED, start=n // 2))
+    mid_id, mid_name = mid["_id"], mid["name"]
+    search_text = mid_name.split(" (")[0]
+    bench_doc = dict(mid, _id="bench_write_recipe", name="Bench write recipe")
+    bulk_docs = [dict(d, _id=f"bench_bulk_{i:04d}") for i, d in enumerate(generate_recipes(100, ings, SEED + 1))]
+    bench_ing = dict(ings[0], _id="bench_write_ingredient", name="Bench write ingredient")
+
+    def write_recipe_roundtrip():
+        dbm.upsert_recipe(bench_doc)
+        dbm.update_recipe_defaults("bench_write_recipe", {"espresso_shots": 3})
+        dbm.delete_recipe("bench_write_recipe")
+
+    def write_ingredient_roundtrip():
+        dbm.upsert_ingredient(bench_ing)
+        dbm.bulk_update_ingredients({"bench_write_ingredient": {"nutrition_per_unit.calories": 4.0}})
+        dbm.delete_ingredient("bench_write_ingredient")
+
+    # The agg_* functions are single-flight cached; __wrapped__ times the pipeline itself.
+    return [
+        ("list_recipes", lambda: dbm.list_recipes(limit=300)),
+        ("list_recipes[filtered]", lambda: dbm.list_recipes("core", "iced", (300, 600), limit=300)),
+        ("page_recipes[first]", lambda: dbm.page_recipes(page_size=50)),
+        ("page_recipes[middle]", lambda: dbm.page_recipes(after=(mid_name, mid_id), page_size=50)),
+        ("count_recipes", lambda: dbm.count_recipes("core", None, None, True)),
+        ("search_recipes", lambda: dbm.search_recipes(search_text, limit=25)),
+        ("get_recipe", lambda: dbm.get_recipe(mid_id)),
+        ("list_ingredients", lambda: dbm.list_ingredients()),
+        ("page_ingredients", lambda: dbm.page_ingredients(page_size=50)),
+        ("count_ingredients", lambda: dbm.count_ingredients()),
+        ("catalog_stats[uncached]", lambda: (dbm.catalog_stats.clear(), dbm.catalog_stats())),
+        ("ingredient_map", lambda: dbm.ingredient_map()),
+        ("ingredient_ids[uncached]", lambda: (dbm.ingredient_ids.clear(), dbm.ingredient_ids())),
+        ("recipe_prefix_index[uncached]", lambda: (dbm.recipe_prefix_index.clear(), dbm.recipe_prefix_index())),
+        ("export_recipes", lambda: sum(1 for _ in dbm.export_recipes())),
+        ("agg_counts_category_temp", lambda: dbm.agg_counts_category_temp.__wrapped__()),
+        ("agg_milk_popularity", lambda: dbm.agg_milk_popularity.__wrapped__()),
+        ("agg_ingredient_usage_topn", lambda: dbm.agg_ingredient_usage_topn.__wrapped__(10)),
+        ("agg_calories_topn", lambda: dbm.agg_calories_topn.__wrapped__(10)),
+        ("write_recipe_roundtrip", write_recipe_roundtrip),
+        ("bulk_upsert_recipes[100]", lambda: dbm.bulk_upsert_recipes(bulk_docs)),
+        ("write_ingredient_roundtrip", write_ingredient_roundtrip),
+    ]
+
+
+def _pct(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def measure(fn: Callable[[], Any], repeat: int, max_seconds: float) -> Dict[str, float]:
+    """Time `fn` up to `repeat` times (at least 3, stopping after `max_seconds`)."""
+    fn()  # warm-up: connection, index, plan cache
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < repeat:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= 3 and time.perf_counter() - started > max_seconds:
+            break
+    total = sum(samples)
+    return {
+        "runs": len(samples),
+        "p50_ms": _pct(samples, 0.50) * 1000,
+        "p95_ms": _pct(samples, 0.95) * 1000,
+        "p99_ms": _pct(samples, 0.99) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "ops_per_s": len(samples) / total if total else float("inf"),
+    }
+
+
+def format_table(results: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    lines = []
+    for size, rows in results.items():
+        lines.append(f"\n== {size} recipes ==")
+        lines.append(f"{'function':34} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9}")
+        for name, r in rows.items():
+            lines.append(
+                f"{name:34} {r['runs']:>5} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['ops_per_s']:>9.1f}"
+            )
+    return "\n".join(lines)
+
+
+def regressions(results, baseline, threshold: float) -> List[str]:
+    """Cases whose p50 is more than `threshold` (fraction) slower than the baseline."""
+    out = []
+    for size, rows in results.items():
+        for name, r in rows.items():
+            base = baseline.get(size, {}).get(name)
+            if base and r["p50_ms"] > base["p50_ms"] * (1 + threshold):
+                out.append(f"{size}/{name}: p50 {r['p50_ms']:.2f} ms vs baseline {base['p50_ms']:.2f} ms")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark db.py against synthetic catalogs.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--backend", choices=("mongo", "memory"), default="mongo")
+    parser.add_argument("--sizes", default="100,10000,1000000", help="comma-separated recipe counts")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="time budget per case")
+    parser.add_argument("--only", default="", help="comma-separated case names to run")
+    parser.add_argument("--skip-load", action="store_true", help="reuse catalogs loaded by a previous run")
+    parser.add_argument("--save-baseline", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed p50 slowdown vs baseline")
+    args = parser.parse_args(argv)
+
+    # db.py reads its settings from the environment first, so set them before import.
+    os.environ["MONGO_URI"] = args.uri
+    os.environ["BACKEND"] = args.backend
+    import db as dbm
+
+    only = {x for x in args.only.split(",") if x}
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for n in [int(x) for x in args.sizes.split(",") if x]:
+        db_name = f"cafecrunch_bench_{n}"
+        os.environ["DB_NAME"] = db_name
+        if not args.skip_load or args.backend == "memory":
+            t0 = time.perf_counter()
+            load_catalog(dbm.get_db(), n)
+            print(f"loaded {n} recipes into {db_name} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+        # st.cache_* keys do not include DB_NAME, so drop what the previous size cached.
+        for cached in (dbm.ingredient_ids, dbm.recipe_prefix_index, dbm.ingredient_options,
+                       dbm.catalog_version, dbm.catalog_stats, dbm.dashboard_data):
+            cached.clear()
+
+        results[str(n)] = {}
+        for name, fn in cases(dbm, n):
+            if only and name not in only:
+                continue
+            results[str(n)][name] = measure(fn, args.repeat, args.max_seconds)
+            print(f"  {n}/{name}: p50 {results[str(n)][name]['p50_ms']:.2f} ms", file=sys.stderr)
+
+    print(format_table(results))
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+        print(f"\nbaseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        bad = regressions(results, json.loads(args.baseline.read_text()), args.threshold)
+        if bad:
+            print(f"\n{len(bad)} regressions (> {args.threshold:.0%} slower p50):")
+            print("\n".join(f"  {x}" for x in bad))
+            return 1
+        print(f"\nno regressions vs {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
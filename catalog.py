@@ -0,0 +1,314 @@
+"""Compact, typed in-memory catalog shared by every session in the process.
+
+Recipes and ingredients are compiled once per db.catalog_version() into slotted,
+frozen dataclasses instead of being kept as lists of raw dicts. Ids and the
+small vocabularies (category, temperature, season, unit) are interned, every id
+maps to an integer index, and compositions live in parallel array columns
+(CSR layout: recipe i's rows are comp_start[i]:comp_start[i + 1]), so nutrition
+is a tight loop over floats rather than dict lookups per row.
+
+    cat = catalog.get_catalog()
+    cat.recipe("iced_flavored_latte_small").name
+    cat.ingredient_name("syrup_vanilla")
+    cat.nutrition("iced_flavored_latte_small")    # {"calories": ..., "sugar_g": ..., "caffeine_mg": ...}
+    cat.nutrition_of(doc["composition"])          # any composition, e.g. a what-if edit
+    cat.menu_frame()                              # pandas columns for the Menu filters
+
+With CATALOG_SNAPSHOT=1 the compiled arrays are also shared between processes
+through memory-mapped snapshot files (see snapshot.py).
+"""
+import sys
+import threading
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import db
+from config import flag
+
+NUTRIENTS = ("calories", "sugar_g", "caffeine_mg")
+
+# Composition measures, stored as small ints in Catalog.comp_measure.
+MEASURES = ("ml", "pumps", "shots")
+NO_MEASURE = -1
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class Ingredient:
+    idx: int
+    id: str
+    name: str
+    unit: Optional[str]
+    unit_ml: float
+    nutrition: Tuple[float, ...]  # per unit, in NUTRIENTS order
+
+
+@dataclass(frozen=True, slots=True)
+class CompositionItem:
+    ingredient_id: str
+    ingredient: int  # index into Catalog.ingredients, -1 if unknown
+    measure: Optional[str]  # "ml", "pumps", "shots" or None
+    amount: float
+    units: float  # nutrition units: amount / unit_ml for ml rows, the count otherwise
+
+
+@dataclass(frozen=True, slots=True)
+class Recipe:
+    idx: int
+    id: str
+    name: str
+    category: Optional[str]
+    temperature: Optional[str]
+    size_ml: Optional[float]
+    recipe_ok: bool
+    season: Tuple[str, ...]
+
+
+def _measure(item: Dict[str, Any]) -> Tuple[int, float]:
+    for code, measure in enumerate(MEASURES):
+        value = item.get(f"amount_{measure}")
+        if value is not None:
+            return code, _float(value)
+    return NO_MEASURE, 0.0
+
+
+class Catalog:
+    """Immutable catalog snapshot; build with Catalog.build() or get_catalog()."""
+
+    __slots__ = (
+        "version", "ingredients", "recipes", "ingredient_index", "recipe_index",
+        "ing_unit_ml", "ing_nutrition",
+        "comp_start", "comp_ingredient", "comp_measure", "comp_amount", "comp_units", "comp_ids",
+        "_menu",
+    )
+
+    def __init__(self, version: int = 0) -> None:
+        self.version = version
+        self.ingredients: Tuple[Ingredient, ...] = ()
+        self.recipes: Tuple[Recipe, ...] = ()
+        self.ingredient_index: Dict[str, int] = {}
+        self.recipe_index: Dict[str, int] = {}
+        self.ing_unit_ml = array("d")
+        self.ing_nutrition: Tuple[array, ...] = tuple(array("d") for _ in NUTRIENTS)
+        self.comp_start = array("L", [0])
+        self.comp_ingredient = array("l")
+        self.comp_measure = array("b")
+        self.comp_amount = array("d")
+        self.comp_units = array("d")
+        self.comp_ids: List[str] = []
+        self._menu: Any = None
+
+    @classmethod
+    def build(cls, ingredients: Iterable[Dict[str, Any]], recipes: Iterable[Dict[str, Any]], version: int = 0) -> "Catalog":
+        cat = cls(version)
+        ings: List[Ingredient] = []
+        for d in ingredients:
+            iid = _intern(str(d["_id"]))
+            if iid in cat.ingredient_index:
+                continue
+            nutr = d.get("nutrition_per_unit") if isinstance(d.get("nutrition_per_unit"), dict) else {}
+            ing = Ingredient(
+                idx=len(ings),
+                id=iid,
+                name=str(d.get("name") or iid),
+                unit=_intern(d.get("unit")),
+                unit_ml=_float(d.get("unit_ml")),
+                nutrition=tuple(_float(nutr.get(n)) for n in NUTRIENTS),
+            )
+            cat.ingredient_index[iid] = ing.idx
+            ings.append(ing)
+            cat.ing_unit_ml.append(ing.unit_ml)
+            for col, value in zip(cat.ing_nutrition, ing.nutrition):
+                col.append(value)
+        cat.ingredients = tuple(ings)
+
+        recs: List[Recipe] = []
+        for d in recipes:
+            rid = _intern(str(d["_id"]))
+            if rid in cat.recipe_index:
+                continue
+            season = d.get("season") if isinstance(d.get("season"), list) else []
+            size = d.get("size_ml")
+            rec = Recipe(
+                idx=len(recs),
+                id=rid,
+                name=str(d.get("name") or rid),
+                category=_intern(d.get("category")),
+                temperature=_intern(d.get("temperature")),
+                size_ml=float(size) if isinstance(size, (int, float)) else None,
+                recipe_ok=bool(d.get("recipe_ok")),
+                season=tuple(_intern(str(s)) for s in season),
+            )
+            cat.recipe_index[rid] = rec.idx
+            recs.append(rec)
+            for item in d.get("composition") or []:
+                if isinstance(item, dict):
+                    cat._append_row(item)
+            cat.comp_start.append(len(cat.comp_amount))
+        cat.recipes = tuple(recs)
+        return cat
+
+    def _append_row(self, item: Dict[str, Any]) -> None:
+        iid = _intern(str(item.get("ingredient_id") or ""))
+        idx = self.ingredient_index.get(iid, -1)
+        code, amount = _measure(item)
+        self.comp_ids.append(iid)
+        self.comp_ingredient.append(idx)
+        self.comp_measure.append(code)
+        self.comp_amount.append(amount)
+        self.comp_units.append(self._units(idx, code, amount))
+
+    def _units(self, idx: int, code: int, amount: float) -> float:
+        if idx < 0 or code == NO_MEASURE:
+            return 0.0
+        if MEASURES[code] == "ml":
+            unit_ml = self.ing_unit_ml[idx]
+            return amount / unit_ml if unit_ml > 0 else 0.0
+        return amount
+
+    # ---------- Lookups ----------
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def recipe(self, recipe_id: str) -> Optional[Recipe]:
+        idx = self.recipe_index.get(recipe_id)
+        return None if idx is None else self.recipes[idx]
+
+    def ingredient(self, ingredient_id: str) -> Optional[Ingredient]:
+        idx = self.ingredient_index.get(ingredient_id)
+        return None if idx is None else self.ingredients[idx]
+
+    def ingredient_name(self, ingredient_id: str) -> str:
+        ing = self.ingredient(ingredient_id)
+        return ing.name if ing is not None else ingredient_id
+
+    def _rows(self, recipe: Union[str, Recipe]) -> Optional[range]:
+        idx = recipe.idx if isinstance(recipe, Recipe) else self.recipe_index.get(recipe)
+        if idx is None:
+            return None
+        return range(self.comp_start[idx], self.comp_start[idx + 1])
+
+    def composition(self, recipe: Union[str, Recipe]) -> List[CompositionItem]:
+        return [
+            CompositionItem(
+                ingredient_id=self.comp_ids[i],
+                ingredient=int(self.comp_ingredient[i]),
+                measure=MEASURES[self.comp_measure[i]] if self.comp_measure[i] != NO_MEASURE else None,
+                amount=float(self.comp_amount[i]),
+                units=float(self.comp_units[i]),
+            )
+            for i in self._rows(recipe) or ()
+        ]
+
+    def menu_frame(self) -> Any:
+        """Columnar pandas copy of the recipe index for in-process filtering.
+
+        Columns _id, name, category, temperature, size_ml, recipe_ok, sorted by
+        (category, temperature, name, _id) so a masked slice comes out grouped
+        the way the menu reads. Built on first use and kept for the life of this
+        (immutable) catalog, so it refreshes with the version.
+        """
+        if self._menu is None:
+            import pandas as pd  # only the Menu needs it; keep catalog import light
+
+            sizes = [r.size_ml for r in self.recipes]
+            whole = all(s is None or float(s).is_integer() for s in sizes)
+            frame = pd.DataFrame({
+                "_id": [r.id for r in self.recipes],
+                "name": [r.name for r in self.recipes],
+                "category": pd.Categorical([r.category for r in self.recipes]),
+                "temperature": pd.Categorical([r.temperature for r in self.recipes]),
+                "size_ml": pd.array(sizes, dtype="Int64" if whole else "Float64"),
+                "recipe_ok": [r.recipe_ok for r in self.recipes],
+            })
+            self._menu = frame.sort_values(
+                ["category", "temperature", "name", "_id"], kind="stable", ignore_index=True,
+            )
+        return self._menu
+
+    # ---------- Nutrition ----------
+
+    def nutrition(self, recipe: Union[str, Recipe]) -> Dict[str, float]:
+        """Nutrition totals of a stored recipe ({} for an unknown id)."""
+        rows = self._rows(recipe)
+        if rows is None:
+            return {}
+        totals = [0.0] * len(NUTRIENTS)
+        for i in rows:
+            idx, units = self.comp_ingredient[i], self.comp_units[i]
+            if idx < 0 or units <= 0:
+                continue
+            for n, col in enumerate(self.ing_nutrition):
+                totals[n] += col[idx] * units
+        return dict(zip(NUTRIENTS, map(float, totals)))
+
+    def nutrition_of(self, composition: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+        """Nutrition totals of an arbitrary composition list (e.g. an unsaved edit)."""
+        totals = [0.0] * len(NUTRIENTS)
+        for item in composition or []:
+            idx = self.ingredient_index.get(str(item.get("ingredient_id") or ""), -1)
+            code, amount = _measure(item)
+            units = self._units(idx, code, amount)
+            if units <= 0:
+                continue
+            for n, col in enumerate(self.ing_nutrition):
+                totals[n] += col[idx] * units
+        return dict(zip(NUTRIENTS, map(float, totals)))
+
+
+# One compiled catalog per process, rebuilt when db.catalog_version() moves
+# (or DB_NAME changes, as it does between bench.py catalog sizes).
+_current: Optional[Tuple[Tuple[str, int], Catalog]] = None
+_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """The shared Catalog for the current catalog version (built on first use)."""
+    global _current
+    name = db.get_db().name
+    if flag("CATALOG_SNAPSHOT"):
+        import snapshot  # numpy; only needed when snapshots are on
+
+        # The version file is the cache here; refresh it from MongoDB, not from
+        # this process's catalog_version(), which may be seconds behind.
+        key = (name, snapshot.current_version(name, db.read_catalog_version))
+    else:
+        key = (name, db.catalog_version())
+    current = _current
+    if current is not None and current[0] == key:
+        return current[1]
+    with _lock:
+        if _current is None or _current[0] != key:
+            _current = (key, _load(*key))
+        return _current[1]
+
+
+def _load(db_name: str, version: int) -> Catalog:
+    """Map this version's snapshot if there is one, else compile from MongoDB (and snapshot it)."""
+    use_snapshot = flag("CATALOG_SNAPSHOT")
+    if use_snapshot:
+        import snapshot  # numpy; only needed when snapshots are on
+
+        cat = snapshot.load(db_name, version)
+        if cat is not None:
+            return cat
+    ings, recs = db.catalog_docs()
+    cat = Catalog.build(ings, recs, version)
+    if use_snapshot:
+        try:
+            snapshot.write(cat, db_name)
+        except OSError:
+            pass  # read-only or full disk: keep serving from this process's copy
+    return cat
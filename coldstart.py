@@ -0,0 +1,124 @@
+"""Cold-start import and first-render times for each Streamlit page.
+
+Every page runs once in a fresh interpreter started with -X importtime, the
+way the first session on a new container pays for it. streamlit and AppTest
+are imported before the page (every session pays for those already), so the
+report shows what the page itself adds:
+
+  - first render: wall time of the page's first AppTest run
+  - imports: total time spent importing modules the page pulled in
+  - the slowest of those modules, by cumulative import time
+
+Usage:
+    python coldstart.py                              # every page, current config
+    python coldstart.py --backend memory --top 5     # no MongoDB needed
+    python coldstart.py --pages Dashboard,Details --json coldstart.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE = Path(__file__).parent
+MARKER = "--- page run ---"
+
+_CHILD = f"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+sys.stderr.write({MARKER!r} + "\\n")
+sys.stderr.flush()
+t0 = time.perf_counter()
+error = None
+try:
+    at.run()
+    if at.exception:
+        error = at.exception[0].message
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+print(json.dumps({{"ms": (time.perf_counter() - t0) * 1000, "error": error}}))
+"""
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def pages() -> Dict[str, Path]:
+    """{"Home": app.py, "Menu": pages/1_Menu.py, ...} in sidebar order."""
+    out = {"Home": BASE / "app.py"}
+    for path in sorted((BASE / "pages").glob("*.py")):
+        out[path.stem.split("_", 1)[-1].replace("_", " ")] = path
+    return out
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float]]:
+    """Top-level (module, cumulative ms) imported after MARKER, slowest first."""
+    _, _, after = stderr.partition(MARKER)
+    top: List[Tuple[str, float]] = []
+    for line in after.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if m and not m.group(3):
+            top.append((m.group(4), int(m.group(2)) / 1000))
+    return sorted(top, key=lambda t: -t[1])
+
+
+def measure(path: Path, timeout: float) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, str(path), str(timeout)],
+        capture_output=True, text=True, cwd=BASE, timeout=timeout + 60,
+    )
+    result: Dict[str, Any] = {"ms": None, "error": None}
+    lines = proc.stdout.strip().splitlines()
+    if lines:
+        try:
+            result = json.loads(lines[-1])
+        except ValueError:
+            pass
+    if proc.returncode and not result["error"]:
+        result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+    modules = parse_importtime(proc.stderr)
+    result["import_ms"] = sum(ms for _, ms in modules)
+    result["modules"] = modules
+    return result
+
+
+def format_table(results: Dict[str, Dict[str, Any]], top: int) -> str:
+    lines = [f"{'page':20} {'first render ms':>15} {'imports ms':>11}  slowest imports"]
+    for page, r in results.items():
+        render = f"{r['ms']:.0f}" if r["ms"] is not None else "-"
+        slowest = ", ".join(f"{name} {ms:.0f}" for name, ms in r["modules"][:top])
+        lines.append(f"{page:20} {render:>15} {r['import_ms']:>11.0f}  {slowest}")
+        if r["error"]:
+            lines.append(f"{'':20} error: {r['error']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-page cold-start import and first-render times.")
+    parser.add_argument("--pages", default="", help="comma-separated page names (substring match)")
+    parser.add_argument("--backend", choices=("mongo", "memory"), help="override BACKEND for the page runs")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per page")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        os.environ["BACKEND"] = args.backend
+    wanted = [p.strip().lower() for p in args.pages.split(",") if p.strip()]
+    selected = {name: path for name, path in pages().items()
+                if not wanted or any(w in name.lower() for w in wanted)}
+    if not selected:
+        parser.error(f"no pages match {args.pages!r}; choose from: {', '.join(pages())}")
+
+    results = {name: measure(path, args.timeout) for name, path in selected.items()}
+    print(format_table(results, args.top))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 1 if any(r["error"] for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
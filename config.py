@@ -0,0 +1,44 @@
+import os
+from typing import Any, Iterable
+
+import streamlit as st
+
+
+def setting(name: str, default: Any = None) -> Any:
+    """Config value from the environment first, then st.secrets, then `default`.
+
+    The env override lets CLIs (benchmarks, validators) point db.py at another
+    database without a secrets.toml.
+    """
+    if name in os.environ:
+        return os.environ[name]
+    # load_if_toml_exists() avoids the st.error Streamlit renders into the page when
+    # there is no secrets.toml at all (env-only and BACKEND=memory setups).
+    if not st.secrets.load_if_toml_exists():
+        return default
+    return st.secrets.get(name, default)
+
+
+def flag(name: str, default: bool = False) -> bool:
+    """Boolean setting; accepts true/1/yes/on (any case) from env or secrets."""
+    val = setting(name, default)
+    if isinstance(val, str):
+        return val.strip().lower() in ("1", "true", "yes", "on")
+    return bool(val)
+
+
+def first_setting(names: Iterable[str], mongo_keys: Iterable[str] = (), default: Any = None) -> Any:
+    """First non-empty setting among `names`, then among `mongo_keys` of the [mongo] secrets table.
+
+    Keeps older secrets.toml layouts (MONGODB_URI, COL_INVENTORY, [mongo] uri / db ...) working.
+    """
+    for name in names:
+        val = setting(name)
+        if val:
+            return val
+    if mongo_keys and st.secrets.load_if_toml_exists():
+        section = st.secrets.get("mongo") or {}
+        for key in mongo_keys:
+            if section.get(key):
+                return section[key]
+    return default
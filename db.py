@@ -1,24 +1,237 @@
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+
 import streamlit as st
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.collation import Collation
 from pymongo.collection import Collection
-from typing import Any, Dict, List, Optional, Tuple
+from pymongo.errors import BulkWriteError, OperationFailure
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import first_setting, flag, setting
+from instrumentation import QueryListener, enabled as query_metrics_enabled, instrumented
+from search import PrefixIndex
+from singleflight import singleflight
+from validate import validate_recipe
+
+# Case/accent-insensitive comparisons for recipe-name prefix search.
+NAME_COLLATION = Collation(locale="en", strength=2)
+
+# One client per URI and one index check per collection pair for the whole process.
+# These are plain module state rather than st.cache_resource, which only stores
+# results inside a Streamlit script run; scripts such as bench.py would otherwise
+# reconnect and re-issue createIndexes on every db.py call.
+_clients: Dict[str, MongoClient] = {}
+_indexed: Set[Tuple[str, str]] = set()
+_lock = threading.Lock()
+_MISSING = object()
 
-@st.cache_resource
 def get_client() -> MongoClient:
-    return MongoClient(st.secrets["MONGO_URI"], serverSelectionTimeoutMS=6000)
+    """MongoClient for MONGO_URI, or the seeded in-memory store when BACKEND=memory."""
+    if setting("BACKEND", "mongo") == "memory":
+        from memstore import SEED_DIR, connect
+
+        return connect(setting("MEMORY_SEED_DIR", SEED_DIR), seed_db=setting("DB_NAME", "CafeCrunch"))
+    uri = setting("MONGO_URI")
+    if not uri:
+        raise KeyError("MONGO_URI")
+    return _client_for(uri)
+
+def _client_for(uri: str) -> MongoClient:
+    with _lock:
+        if uri not in _clients:
+            # QUERY_METRICS is read once here: with it off the client carries no listener at all.
+            listeners = [QueryListener()] if query_metrics_enabled() else []
+            _clients[uri] = MongoClient(uri, serverSelectionTimeoutMS=6000, event_listeners=listeners)
+        return _clients[uri]
 
 def get_db():
-    return get_client()[st.secrets.get("DB_NAME", "CafeCrunch")]
+    return get_client()[setting("DB_NAME", "CafeCrunch")]
 
 def colls() -> Tuple[Collection, Collection]:
     db = get_db()
-    ing = db[st.secrets.get("INGREDIENTS_COLL", "ingredients")]
-    rec = db[st.secrets.get("RECIPES_COLL", "recipes")]
+    ing = db[setting("INGREDIENTS_COLL", "ingredients")]
+    rec = db[setting("RECIPES_COLL", "recipes")]
+    ensure_indexes(ing, rec)
     return ing, rec
 
+def ensure_indexes(ing: Collection, rec: Collection) -> None:
+    """Create the (name, _id) indexes backing keyset pagination (once per process)."""
+    key = (ing.full_name, rec.full_name)
+    if key in _indexed:
+        return
+    try:
+        ing.create_index([("name", ASCENDING), ("_id", ASCENDING)], name="name_id")
+        rec.create_index([("name", ASCENDING), ("_id", ASCENDING)], name="name_id")
+        rec.create_index(
+            [("category", ASCENDING), ("temperature", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)],
+            name="category_temperature_name_id",
+        )
+        rec.create_index([("name", ASCENDING)], name="name_ci", collation=NAME_COLLATION)
+    except OperationFailure:
+        # Read-only users can still browse; queries just fall back to collection scans.
+        pass
+    _indexed.add(key)
+
+# ---------- Catalog version ----------
+# A counter in META_COLL bumped by every ingredient/recipe write made through
+# db.py (and by seed.py / bench loads), so derived structures such as
+# catalog.Catalog know when to rebuild. Writes made behind db.py's back are
+# only picked up after the next bump.
+@singleflight(ttl=5)
+def catalog_version() -> int:
+    return read_catalog_version()
+
+@instrumented
+def read_catalog_version() -> int:
+    """The catalog version straight from MongoDB; catalog_version() is the cached one."""
+    doc = get_db()[setting("META_COLL", "meta")].find_one({"_id": "catalog"}, {"version": 1})
+    return int(doc["version"]) if doc else 0
+
+def bump_catalog_version(database=None) -> None:
+    """Mark the catalog changed (`database` defaults to get_db())."""
+    database = get_db() if database is None else database
+    doc = database[setting("META_COLL", "meta")].find_one_and_update(
+        {"_id": "catalog"}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    catalog_version.clear()
+    for cached in CATALOG_DERIVED:
+        cached.clear()
+    if flag("CATALOG_SNAPSHOT"):
+        import snapshot
+
+        snapshot.publish_version(database.name, int(doc["version"]))
+
+@instrumented
+def catalog_docs() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(ingredients, recipes) projected to the fields catalog.Catalog compiles."""
+    ing, recipes = colls()
+    ings = list(ing.find({}, {"name": 1, "unit": 1, "unit_ml": 1, "nutrition_per_unit": 1}))
+    recs = list(recipes.find({}, {
+        "name": 1, "category": 1, "temperature": 1, "size_ml": 1, "recipe_ok": 1, "season": 1, "composition": 1,
+    }))
+    return ings, recs
+
+# ---------- Change feed ----------
+# Every recipe / ingredient / inventory write made through db.py appends one
+# {_id: seq, kind, id, op, ts} row per touched document to CHANGES_COLL; seq
+# comes from a counter in META_COLL, so it only ever grows. A client keeps the
+# last seq it applied and asks changes_since(seq) for what moved after it,
+# rather than reloading the catalog. seed.py records a single
+# {"kind": "catalog", "op": "reset"} row: reload everything.
+CHANGE_KINDS = ("recipe", "ingredient", "inventory", "catalog")
+# A writer takes its seq before inserting its row, so a younger gap may still
+# fill in; changes_since() stops in front of gaps newer than this.
+CHANGE_GAP_GRACE = timedelta(seconds=10)
+
+def _changes_coll(database=None) -> Collection:
+    database = get_db() if database is None else database
+    return database[setting("CHANGES_COLL", "changes")]
+
+def record_changes(kind: str, ids: Iterable[Any], op: str = "upsert", database=None) -> int:
+    """Append one change row per id (op "upsert" or "delete"); returns the last seq assigned."""
+    ids = [str(i) for i in ids]
+    if not ids:
+        return 0
+    database = get_db() if database is None else database
+    counter = database[setting("META_COLL", "meta")].find_one_and_update(
+        {"_id": "changes"}, {"$inc": {"seq": len(ids)}}, upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    last = int(counter["seq"])
+    first = last - len(ids) + 1
+    ts = datetime.now(timezone.utc)
+    _changes_coll(database).insert_many(
+        [{"_id": first + k, "kind": kind, "id": i, "op": op, "ts": ts} for k, i in enumerate(ids)],
+        ordered=False,
+    )
+    change_seq.clear()
+    return last
+
+@singleflight(ttl=2)
+@instrumented
+def change_seq() -> int:
+    """Highest seq handed out so far (0 before the first recorded change)."""
+    doc = get_db()[setting("META_COLL", "meta")].find_one({"_id": "changes"}, {"seq": 1})
+    return int(doc["seq"]) if doc else 0
+
+@instrumented
+def changes_since(seq: int, limit: int = 1000) -> Dict[str, Any]:
+    """What changed after `seq`, as the current state of each touched document.
+
+    Returns {"seq", "more", "gap", "changes": [{"kind", "id", "op", "seq", "doc"}]}:
+    one entry per (kind, id), the latest op winning; "doc" is the document now
+    (None for deletes and resets). Pass the returned "seq" next time; "more" means
+    another call will return further changes, and "gap" that this one stopped in
+    front of a seq still being written (retry shortly). A client should read
+    change_seq() before its initial full load and sync from there.
+    """
+    seq, limit = int(seq), int(limit)
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    rows = list(_changes_coll().find({"_id": {"$gt": seq}}).sort("_id", ASCENDING).limit(limit + 1))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    now = datetime.now(timezone.utc)
+    covered = seq
+    gap = False
+    latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in rows:
+        ts = row.get("ts")
+        if isinstance(ts, datetime) and ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)  # pymongo returns naive UTC datetimes
+        if row["_id"] != covered + 1 and isinstance(ts, datetime) and now - ts < CHANGE_GAP_GRACE:
+            more = gap = True  # an earlier seq may still be being written
+            break
+        covered = row["_id"]
+        key = (row["kind"], row["id"])
+        latest.pop(key, None)
+        latest[key] = {"kind": row["kind"], "id": row["id"], "op": row["op"], "seq": row["_id"], "doc": None}
+
+    wanted: Dict[str, List[str]] = {}
+    for change in latest.values():
+        if change["op"] == "upsert":
+            wanted.setdefault(change["kind"], []).append(change["id"])
+    found: Dict[str, Dict[str, Any]] = {}
+    if "recipe" in wanted:
+        found.update({f"recipe:{d['_id']}": d for d in get_recipes(wanted["recipe"])})
+    if "ingredient" in wanted:
+        found.update({f"ingredient:{d['_id']}": d for d in get_ingredients(wanted["ingredient"])})
+    if "inventory" in wanted:
+        found.update({f"inventory:{k}": d for k, d in inventory().get_many(wanted["inventory"]).items()})
+    for change in latest.values():
+        if change["op"] == "upsert":
+            change["doc"] = found.get(f"{change['kind']}:{change['id']}")
+            if change["doc"] is None:
+                change["op"] = "delete"  # removed by a write that bypassed db.py
+    return {"seq": covered, "more": more, "gap": gap, "changes": list(latest.values())}
+
 # ---------- Reads ----------
-def list_recipes(category=None, temperature=None, size_range=None, only_ok=True, limit=300):
-    _, recipes = colls()
+Cursor = Optional[Tuple[str, str]]
+
+def _after(q: Dict[str, Any], after: Cursor) -> Dict[str, Any]:
+    """AND a keyset condition onto `q` so results start strictly after (name, _id)."""
+    if after is None:
+        return q
+    name, _id = after
+    keyset = {"$or": [{"name": {"$gt": name}}, {"name": name, "_id": {"$gt": _id}}]}
+    return {"$and": [q, keyset]} if q else keyset
+
+def _page(coll: Collection, q: Dict[str, Any], projection, after: Cursor, page_size: int):
+    """Fetch one page ordered by (name, _id); returns (rows, cursor of the next page or None)."""
+    page_size = int(page_size)
+    rows = list(
+        coll.find(_after(q, after), projection)
+        .sort([("name", ASCENDING), ("_id", ASCENDING)])
+        .limit(page_size + 1)
+    )
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, (last.get("name"), last["_id"])
+
+def _recipe_query(category=None, temperature=None, size_range=None, only_ok=True) -> Dict[str, Any]:
     q: Dict[str, Any] = {}
     if category and category != "All":
         q["category"] = category
@@ -28,21 +241,127 @@ def list_recipes(category=None, temperature=None, size_range=None, only_ok=True,
         q["size_ml"] = {"$gte": int(size_range[0]), "$lte": int(size_range[1])}
     if only_ok:
         q["recipe_ok"] = True
+    return q
+
+@instrumented
+def list_recipes(category=None, temperature=None, size_range=None, only_ok=True, limit=300):
+    _, recipes = colls()
+    q = _recipe_query(category, temperature, size_range, only_ok)
     return list(recipes.find(q, {"composition": 0}).sort("name", 1).limit(limit))
 
+@instrumented
+def page_recipes(category=None, temperature=None, size_range=None, only_ok=True,
+                 after: Cursor = None, page_size: int = 50):
+    """One page of recipes (without composition) using keyset pagination on (name, _id)."""
+    _, recipes = colls()
+    q = _recipe_query(category, temperature, size_range, only_ok)
+    return _page(recipes, q, {"composition": 0}, after, page_size)
+
+@instrumented
+def count_recipes(category=None, temperature=None, size_range=None, only_ok=True) -> int:
+    _, recipes = colls()
+    return recipes.count_documents(_recipe_query(category, temperature, size_range, only_ok))
+
+@instrumented
 def get_recipe(recipe_id: str) -> Optional[Dict[str, Any]]:
     _, recipes = colls()
     return recipes.find_one({"_id": recipe_id})
 
+@instrumented
+def get_recipes(ids: Iterable[str], projection=None) -> List[Dict[str, Any]]:
+    """Recipes whose _id is in `ids`, in one {_id: {$in: ids}} query (missing ids are skipped)."""
+    ids = list(ids)
+    if not ids:
+        return []
+    _, recipes = colls()
+    return list(recipes.find({"_id": {"$in": ids}}, projection))
+
+@instrumented
+def search_recipes(text: str, limit: int = 25) -> List[Dict[str, Any]]:
+    """Top `limit` recipes whose name or _id, or any word in them, starts with `text`.
+
+    Full-name prefixes use the `name_ci` collation index for a range scan and _id
+    prefixes an anchored regex on the _id index. Word starts ("latte" in "Iced
+    Vanilla Latte") cannot use an index, so they come from the cached in-memory
+    prefix index, which also serves everything if the server rejects the query.
+    """
+    _, recipes = colls()
+    text = (text or "").strip()
+    limit = int(limit)
+    proj = {"name": 1}
+    try:
+        q: Dict[str, Any] = {"name": {"$gte": text, "$lt": text + "\uffff"}} if text else {}
+        hits = list(recipes.find(q, proj).collation(NAME_COLLATION).sort("name", ASCENDING).limit(limit))
+        if not text:
+            return hits
+        hits += recipes.find({"_id": {"$regex": "^" + re.escape(text.lower())}}, proj).limit(limit)
+    except OperationFailure:
+        hits = []
+    found = {h["_id"]: h.get("name") or h["_id"] for h in hits}
+    found.update(recipe_prefix_index().search(text, limit))
+    ranked = sorted(found.items(), key=lambda kv: (kv[1].lower(), kv[0]))[:limit]
+    return [{"_id": rid, "name": name} for rid, name in ranked]
+
+@st.cache_resource(ttl=300, show_spinner=False)
+@instrumented
+def recipe_prefix_index() -> PrefixIndex:
+    _, recipes = colls()
+    return PrefixIndex((d["_id"], d.get("name") or "") for d in recipes.find({}, {"name": 1}))
+
+@instrumented
 def list_ingredients(limit=2000):
     ing, _ = colls()
     return list(ing.find({}).sort("name", 1).limit(limit))
 
+@st.cache_data(ttl=60, show_spinner=False)
+@instrumented
+def ingredient_options() -> List[Dict[str, Any]]:
+    """Name and unit of every ingredient, sorted by name, for pickers."""
+    ing, _ = colls()
+    fields = {"name": 1, "ingredient_name": 1, "unit": 1, "stock_unit": 1, "portion_unit": 1}
+    return list(ing.find({}, fields).sort("name", ASCENDING))
+
+@instrumented
+def get_ingredients(ids: Iterable[str], projection=None) -> List[Dict[str, Any]]:
+    """Ingredients whose _id is in `ids`, in one {_id: {$in: ids}} query (missing ids are skipped)."""
+    ids = list(ids)
+    if not ids:
+        return []
+    ing, _ = colls()
+    return list(ing.find({"_id": {"$in": ids}}, projection))
+
+@instrumented
+def page_ingredients(after: Cursor = None, page_size: int = 50, prefix: str = ""):
+    """One page of ingredients using keyset pagination on (name, _id), optionally only _ids starting with `prefix`."""
+    ing, _ = colls()
+    q = {"_id": {"$regex": "^" + re.escape(prefix)}} if prefix else {}
+    return _page(ing, q, None, after, page_size)
+
+@instrumented
+def count_ingredients() -> int:
+    ing, _ = colls()
+    return ing.estimated_document_count()
+
+@instrumented
 def ingredient_map() -> Dict[str, Dict[str, Any]]:
     ing, _ = colls()
     return {d["_id"]: d for d in ing.find({})}
 
+@st.cache_data(ttl=60, show_spinner=False)
+@instrumented
+def ingredient_ids() -> frozenset:
+    """Cached set of all ingredient _ids, used to check recipe references on import."""
+    ing, _ = colls()
+    return frozenset(d["_id"] for d in ing.find({}, {"_id": 1}))
+
+@instrumented
+def export_recipes() -> Iterator[Dict[str, Any]]:
+    """Stream every recipe ordered by _id (batched server-side cursor)."""
+    _, recipes = colls()
+    return recipes.find({}).sort("_id", ASCENDING).batch_size(500)
+
 # ---------- Writes ----------
+@instrumented
 def update_recipe_defaults(recipe_id: str, patch: Dict[str, Any]) -> int:
     _, recipes = colls()
     if not patch:
@@ -51,29 +370,369 @@ def update_recipe_defaults(recipe_id: str, patch: Dict[str, Any]) -> int:
         {"_id": recipe_id},
         {"$set": {f"defaults.{k}": v for k, v in patch.items()}}
     )
+    if res.modified_count:
+        bump_catalog_version()
+        record_changes("recipe", [recipe_id])
     return res.modified_count
 
+@instrumented
 def upsert_ingredient(doc: Dict[str, Any]) -> None:
     ing, _ = colls()
-    ing.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    res = ing.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    if res.upserted_id is None and not res.modified_count:
+        return  # identical to what is stored: no new catalog version, no change row
+    ingredient_ids.clear()
+    ingredient_options.clear()
+    bump_catalog_version()
+    record_changes("ingredient", [doc["_id"]])
+
+@instrumented
+def bulk_update_ingredients(patches: Dict[str, Dict[str, Any]]) -> int:
+    """Apply {_id: {field_path: value}} as one unordered bulk_write of $set updates.
+
+    Only the changed fields are sent, so untouched nutrition/tags are never rewritten.
+    A None value unsets the field. Returns modified_count.
+    """
+    ing, _ = colls()
+    ops = []
+    for _id, patch in patches.items():
+        update = {}
+        sets = {k: v for k, v in patch.items() if v is not None}
+        unsets = {k: "" for k, v in patch.items() if v is None}
+        if sets:
+            update["$set"] = sets
+        if unsets:
+            update["$unset"] = unsets
+        if update:
+            ops.append(UpdateOne({"_id": _id}, update))
+    if not ops:
+        return 0
+    modified = ing.bulk_write(ops, ordered=False).modified_count
+    if not modified:
+        return 0
+    ingredient_options.clear()
+    bump_catalog_version()
+    record_changes("ingredient", [_id for _id, patch in patches.items() if patch])
+    return modified
 
+@instrumented
 def delete_ingredient(ingredient_id: str) -> int:
     ing, _ = colls()
-    return ing.delete_one({"_id": ingredient_id}).deleted_count
+    deleted = ing.delete_one({"_id": ingredient_id}).deleted_count
+    if deleted:
+        ingredient_ids.clear()
+        ingredient_options.clear()
+        bump_catalog_version()
+        record_changes("ingredient", [ingredient_id], op="delete")
+    return deleted
 
 
+@instrumented
 def upsert_recipe(doc: Dict[str, Any]) -> None:
-    """Insert new or replace existing recipe by _id."""
+    """Insert new or replace existing recipe by _id.
+
+    Raises ValueError listing every validation issue if the recipe is invalid.
+    """
+    problems = validate_recipe(doc, ingredient_ids())
+    if problems:
+        raise ValueError("; ".join(p.message for p in problems))
+    _, recipes = colls()
+    res = recipes.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    if res.upserted_id is None and not res.modified_count:
+        return  # identical to what is stored: no new catalog version, no change row
+    recipe_prefix_index.clear()
+    bump_catalog_version()
+    record_changes("recipe", [doc["_id"]])
+
+
+@instrumented
+def bulk_upsert_recipes(docs: Iterable[Dict[str, Any]], batch_size: int = 500) -> Dict[str, Any]:
+    """Validate (see validate.py) and upsert many recipes with unordered bulk_writes of `batch_size` ops.
+
+    Rows that fail validation or are rejected by the server are reported in
+    `errors` as {"row", "_id", "error"} (row = 0-based position in `docs`);
+    every other row is still written.
+    """
     _, recipes = colls()
-    recipes.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+    known = ingredient_ids()
+    result: Dict[str, Any] = {"upserted": 0, "modified": 0, "matched": 0, "errors": []}
+    ops: List[ReplaceOne] = []
+    rows: List[Tuple[int, Any]] = []
+    written: List[Any] = []
 
+    def flush() -> None:
+        if not ops:
+            return
+        failed: Set[int] = set()
+        try:
+            res = recipes.bulk_write(ops, ordered=False)
+            result["upserted"] += res.upserted_count
+            result["modified"] += res.modified_count
+            result["matched"] += res.matched_count
+        except BulkWriteError as e:
+            details = e.details
+            result["upserted"] += details.get("nUpserted", 0)
+            result["modified"] += details.get("nModified", 0)
+            result["matched"] += details.get("nMatched", 0)
+            for we in details.get("writeErrors", []):
+                row, _id = rows[we["index"]]
+                failed.add(we["index"])
+                result["errors"].append({"row": row, "_id": _id, "error": we.get("errmsg", "write error")})
+        written.extend(_id for k, (_, _id) in enumerate(rows) if k not in failed)
+        ops.clear()
+        rows.clear()
 
+    for i, doc in enumerate(docs):
+        problems = validate_recipe(doc, known, row=i)
+        if problems:
+            _id = doc.get("_id") if isinstance(doc, dict) else None
+            result["errors"].append({"row": i, "_id": _id, "error": "; ".join(p.message for p in problems)})
+            continue
+        ops.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+        rows.append((i, doc["_id"]))
+        if len(ops) >= batch_size:
+            flush()
+    flush()
+    if result["upserted"] or result["modified"]:
+        recipe_prefix_index.clear()
+        bump_catalog_version()
+        record_changes("recipe", written)
+    result["errors"].sort(key=lambda e: e["row"])
+    return result
+
+
+@instrumented
 def delete_recipe(recipe_id: str) -> int:
     """Delete a recipe by _id. Returns deleted_count (0 or 1)."""
     _, recipes = colls()
-    return recipes.delete_one({"_id": recipe_id}).deleted_count
+    deleted = recipes.delete_one({"_id": recipe_id}).deleted_count
+    if deleted:
+        recipe_prefix_index.clear()
+        bump_catalog_version()
+        record_changes("recipe", [recipe_id], op="delete")
+    return deleted
+
+# ---------- Inventory ----------
+# What the stocking view and reorder math read; `transactions` grows without bound.
+INVENTORY_FIELDS = (
+    "ingredient_id", "stock_unit", "on_hand", "reserved", "available",
+    "par_level", "reorder_point", "preferred_reorder_qty", "lead_time_days",
+)
+
+class InventoryRepository:
+    """Inventory reads and writes for both stored shapes.
+
+    The normal shape is one doc per ingredient ({ingredient_id, on_hand, ...}).
+    The legacy shape is a single container doc {items: {<ingredient_id>: {...}}}.
+    Reads return per-ingredient dicts either way; legacy items carry
+    `_legacy_container_id` and writes go to items.<ingredient_id> in the container.
+    """
+
+    def __init__(self, coll: Collection, ingredients: Optional[Collection] = None) -> None:
+        self.coll = coll
+        self.ingredients = ingredients
+        self._container: Any = _MISSING
+
+    def ingredient_options(self) -> List[Dict[str, Any]]:
+        """Pickable ingredients from the collection that sits next to this inventory."""
+        if self.ingredients is None or _same_coll(self.ingredients, colls()[0]):
+            return ingredient_options()
+        fields = {"name": 1, "ingredient_name": 1, "unit": 1, "stock_unit": 1, "portion_unit": 1}
+        return list(self.ingredients.find({}, fields).sort("name", ASCENDING))
+
+    @staticmethod
+    def _item_query(ingredient_id: str) -> Dict[str, Any]:
+        # Items are keyed by ingredient_id; older docs only by _id.
+        return {"$or": [
+            {"ingredient_id": ingredient_id},
+            {"_id": ingredient_id, "ingredient_id": {"$exists": False}},
+        ]}
+
+    def legacy_container_id(self) -> Any:
+        """_id of the legacy container doc, or None for per-ingredient docs (checked once)."""
+        if self._container is _MISSING:
+            head = list(self.coll.find({}, {"_id": 1, "ingredient_id": 1}).limit(2))
+            self._container = None
+            if len(head) == 1 and "ingredient_id" not in head[0]:
+                legacy = self.coll.find_one({"_id": head[0]["_id"], "items": {"$type": "object"}}, {"_id": 1})
+                if legacy is not None:
+                    self._container = legacy["_id"]
+        return self._container
+
+    @instrumented
+    def get_many(self, ids: Optional[Iterable[str]] = None,
+                 fields: Optional[Iterable[str]] = INVENTORY_FIELDS) -> Dict[str, Dict[str, Any]]:
+        """{ingredient_id: item} for `ids` (all items if None) in one query.
+
+        Only `fields` are returned (None = whole docs, transactions included).
+        Ingredients without an inventory entry are left out.
+        """
+        ids = None if ids is None else [str(i) for i in ids]
+        if ids == []:
+            return {}
+        cid = self.legacy_container_id()
+        if cid is not None:
+            if ids is None:
+                projection = {"items": 1}
+            elif fields is None:
+                projection = {f"items.{i}": 1 for i in ids}
+            else:
+                projection = {f"items.{i}.{f}": 1 for i in ids for f in fields}
+            container = self.coll.find_one({"_id": cid}, projection) or {}
+            out: Dict[str, Dict[str, Any]] = {}
+            for k, v in (container.get("items") or {}).items():
+                if isinstance(v, dict):
+                    item = {**v, "_legacy_container_id": cid}
+                    item.setdefault("ingredient_id", k)
+                    out[str(k)] = item
+            return out
+        q: Dict[str, Any] = {} if ids is None else {"$or": [{"ingredient_id": {"$in": ids}}, {"_id": {"$in": ids}}]}
+        projection = None if fields is None else {f: 1 for f in fields}
+        return {str(d.get("ingredient_id") or d["_id"]): d for d in self.coll.find(q, projection)}
+
+    def get(self, ingredient_id: str, fields: Optional[Iterable[str]] = INVENTORY_FIELDS) -> Dict[str, Any]:
+        """One item ({} if the ingredient has no inventory entry yet)."""
+        return self.get_many([ingredient_id], fields).get(str(ingredient_id), {})
+
+    @instrumented
+    def update(self, ingredient_id: str, patch: Dict[str, Any], txn: Optional[Dict[str, Any]] = None,
+               expected: Optional[Dict[str, Any]] = None) -> bool:
+        """Apply `patch` and append `txn` to the item's transactions in one atomic update.
+
+        With `expected` ({field: value read before editing}) the write only applies
+        if those fields are unchanged, so two people saving counts for the same item
+        cannot silently overwrite each other; returns False on such a conflict.
+        Without it, a missing item is created.
+        """
+        cid = self.legacy_container_id()
+        if cid is not None:
+            prefix = f"items.{ingredient_id}."
+            q: Dict[str, Any] = {"_id": cid}
+            update: Dict[str, Any] = {"$set": {prefix + k: v for k, v in patch.items()}}
+            if txn:
+                update["$push"] = {prefix + "transactions": txn}
+        else:
+            prefix = ""
+            q = self._item_query(ingredient_id)
+            update = {"$set": {**patch, "ingredient_id": ingredient_id, "updated_at": _now_iso()}}
+            if txn:
+                update["$push"] = {"transactions": txn}
+        if expected:
+            q.update({prefix + k: v for k, v in expected.items()})
+        res = self.coll.update_one(q, update, upsert=not expected)
+        saved = bool(res.matched_count or res.upserted_id is not None)
+        if res.modified_count or res.upserted_id is not None:
+            record_changes("inventory", [ingredient_id])
+        return saved
+
+    @instrumented
+    def adjust(self, ingredient_id: str, qty_delta: int, txn: Optional[Dict[str, Any]] = None) -> bool:
+        """Atomically add `qty_delta` to on_hand and available (receive/use), logging `txn`."""
+        cid = self.legacy_container_id()
+        prefix = f"items.{ingredient_id}." if cid is not None else ""
+        q = {"_id": cid} if cid is not None else self._item_query(ingredient_id)
+        update: Dict[str, Any] = {"$inc": {prefix + "on_hand": int(qty_delta), prefix + "available": int(qty_delta)}}
+        if txn:
+            update["$push"] = {prefix + "transactions": txn}
+        res = self.coll.update_one(q, update)
+        if res.modified_count:
+            record_changes("inventory", [ingredient_id])
+        return res.matched_count > 0
+
+def _now_iso() -> str:
+    return datetime.now().astimezone().isoformat(timespec="seconds")
+
+def _same_coll(a: Collection, b: Collection) -> bool:
+    return a.full_name == b.full_name and a.database.client is b.database.client
+
+def inventory() -> InventoryRepository:
+    """Repository over the inventory collection; indexes ingredient_id once per process.
+
+    The collection is found the way the Inventory page always found it, so existing
+    deployments keep their data: URI from MONGODB_URI / MONGO_URI / [mongo] uri_with_db,
+    uri; database from MONGODB_DB / DB_NAME / [mongo] db, else "cafecrunch";
+    collections from COL_INVENTORY / INVENTORY_COLL / [mongo] inventory_coll and
+    COL_INGREDIENTS / INGREDIENTS_COLL / [mongo] ingredients_coll.
+    """
+    if setting("BACKEND", "mongo") == "memory":
+        database = get_db()
+    else:
+        uri = first_setting(("MONGODB_URI", "MONGO_URI"), ("uri_with_db", "uri"))
+        if not uri:
+            raise KeyError("MONGO_URI")
+        database = _client_for(uri)[first_setting(("MONGODB_DB", "DB_NAME"), ("db",), "cafecrunch")]
+    inv = database[first_setting(("COL_INVENTORY", "INVENTORY_COLL"), ("inventory_coll",), "inventory")]
+    ing = database[first_setting(("COL_INGREDIENTS", "INGREDIENTS_COLL"), ("ingredients_coll",), "ingredients")]
+    key = (inv.full_name, "ingredient_id")
+    if key not in _indexed:
+        try:
+            inv.create_index([("ingredient_id", ASCENDING)], name="ingredient_id")
+        except OperationFailure:
+            pass
+        _indexed.add(key)
+    return InventoryRepository(inv, ing)
+
+def compute_reorder_status(item: Dict[str, Any]) -> Tuple[bool, int]:
+    """Return (is_low, recommended_qty).
+
+    Rule: low if available < reorder_point.
+    Recommendation: max(preferred_reorder_qty, par_level - available) if low.
+    """
+    on_hand = int(item.get("on_hand") or 0)
+    reserved = int(item.get("reserved") or 0)
+    available = int(item.get("available") or max(0, on_hand - reserved))
+    reorder_point = int(item.get("reorder_point") or 0)
+    par_level = int(item.get("par_level") or 0)
+    pref = int(item.get("preferred_reorder_qty") or 0)
+
+    is_low = available < reorder_point
+    if not is_low:
+        return False, 0
+
+    needed_to_par = max(0, par_level - available) if par_level else 0
+    reco = max(pref, needed_to_par) if (pref or needed_to_par) else max(0, reorder_point - available)
+    return True, int(reco)
+
+@singleflight(ttl=60, stale=240)
+@instrumented
+def catalog_stats() -> Dict[str, Any]:
+    """Recipe counts by category / temperature / approval plus the ingredient count.
+
+    One $group over three small fields plus estimated_document_count, so the home
+    page moves a few hundred bytes instead of the catalog. Cleared by catalog writes.
+    """
+    ing, recipes = colls()
+    stats: Dict[str, Any] = {
+        "recipes": 0, "ingredients": ing.estimated_document_count(), "approved": 0,
+        "by_category": {}, "by_temperature": {},
+    }
+    for row in recipes.aggregate([
+        {"$group": {
+            "_id": {"category": "$category", "temperature": "$temperature"},
+            "count": {"$sum": 1},
+            "approved": {"$sum": {"$cond": [{"$eq": ["$recipe_ok", True]}, 1, 0]}},
+        }},
+    ]):
+        key, n = row["_id"], row["count"]
+        stats["recipes"] += n
+        stats["approved"] += row["approved"]
+        for field, bucket in (("category", "by_category"), ("temperature", "by_temperature")):
+            name = key.get(field)
+            stats[bucket][name] = stats[bucket].get(name, 0) + n
+    return stats
 
 # ---------- Dashboard aggregations ----------
+# Aggregations and dashboard data are single-flight with stale-while-revalidate
+# (see singleflight.py): when an entry expires, sessions keep the previous
+# result while one background thread recomputes it, instead of every open
+# Dashboard re-running the pipeline at the same moment.
+@singleflight(ttl=300, stale=600)
+def dashboard_data() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(recipes, ingredients, top-100 nutrition rows) behind the Dashboard KPIs and charts."""
+    return list_recipes(limit=5000, only_ok=False), list_ingredients(limit=5000), agg_calories_topn(100)
+
+@singleflight(ttl=300, stale=600)
+@instrumented
 def agg_counts_category_temp():
     _, recipes = colls()
     return list(recipes.aggregate([
@@ -81,6 +740,8 @@ def agg_counts_category_temp():
         {"$sort": {"_id.category": 1, "_id.temperature": 1}},
     ]))
 
+@singleflight(ttl=300, stale=600)
+@instrumented
 def agg_milk_popularity():
     _, recipes = colls()
     return list(recipes.aggregate([
@@ -90,6 +751,8 @@ def agg_milk_popularity():
         {"$sort": {"count": -1}},
     ]))
 
+@singleflight(ttl=300, stale=600)
+@instrumented
 def agg_ingredient_usage_topn(n=10):
     _, recipes = colls()
     return list(recipes.aggregate([
@@ -99,12 +762,14 @@ def agg_ingredient_usage_topn(n=10):
         {"$limit": int(n)},
     ]))
 
+@singleflight(ttl=300, stale=600)
+@instrumented
 def agg_calories_topn(n=10):
     _, recipes = colls()
     pipeline = [
         {"$unwind": "$composition"},
         {"$lookup": {
-            "from": st.secrets.get("INGREDIENTS_COLL", "ingredients"),
+            "from": setting("INGREDIENTS_COLL", "ingredients"),
             "localField": "composition.ingredient_id",
             "foreignField": "_id",
             "as": "ing"
@@ -146,3 +811,9 @@ def agg_calories_topn(n=10):
         {"$limit": int(n)},
     ]
     return list(recipes.aggregate(pipeline))
+
+# Cleared by bump_catalog_version(): catalog writes made through db.py show up at once.
+CATALOG_DERIVED = (
+    catalog_stats, dashboard_data,
+    agg_counts_category_temp, agg_milk_popularity, agg_ingredient_usage_topn, agg_calories_topn,
+)
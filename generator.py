@@ -0,0 +1,286 @@
+"""Deterministic synthetic data for load tests and benchmarks.
+
+Produces ingredients (with nutrition), recipes (valid compositions, defaults,
+options, seasons), inventory docs and order streams shaped like the seed JSON
+files. Every recipe is derived from (seed, index) alone, so streams of millions
+of docs are written with flat memory and orders can reference recipes without
+holding the catalog.
+
+Usage:
+    python generator.py --recipes 1000000 --ingredients 200 --orders 5000000 --out data/
+    python seed.py --data data/
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+BASE = Path(__file__).parent
+
+SIZES = [("Small", 355), ("Medium", 473), ("Large", 591)]
+SEASONS = ["fall", "winter", "spring", "summer"]
+FLAVORS = [
+    "vanilla", "caramel", "hazelnut", "chocolate", "peppermint", "toffee", "maple", "lavender",
+    "honey", "coconut", "almond", "cinnamon", "gingerbread", "raspberry", "cherry", "salted_caramel",
+    "white_mocha", "pistachio", "rose", "cardamom", "orange", "mint", "butterscotch", "praline",
+]
+MILK_KINDS = ["whole", "2", "skim", "oat", "almond", "soy", "coconut", "cashew", "macadamia", "pea"]
+
+# (family, display name, uses milk, uses syrup, uses sauce, uses water)
+FAMILIES = [
+    ("latte", "Latte", True, False, False, False),
+    ("flavored_latte", "Flavored Latte", True, True, False, False),
+    ("mocha", "Mocha", True, True, False, False),
+    ("americano", "Americano", False, False, False, True),
+    ("shaken_espresso", "Shaken Espresso", True, True, False, False),
+    ("sauce_latte", "Sauce Latte", True, False, True, False),
+    ("cappuccino", "Cappuccino", True, False, False, False),
+]
+
+
+def _seed_ingredients() -> List[Dict[str, Any]]:
+    with open(BASE / "ingredients.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _nutrition(rng: random.Random, kind: str) -> Dict[str, float]:
+    if kind == "milk":
+        return {
+            "calories": round(rng.uniform(10, 65), 1), "protein_g": round(rng.uniform(0.2, 3.5), 1),
+            "fat_g": round(rng.uniform(0, 3.5), 1), "carbs_g": round(rng.uniform(0.5, 6), 1),
+            "sugar_g": round(rng.uniform(0, 5.5), 1), "sodium_mg": round(rng.uniform(20, 60), 1),
+            "caffeine_mg": 0.0,
+        }
+    sugar = round(rng.uniform(3, 12), 1)
+    return {
+        "calories": round(sugar * 4 + rng.uniform(0, 10), 1), "protein_g": 0.0,
+        "fat_g": round(rng.uniform(0, 2) if kind == "sauce" else 0.0, 1), "carbs_g": sugar,
+        "sugar_g": sugar, "sodium_mg": round(rng.uniform(0, 25), 1), "caffeine_mg": 0.0,
+    }
+
+
+def generate_ingredients(n: int = 100, seed: int = 42) -> List[Dict[str, Any]]:
+    """The seed ingredients plus generated milks/syrups/sauces up to `n` total.
+
+    Ingredient catalogs stay small (hundreds) even for huge recipe counts, so a
+    list is returned; recipes and orders are the streamed collections.
+    """
+    rng = random.Random(seed)
+    ings = _seed_ingredients()
+    have = {d["_id"] for d in ings}
+    candidates: List[Any] = []
+    for m in MILK_KINDS:
+        candidates.append(("milk", f"milk_{m}", f"{m.title()} milk", "ml", 100))
+    for f in FLAVORS:
+        candidates.append(("syrup", f"syrup_{f}", f"{f.replace('_', ' ').title()} syrup", "pump", 10))
+        candidates.append(("sauce", f"sauce_{f}", f"{f.replace('_', ' ').title()} sauce", "pump", 15))
+    k = 0
+    while len(ings) < n:
+        if candidates:
+            kind, _id, name, unit, unit_ml = candidates.pop(0)
+        else:
+            kind = rng.choice(["syrup", "sauce"])
+            flavor = f"{rng.choice(FLAVORS)}_{k:05d}"
+            _id, name, unit, unit_ml = f"{kind}_{flavor}", f"{flavor.replace('_', ' ').title()} {kind}", "pump", 10
+            k += 1
+        if _id in have:
+            continue
+        have.add(_id)
+        # Dairy milks already come from the seed file, so everything generated is plant based.
+        ings.append({
+            "_id": _id, "name": name, "unit": unit, "unit_ml": unit_ml,
+            "nutrition_per_unit": _nutrition(rng, kind), "tags": [kind, "vegan", "gluten_free"],
+        })
+    return ings
+
+
+def _by_kind(ingredients: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    ids = sorted(d["_id"] for d in ingredients)
+    return {
+        "milk": [i for i in ids if i.startswith("milk_")],
+        "syrup": [i for i in ids if i.startswith("syrup_") or i == "brown_sugar_syrup"],
+        "sauce": [i for i in ids if i.startswith("sauce_")],
+    }
+
+
+def recipe_at(k: int, kinds: Dict[str, List[str]], seed: int = 42) -> Dict[str, Any]:
+    """Recipe number `k`; a pure function of (seed, k) so it can be regenerated on demand."""
+    rng = random.Random(seed * 1_000_003 + k)
+    family, family_name, uses_milk, uses_syrup, uses_sauce, uses_water = rng.choice(FAMILIES)
+    temperature = rng.choice(["hot", "iced"])
+    size_name, size_ml = rng.choice(SIZES)
+    seasonal = rng.random() < 0.2
+    shots = rng.choice([1, 2, 2, 3]) + (1 if size_ml == 591 and rng.random() < 0.5 else 0)
+
+    composition: List[Dict[str, Any]] = []
+    defaults: Dict[str, Any] = {"espresso_shots": shots}
+    used_ml = 0
+    if temperature == "iced":
+        ice_pct = rng.choice([0.6, 0.65, 0.7])
+        ice_ml = int(round(size_ml * ice_pct))
+        defaults["ice_pct"] = ice_pct
+        composition.append({"ingredient_id": "ice", "amount_ml": ice_ml})
+        used_ml += ice_ml
+    composition.append({"ingredient_id": "espresso_shot", "amount_shots": shots})
+
+    flavor_word = ""
+    if uses_syrup and kinds["syrup"]:
+        syrup_id = "syrup_chocolate" if family == "mocha" and "syrup_chocolate" in kinds["syrup"] else rng.choice(kinds["syrup"])
+        pumps = {355: 3, 473: 4, 591: 5}[size_ml]
+        defaults.update({"syrup_id": syrup_id, "syrup_pumps": pumps})
+        composition.append({"ingredient_id": syrup_id, "amount_pumps": pumps})
+        flavor_word = syrup_id.replace("syrup_", "").replace("_", " ").title() + " "
+    if uses_sauce and kinds["sauce"]:
+        sauce_id = rng.choice(kinds["sauce"])
+        pumps = {355: 2, 473: 3, 591: 4}[size_ml]
+        defaults.update({"sauce_id": sauce_id, "sauce_pumps": pumps})
+        composition.append({"ingredient_id": sauce_id, "amount_pumps": pumps})
+        flavor_word = sauce_id.replace("sauce_", "").replace("_", " ").title() + " "
+
+    # Liquid base fills what is left of the cup (ml rows never exceed size_ml).
+    remaining = max(0, size_ml - used_ml - shots * 30)
+    if uses_milk and kinds["milk"]:
+        milk_id = rng.choice(kinds["milk"])
+        defaults["milk_id"] = milk_id
+        composition.append({"ingredient_id": milk_id, "amount_ml": remaining})
+    elif uses_water:
+        composition.append({"ingredient_id": "water", "amount_ml": remaining})
+
+    options: Dict[str, Any] = {}
+    if uses_milk and kinds["milk"]:
+        options["milks"] = sorted(set(rng.sample(kinds["milk"], min(6, len(kinds["milk"]))) + [defaults["milk_id"]]))
+    if uses_syrup and kinds["syrup"]:
+        options["syrups"] = sorted(set(rng.sample(kinds["syrup"], min(4, len(kinds["syrup"]))) + [defaults["syrup_id"]]))
+    if uses_sauce and kinds["sauce"]:
+        options["sauces"] = sorted(set(rng.sample(kinds["sauce"], min(3, len(kinds["sauce"]))) + [defaults["sauce_id"]]))
+
+    temp_word = "Iced " if temperature == "iced" else ""
+    doc: Dict[str, Any] = {
+        "_id": f"{temperature}_{family}_{size_name.lower()}_{k:08d}",
+        "name": f"{temp_word}{flavor_word}{family_name} ({size_name}) #{k:08d}",
+        "category": "seasonal" if seasonal else "core",
+        "temperature": temperature,
+        "size_ml": size_ml,
+        "recipe_ok": rng.random() < 0.9,
+        "defaults": defaults,
+        "composition": composition,
+    }
+    if seasonal:
+        doc["season"] = sorted(rng.sample(SEASONS, rng.choice([1, 1, 2])))
+    if options:
+        doc["options"] = options
+    return doc
+
+
+def generate_recipes(n: int, ingredients: List[Dict[str, Any]], seed: int = 42, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield recipes `start` .. `start + n - 1`."""
+    kinds = _by_kind(ingredients)
+    for k in range(start, start + n):
+        yield recipe_at(k, kinds, seed)
+
+
+def generate_inventory(ingredients: Iterable[Dict[str, Any]], seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """One inventory doc per ingredient, shaped like inventory.json."""
+    rng = random.Random(seed + 1)
+    for ing in ingredients:
+        unit = "ml" if ing.get("unit") == "ml" else str(ing.get("unit") or "unit")
+        scale = 1000 if unit == "ml" else 10
+        par = rng.randint(20, 300) * scale
+        rop = int(par * rng.uniform(0.25, 0.45))
+        on_hand = rng.randint(0, par)
+        yield {
+            "_id": ing["_id"],
+            "ingredient_id": ing["_id"],
+            "stock_unit": unit,
+            "on_hand": on_hand,
+            "reserved": 0,
+            "available": on_hand,
+            "par_level": par,
+            "reorder_point": rop,
+            "preferred_reorder_qty": par - rop,
+            "lead_time_days": rng.randint(1, 7),
+            "transactions": [],
+        }
+
+
+def generate_orders(
+    n: int,
+    n_recipes: int,
+    ingredients: List[Dict[str, Any]],
+    seed: int = 42,
+    stores: int = 20,
+    start: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield `n` time-ordered orders referencing recipes 0 .. n_recipes - 1.
+
+    Popularity is skewed (a few drinks dominate) and ~30% of line items carry a
+    customization drawn from the recipe's own options.
+    """
+    rng = random.Random(seed + 2)
+    kinds = _by_kind(ingredients)
+    ts = start or datetime(2025, 1, 1, 6, 0, tzinfo=timezone.utc)
+    for i in range(n):
+        ts += timedelta(seconds=rng.expovariate(1 / 20))
+        items = []
+        for _ in range(rng.choice([1, 1, 1, 2, 2, 3])):
+            k = min(n_recipes - 1, int(rng.paretovariate(1.2)) - 1) if rng.random() < 0.6 else rng.randrange(n_recipes)
+            recipe = recipe_at(k, kinds, seed)
+            item: Dict[str, Any] = {"recipe_id": recipe["_id"], "qty": rng.choice([1, 1, 1, 2])}
+            opts = recipe.get("options", {})
+            if rng.random() < 0.3:
+                if opts.get("milks"):
+                    item["milk_id"] = rng.choice(opts["milks"])
+                if opts.get("syrups"):
+                    item["syrup_id"] = rng.choice(opts["syrups"])
+                item["extra_shots"] = rng.choice([0, 1])
+            items.append(item)
+        yield {
+            "_id": f"order_{i:010d}",
+            "ts": ts.isoformat(timespec="seconds"),
+            "store_id": f"store_{rng.randrange(stores):03d}",
+            "items": items,
+            "total_items": sum(x["qty"] for x in items),
+        }
+
+
+def write_jsonl(path: Path, docs: Iterable[Dict[str, Any]]) -> int:
+    """Stream docs to a JSONL file one line at a time; returns the count written."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json.dumps(doc, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic Cafe Crunch data as JSONL.")
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--ingredients", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=Path("data"))
+    args = parser.parse_args(argv)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    ings = generate_ingredients(args.ingredients, args.seed)
+    written = {
+        "ingredients": write_jsonl(args.out / "ingredients.jsonl", ings),
+        "inventory": write_jsonl(args.out / "inventory.jsonl", generate_inventory(ings, args.seed)),
+        "recipes": write_jsonl(args.out / "recipes.jsonl", generate_recipes(args.recipes, ings, args.seed)),
+    }
+    if args.orders:
+        written["orders"] = write_jsonl(
+            args.out / "orders.jsonl", generate_orders(args.orders, args.recipes, ings, args.seed)
+        )
+    for name, count in written.items():
+        print(f"wrote {count} {name} to {args.out / (name + '.jsonl')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
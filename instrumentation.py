@@ -0,0 +1,250 @@
+"""Per-call query instrumentation for db.py.
+
+Two layers feed the same recorder:
+
+  - QueryListener (a pymongo CommandListener) sees every command the client sends
+    and records its latency, documents returned and reply size in bytes.
+  - @instrumented wraps db.py functions so those commands are attributed to the
+    function that issued them.
+
+Enable with QUERY_METRICS=1 (env or secrets); the listener is attached when
+the MongoClient is created, so turning it on needs a restart. Each page calls start_page_run()
+at the top and query_panel() at the bottom; per-call records go to the
+"cafecrunch.queries" logger as JSON lines, and process-wide totals are written
+in Prometheus text format to QUERY_METRICS_FILE (if set). Add ?debug=queries to
+the page URL to show the sidebar panel.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import bson
+import streamlit as st
+from pymongo import monitoring
+
+from config import flag, setting
+
+log = logging.getLogger("cafecrunch.queries")
+
+_local = threading.local()
+
+# Minimum seconds between rewrites of the Prometheus text file.
+METRICS_FILE_INTERVAL = 10.0
+
+
+def enabled() -> bool:
+    return flag("QUERY_METRICS")
+
+
+def _reply_docs(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "n" in reply and isinstance(reply["n"], int):
+        return reply["n"]
+    return 0
+
+
+def _result_docs(result: Any) -> Optional[int]:
+    if isinstance(result, (list, tuple, dict, set, frozenset)):
+        if isinstance(result, tuple) and result and isinstance(result[0], list):
+            return len(result[0])  # (rows, cursor) from the page_* helpers
+        return len(result)
+    return None
+
+
+class RunRecorder:
+    """Everything one page run sent to MongoDB, grouped by db.py function."""
+
+    def __init__(self, page: str) -> None:
+        self.page = page
+        self.started = time.perf_counter()
+        self.calls: List[Dict[str, Any]] = []
+        self.commands: List[Dict[str, Any]] = []
+        self._stack: List[Dict[str, Any]] = []
+
+    def open_call(self, fn: str) -> Dict[str, Any]:
+        call = {"fn": fn, "ms": 0.0, "docs": None, "commands": 0, "db_ms": 0.0, "reply_docs": 0, "bytes": 0}
+        self._stack.append(call)
+        return call
+
+    def close_call(self, call: Dict[str, Any], ms: float, docs: Optional[int]) -> None:
+        call["ms"] = ms
+        call["docs"] = docs
+        if self._stack and self._stack[-1] is call:
+            self._stack.pop()
+        self.calls.append(call)
+
+    def add_command(self, name: str, ms: float, docs: int, nbytes: int, ok: bool = True) -> None:
+        owner = self._stack[-1]["fn"] if self._stack else None
+        self.commands.append({"command": name, "fn": owner, "ms": ms, "docs": docs, "bytes": nbytes, "ok": ok})
+        if self._stack:
+            call = self._stack[-1]
+            call["commands"] += 1
+            call["db_ms"] += ms
+            call["reply_docs"] += docs
+            call["bytes"] += nbytes
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "page": self.page,
+            "elapsed_ms": (time.perf_counter() - self.started) * 1000,
+            "calls": len(self.calls),
+            "commands": len(self.commands),
+            "db_ms": sum(c["ms"] for c in self.commands),
+            "reply_docs": sum(c["docs"] for c in self.commands),
+            "bytes": sum(c["bytes"] for c in self.commands),
+        }
+
+
+class _Metrics:
+    """Process-wide counters, exported in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_fn: Dict[str, List[float]] = {}
+        self._by_cmd: Dict[str, List[float]] = {}
+        self._written = 0.0
+
+    def observe_call(self, fn: str, seconds: float, docs: int, nbytes: int) -> None:
+        with self._lock:
+            row = self._by_fn.setdefault(fn, [0, 0.0, 0, 0])
+            row[0] += 1
+            row[1] += seconds
+            row[2] += docs
+            row[3] += nbytes
+        self._maybe_write()
+
+    def observe_command(self, name: str, seconds: float, docs: int, nbytes: int) -> None:
+        with self._lock:
+            row = self._by_cmd.setdefault(name, [0, 0.0, 0, 0])
+            row[0] += 1
+            row[1] += seconds
+            row[2] += docs
+            row[3] += nbytes
+
+    def prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for label, table, prefix in (("fn", self._by_fn, "cafecrunch_db_call"), ("command", self._by_cmd, "cafecrunch_mongo_command")):
+                for suffix, i, kind in (("total", 0, "counter"), ("seconds_total", 1, "counter"),
+                                        ("docs_total", 2, "counter"), ("reply_bytes_total", 3, "counter")):
+                    lines.append(f"# TYPE {prefix}_{suffix} {kind}")
+                    for key, row in sorted(table.items()):
+                        lines.append(f'{prefix}_{suffix}{{{label}="{key}"}} {row[i]}')
+        return "\n".join(lines) + "\n"
+
+    def _maybe_write(self) -> None:
+        path = setting("QUERY_METRICS_FILE")
+        now = time.monotonic()
+        with self._lock:
+            if not path or now - self._written < METRICS_FILE_INTERVAL:
+                return
+            self._written = now
+        tmp = f"{path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, path)
+        except OSError as e:
+            # A full disk or bad path must not break the db.py call being measured.
+            log.warning("could not write %s: %s", path, e)
+
+
+METRICS = _Metrics()
+
+
+def current() -> Optional[RunRecorder]:
+    return getattr(_local, "recorder", None)
+
+
+class QueryListener(monitoring.CommandListener):
+    """Attributes every MongoDB command to the active page run and db.py call.
+
+    Only registered when QUERY_METRICS is on, so it never checks the flag itself.
+    pymongo hands over the decoded reply, not its wire size, so reply bytes are
+    measured by re-encoding, and only for commands issued inside a page run.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        rec = current()
+        reply = event.reply
+        docs = _reply_docs(reply)
+        nbytes = len(bson.encode(reply)) if rec is not None else 0
+        ms = event.duration_micros / 1000
+        METRICS.observe_command(event.command_name, ms / 1000, docs, nbytes)
+        if rec is not None:
+            rec.add_command(event.command_name, ms, docs, nbytes)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        rec = current()
+        if rec is not None:
+            rec.add_command(event.command_name, event.duration_micros / 1000, 0, 0, ok=False)
+
+
+def instrumented(fn: Callable) -> Callable:
+    """Record latency, docs returned and reply bytes for each call of a db.py function."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        rec = current()
+        if rec is None:
+            return fn(*args, **kwargs)
+        call = rec.open_call(fn.__qualname__)
+        t0 = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            try:
+                docs = _result_docs(result)
+                rec.close_call(call, ms, docs)
+                METRICS.observe_call(fn.__qualname__, ms / 1000, call["reply_docs"] if docs is None else docs, call["bytes"])
+                log.info(json.dumps({
+                    "page": rec.page, "fn": fn.__qualname__, "ms": round(ms, 2), "docs": docs,
+                    "commands": call["commands"], "db_ms": round(call["db_ms"], 2), "bytes": call["bytes"],
+                }))
+            except Exception:
+                # Telemetry never changes the outcome of the call it measures.
+                log.exception("query instrumentation failed for %s", fn.__qualname__)
+
+    return wrapper
+
+
+def start_page_run(page: str) -> Optional[RunRecorder]:
+    """Begin recording the current script run (no-op unless QUERY_METRICS is on)."""
+    if not enabled():
+        _local.recorder = None
+        return None
+    rec = RunRecorder(page)
+    _local.recorder = rec
+    st.session_state["_query_run"] = rec
+    return rec
+
+
+def query_panel() -> None:
+    """Sidebar table of this run's db.py calls (shown with ?debug=queries)."""
+    rec = current()
+    if rec is None or st.query_params.get("debug") != "queries":
+        return
+    s = rec.summary()
+    with st.sidebar.expander(f"🔍 Queries: {s['commands']} commands, {s['db_ms']:.0f} ms", expanded=True):
+        st.caption(
+            f"{s['calls']} db.py calls · {s['reply_docs']} docs · {s['bytes'] / 1024:.1f} KiB · "
+            f"page run {s['elapsed_ms']:.0f} ms so far"
+        )
+        if rec.calls:
+            st.dataframe(
+                [{k: c[k] for k in ("fn", "ms", "commands", "db_ms", "reply_docs", "bytes")} for c in rec.calls],
+                use_container_width=True,
+                hide_index=True,
+            )
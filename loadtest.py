@@ -0,0 +1,292 @@
+"""Headless load test for the Streamlit pages, built on streamlit.testing.v1.AppTest.
+
+Simulates many barista sessions at once. Each session walks app.py and every
+page through a scripted sequence of interactions (search and select a recipe,
+submit the Customize form, save an inventory count, page through admin tables,
+...) and times every rerun. Sessions run in separate processes: AppTest swaps
+process-wide Streamlit state (the runtime, st.secrets) around every run, so two
+sessions cannot share an interpreter. Each process therefore has its own
+MongoClient pool and st.cache_* caches, which makes the numbers a cold-cache
+upper bound for a single `streamlit run` server.
+
+Per (page, step) it reports rerun latency percentiles and the MongoDB commands
+issued per rerun (from the instrumentation.RunRecorder each run leaves in session
+state).
+
+Usage:
+    python loadtest.py --sessions 50 --iterations 3            # 10k-recipe catalog
+    python loadtest.py --recipes 100000 --pages Menu,Customize
+    python loadtest.py --skip-load --json loadtest.json
+
+Point it at a throwaway server: --uri defaults to mongodb://localhost:27017 and the
+target database (--db, default cafecrunch_load) is dropped and reloaded, and the
+Inventory scenario writes to it.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bench import SEED, _pct, load_catalog
+from generator import generate_inventory
+
+BASE = Path(__file__).parent
+
+Action = Callable[[Any, random.Random, List[str]], Any]
+
+
+# ----------------------------
+# Scenarios
+# ----------------------------
+
+def _by_label(widgets, label: str):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+def _search(key: str) -> Action:
+    return lambda at, rng, terms: at.text_input(key=f"{key}_query").input(rng.choice(terms))
+
+
+def _pick(key: str) -> Action:
+    def act(at, rng, terms):
+        sb = at.selectbox(key=f"{key}_label")
+        if len(sb.options) > 1:
+            sb.set_value(rng.choice(sb.options[1:]))
+    return act
+
+
+def _click(key: str) -> Action:
+    return lambda at, rng, terms: at.button(key=key).click()
+
+
+def _customize(at, rng, terms) -> None:
+    _by_label(at.number_input, "Espresso shots").set_value(rng.randint(0, 4))
+    _by_label(at.button, "Next ➜ See updated nutrition").click()
+
+
+def _inventory_pick(at, rng, terms) -> None:
+    sb = _by_label(at.selectbox, "Ingredient")
+    sb.set_value(rng.choice(sb.options))
+
+
+def _inventory_save(at, rng, terms) -> None:
+    _by_label(at.number_input, "On hand").increment()
+    _by_label(at.button, "Save changes").click()
+
+
+# page name -> (script path, [(step, action before the rerun)]); "load" is the first run.
+SCENARIOS: Dict[str, Tuple[str, List[Tuple[str, Optional[Action]]]]] = {
+    "Home": ("app.py", [("load", None)]),
+    "Menu": ("pages/1_Menu.py", [
+        ("load", None),
+        ("filter", lambda at, rng, terms: _by_label(at.selectbox, "Temperature").set_value(rng.choice(["hot", "iced"]))),
+        ("next page", _click("menu_pager_next")),
+    ]),
+    "Recipe Details": ("pages/2_Recipe_Details.py", [
+        ("load", None),
+        ("search", _search("details_recipe")),
+        ("select recipe", _pick("details_recipe")),
+    ]),
+    "Customize": ("pages/3_Customize.py", [
+        ("load", None),
+        ("search", _search("whatif_recipe")),
+        ("select recipe", _pick("whatif_recipe")),
+        ("submit form", _customize),
+    ]),
+    "Ingredients Admin": ("pages/4_Ingredients_Changes.py", [
+        ("load", None),
+        ("next page", _click("ingredients_pager_next")),
+    ]),
+    "Recipes Admin": ("pages/5_Recipes_Changes.py", [
+        ("load", None),
+        ("next page", _click("recipes_admin_pager_next")),
+    ]),
+    "Inventory": ("pages/6_Inventory.py", [
+        ("load", None),
+        ("select ingredient", _inventory_pick),
+        ("save counts", _inventory_save),
+    ]),
+    "Dashboard": ("pages/7_Dashboard.py", [("load", None)]),
+}
+
+
+# ----------------------------
+# Sessions
+# ----------------------------
+
+def _rerun(at, page: str, step: str, timeout: float) -> Dict[str, Any]:
+    before = at.session_state["_query_run"] if "_query_run" in at.session_state else None
+    t0 = time.perf_counter()
+    error = None
+    try:
+        at.run(timeout=timeout)
+        if at.exception:
+            error = at.exception[0].message
+    except Exception as e:  # timeouts, widget lookups on a page that failed to render
+        error = f"{type(e).__name__}: {e}"
+    ms = (time.perf_counter() - t0) * 1000
+    rec = at.session_state["_query_run"] if "_query_run" in at.session_state else None
+    fresh = rec is not None and rec is not before
+    return {
+        "page": page,
+        "step": step,
+        "ms": ms,
+        "commands": len(rec.commands) if fresh else None,
+        "db_ms": sum(c["ms"] for c in rec.commands) if fresh else None,
+        "error": error,
+    }
+
+
+def search_terms(db, n: int = 200) -> List[str]:
+    """What the baristas type into the recipe pickers: the first letters of real recipe names."""
+    names = [d["name"] for d in db["recipes"].find({"name": {"$type": "string"}}, {"name": 1}).limit(n)]
+    rng = random.Random(len(names))
+    return sorted({name[: rng.randint(3, 8)] for name in names}) or ["a"]
+
+
+def run_session(
+    n: int, pages: List[str], iterations: int, timeout: float, seed: int, terms: List[str], delay: float = 0.0
+) -> List[Dict[str, Any]]:
+    """One simulated barista: every page's scenario, `iterations` times, in one session per page."""
+    from streamlit.testing.v1 import AppTest
+
+    time.sleep(delay)
+    rng = random.Random(seed * 1000 + n)
+    apps: Dict[str, Any] = {}
+    out: List[Dict[str, Any]] = []
+    for _ in range(iterations):
+        for page in pages:
+            path, steps = SCENARIOS[page]
+            at = apps.setdefault(page, AppTest.from_file(str(BASE / path), default_timeout=timeout))
+            for step, action in steps:
+                if action is not None:
+                    try:
+                        action(at, rng, terms)
+                    except Exception as e:
+                        out.append({"page": page, "step": step, "ms": 0.0, "commands": None, "db_ms": None,
+                                    "error": f"{type(e).__name__}: {e}"})
+                        break
+                out.append(_rerun(at, page, step, timeout))
+    return out
+
+
+# ----------------------------
+# Report
+# ----------------------------
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Latency percentiles and Mongo commands per rerun for every (page, step)."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for r in records:
+        groups.setdefault(f"{r['page']} / {r['step']}", []).append(r)
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, rows in groups.items():
+        ok = [r for r in rows if not r["error"]]
+        ms = [r["ms"] for r in ok] or [0.0]
+        cmds = [r["commands"] for r in ok if r["commands"] is not None]
+        db_ms = [r["db_ms"] for r in ok if r["db_ms"] is not None]
+        out[name] = {
+            "reruns": len(rows),
+            "errors": len(rows) - len(ok),
+            "p50_ms": _pct(ms, 0.50),
+            "p95_ms": _pct(ms, 0.95),
+            "p99_ms": _pct(ms, 0.99),
+            "max_ms": max(ms),
+            "mongo_ops": statistics.fmean(cmds) if cmds else None,
+            "db_ms": statistics.fmean(db_ms) if db_ms else None,
+        }
+    return out
+
+
+def format_table(summary: Dict[str, Dict[str, Any]]) -> str:
+    lines = [f"{'page / step':40} {'reruns':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'ops':>6} {'db ms':>8}"]
+    for name, r in summary.items():
+        ops = f"{r['mongo_ops']:.1f}" if r["mongo_ops"] is not None else "-"
+        db_ms = f"{r['db_ms']:.1f}" if r["db_ms"] is not None else "-"
+        lines.append(
+            f"{name:40} {r['reruns']:>6} {r['errors']:>4} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+            f"{r['p99_ms']:>9.1f} {r['max_ms']:>9.1f} {ops:>6} {db_ms:>8}"
+        )
+    return "\n".join(lines)
+
+
+def _install_secrets(values: Dict[str, Any]) -> None:
+    """Set st.secrets once per worker process instead of passing them to each AppTest."""
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+
+    secrets = Secrets([])
+    secrets._secrets = values
+    st.secrets = secrets
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the Streamlit pages with concurrent AppTest sessions.")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="cafecrunch_load")
+    parser.add_argument("--recipes", type=int, default=10000, help="size of the generated catalog")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the catalog from a previous run")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=3, help="passes over the pages per session")
+    parser.add_argument("--pages", default="", help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which sessions start")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-rerun timeout in seconds")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--json", type=Path, help="also write raw records and the summary here")
+    args = parser.parse_args(argv)
+
+    pages = [p.strip() for p in args.pages.split(",") if p.strip()] or list(SCENARIOS)
+    unknown = [p for p in pages if p not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown pages: {', '.join(unknown)}")
+
+    # config.setting() reads the environment first; st.secrets just mirrors it for the pages.
+    os.environ.update({"MONGO_URI": args.uri, "DB_NAME": args.db, "QUERY_METRICS": "1"})
+    secrets = {"MONGO_URI": args.uri, "DB_NAME": args.db}
+
+    from pymongo import MongoClient
+
+    db = MongoClient(args.uri)[args.db]
+    if not args.skip_load:
+        t0 = time.perf_counter()
+        load_catalog(db, args.recipes, args.seed)
+        db.drop_collection("inventory")
+        db["inventory"].insert_many(list(generate_inventory(db["ingredients"].find({}), args.seed)))
+        print(f"loaded {args.recipes} recipes into {args.db} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    terms = search_terms(db)
+    records: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.sessions, initializer=_install_secrets, initargs=(secrets,)) as pool:
+        futures = [
+            pool.submit(run_session, n, pages, args.iterations, args.timeout, args.seed, terms,
+                        args.ramp * n / max(1, args.sessions))
+            for n in range(args.sessions)
+        ]
+        for f in futures:
+            records.extend(f.result())
+    wall = time.perf_counter() - t0
+
+    summary = summarize(records)
+    print(format_table(summary))
+    errors = sum(1 for r in records if r["error"])
+    print(f"\n{args.sessions} sessions, {len(records)} reruns in {wall:.1f}s ({len(records) / wall:.1f} reruns/s), {errors} errors")
+    for msg in sorted({r["error"] for r in records if r["error"]})[:10]:
+        print(f"  {msg}")
+
+    if args.json:
+        args.json.write_text(json.dumps({"summary": summary, "records": records}, indent=2))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,798 @@
+"""In-memory stand-in for MongoClient, for offline / dev mode.
+
+Select it with BACKEND=memory (env or secrets); db.get_client() then returns a
+MemoryClient instead of connecting to Atlas. The DB_NAME database is seeded
+lazily from the JSON / JSONL files next to this module (ingredients.json,
+recipes.json, inventory.json, ... - one collection per file, loaded on first
+access), so startup costs nothing and only the collections a page touches are
+read. Writes live in memory for the life of the process.
+
+It implements only the part of the pymongo API this repo sends:
+
+  - find / find_one with projections, sort, limit, batch_size and a
+    case-insensitive collation (strength <= 2)
+  - count_documents, estimated_document_count
+  - insert_one / insert_many, replace_one, update_one, find_one_and_update,
+    delete_one / delete_many, bulk_write of ReplaceOne / UpdateOne
+  - aggregate with $match, $unwind, $group ($sum, $push), $sort, $limit,
+    $project, $addFields and $lookup
+  - create_index (recorded, not used for planning)
+  - query operators $eq $gt $gte $lt $lte $in $exists $regex $type $and $or;
+    update operators $set $unset $inc $push; expressions $cond, comparisons,
+    $multiply $divide $round
+
+Anything else raises OperationFailure, the same as an unsupported server
+feature would; extend it together with tests/test_memstore_parity.py, which
+runs db.py against both this and a real mongod. Results are pymongo's own
+result and error classes.
+"""
+import copy
+import datetime
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, WriteError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from validate import read_docs
+
+SEED_DIR = Path(__file__).parent
+
+_MISSING = object()
+Fold = Optional[Callable[[str], str]]
+
+
+# ----------------------------
+# Values, paths, ordering
+# ----------------------------
+
+def _type_rank(v: Any) -> int:
+    """BSON comparison order: null < numbers < strings < objects < arrays < ... < bool < dates."""
+    if v is None or v is _MISSING:
+        return 1
+    if isinstance(v, bool):
+        return 8
+    if isinstance(v, (int, float)):
+        return 2
+    if isinstance(v, str):
+        return 3
+    if isinstance(v, dict):
+        return 4
+    if isinstance(v, (list, tuple)):
+        return 5
+    if isinstance(v, bytes):
+        return 6
+    if isinstance(v, ObjectId):
+        return 7
+    if isinstance(v, datetime.datetime):
+        return 9
+    return 10
+
+
+def _key(v: Any, fold: Fold = None) -> Tuple:
+    rank = _type_rank(v)
+    if rank == 1:
+        return (1, 0)
+    if rank == 3 and fold:
+        return (3, fold(v))
+    if rank == 4:
+        return (4, tuple((k, _key(x, fold)) for k, x in v.items()))
+    if rank == 5:
+        return (5, tuple(_key(x, fold) for x in v))
+    if rank == 10:
+        return (10, str(v))
+    return (rank, v)
+
+
+def _eq(a: Any, b: Any, fold: Fold = None) -> bool:
+    if a is _MISSING:
+        a = None
+    return _key(a, fold) == _key(b, fold)
+
+
+def _resolve(val: Any, parts: List[str]) -> List[Any]:
+    """Every value at a dotted path, descending into arrays the way MongoDB queries do."""
+    if not parts:
+        return [val]
+    head, rest = parts[0], parts[1:]
+    if isinstance(val, dict):
+        return _resolve(val[head], rest) if head in val else []
+    if isinstance(val, list):
+        out: List[Any] = []
+        if head.isdigit() and int(head) < len(val):
+            out.extend(_resolve(val[int(head)], rest))
+        for item in val:
+            if isinstance(item, dict):
+                out.extend(_resolve(item, parts))
+        return out
+    return []
+
+
+def _get(doc: Dict[str, Any], path: str) -> Any:
+    """Value of a dotted path for aggregation expressions (arrays of subdocs map to arrays)."""
+    val: Any = doc
+    for part in path.split("."):
+        if isinstance(val, dict):
+            val = val.get(part, _MISSING)
+        elif isinstance(val, list):
+            val = [x.get(part) for x in val if isinstance(x, dict) and part in x]
+        else:
+            return _MISSING
+        if val is _MISSING:
+            return _MISSING
+    return val
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        nxt = doc.get(part)
+        if not isinstance(nxt, dict):
+            nxt = doc[part] = {}
+        doc = nxt
+    doc[parts[-1]] = value
+
+
+def _unset(doc: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+# ----------------------------
+# Query matching
+# ----------------------------
+
+_TYPE_ALIASES = {
+    "double": (float,), "string": (str,), "object": (dict,), "array": (list,), "bool": (bool,),
+    "null": (type(None),), "int": (int,), "long": (int,), "number": (int, float),
+}
+
+
+def _is_type(v: Any, alias: Any) -> bool:
+    types = _TYPE_ALIASES.get(alias)
+    if types is None:
+        raise OperationFailure(f"unknown $type {alias!r}")
+    if isinstance(v, bool) and bool not in types:
+        return False
+    return isinstance(v, types)
+
+
+def _regex(pattern: Any, options: str = "") -> "re.Pattern":
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for ch in options or "":
+        flags |= {"i": re.I, "m": re.M, "s": re.S, "x": re.X}.get(ch, 0)
+    return re.compile(pattern, flags)
+
+
+def _compare(op: str, cands: List[Any], target: Any, fold: Fold) -> bool:
+    tk = _key(target, fold)
+    for c in cands:
+        ck = _key(c, fold)
+        if ck[0] != tk[0]:
+            continue
+        if (op == "$gt" and ck > tk) or (op == "$gte" and ck >= tk) or \
+           (op == "$lt" and ck < tk) or (op == "$lte" and ck <= tk):
+            return True
+    return False
+
+
+def _match_value(values: List[Any], cond: Any, fold: Fold) -> bool:
+    """Does a field (all its resolved `values`) satisfy `cond` (a literal or {$op: ...})?"""
+    cands: List[Any] = []
+    for v in values:
+        cands.append(v)
+        if isinstance(v, list):
+            cands.extend(v)
+
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        options = cond.get("$options", "")
+        for op, arg in cond.items():
+            if op == "$options":
+                continue
+            if op == "$eq":
+                ok = _match_value(values, arg, fold) if not isinstance(arg, dict) else any(_eq(c, arg, fold) for c in cands)
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                ok = _compare(op, cands, arg, fold)
+            elif op == "$in":
+                ok = any(_match_value(values, a, fold) for a in arg)
+            elif op == "$exists":
+                ok = bool(values) == bool(arg)
+            elif op == "$regex":
+                rx = _regex(arg, options)
+                ok = any(isinstance(c, str) and rx.search(c) for c in cands)
+            elif op == "$type":
+                aliases = arg if isinstance(arg, list) else [arg]
+                ok = any(_is_type(c, a) for c in cands for a in aliases)
+            else:
+                raise OperationFailure(f"unknown operator: {op}")
+            if not ok:
+                return False
+        return True
+
+    if isinstance(cond, re.Pattern):
+        return any(isinstance(c, str) and cond.search(c) for c in cands)
+    if cond is None and not values:
+        return True
+    return any(_eq(c, cond, fold) for c in cands)
+
+
+def _matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]], fold: Fold = None) -> bool:
+    for field, cond in (query or {}).items():
+        if field == "$and":
+            ok = all(_matches(doc, q, fold) for q in cond)
+        elif field == "$or":
+            ok = any(_matches(doc, q, fold) for q in cond)
+        elif field.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {field}")
+        else:
+            ok = _match_value(_resolve(doc, field.split(".")), cond, fold)
+        if not ok:
+            return False
+    return True
+
+
+def _fold_for(collation: Any) -> Fold:
+    if collation is None:
+        return None
+    spec = collation.document if hasattr(collation, "document") else dict(collation)
+    return str.casefold if spec.get("strength", 3) <= 2 else None
+
+
+# ----------------------------
+# Projection, sorting, updates
+# ----------------------------
+
+def _project(doc: Dict[str, Any], projection: Any) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {k: 1 for k in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out: Dict[str, Any] = {}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = copy.deepcopy(doc["_id"])
+        for path in include:
+            val = _get(doc, path)
+            if val is not _MISSING:
+                _set(out, path, copy.deepcopy(val))
+        return out
+    out = copy.deepcopy(doc)
+    for path, v in projection.items():
+        if not v:
+            _unset(out, path)
+    return out
+
+
+def _sort_spec(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(k, d) for k, d in key_or_list]
+
+
+def _sorted(docs: List[Dict[str, Any]], spec: List[Tuple[str, int]], fold: Fold = None) -> List[Dict[str, Any]]:
+    for field, direction in reversed(spec):
+        docs = sorted(docs, key=lambda d: _key(_get(d, field), fold), reverse=direction < 0)
+    return docs
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any]) -> None:
+    for op, fields in update.items():
+        if not op.startswith("$"):
+            raise WriteError("update document requires atomic operators", code=9)
+        for path, arg in fields.items():
+            if op == "$set":
+                _set(doc, path, copy.deepcopy(arg))
+            elif op == "$unset":
+                _unset(doc, path)
+            elif op == "$inc":
+                cur = _get(doc, path)
+                _set(doc, path, (0 if cur is _MISSING else cur) + arg)
+            elif op == "$push":
+                cur = _get(doc, path)
+                _set(doc, path, (list(cur) if isinstance(cur, list) else []) + [copy.deepcopy(arg)])
+            else:
+                raise WriteError(f"unknown update operator: {op}", code=9)
+
+
+def _upsert_seed(query: Dict[str, Any]) -> Dict[str, Any]:
+    """The equality fields of a filter, which MongoDB copies into an upserted document."""
+    doc: Dict[str, Any] = {}
+    for field, cond in query.items():
+        if field == "$and":
+            for q in cond:
+                doc.update(_upsert_seed(q))
+        elif not field.startswith("$"):
+            if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+                if "$eq" in cond:
+                    _set(doc, field, copy.deepcopy(cond["$eq"]))
+            else:
+                _set(doc, field, copy.deepcopy(cond))
+    return doc
+
+
+# ----------------------------
+# Aggregation expressions
+# ----------------------------
+
+def _num(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _expr(e: Any, doc: Dict[str, Any]) -> Any:
+    if isinstance(e, str) and e.startswith("$"):
+        val = _get(doc, e[1:])
+        return None if val is _MISSING else val
+    if isinstance(e, list):
+        return [_expr(x, doc) for x in e]
+    if not isinstance(e, dict):
+        return e
+    if len(e) == 1:
+        op, arg = next(iter(e.items()))
+        if op.startswith("$"):
+            return _operator(op, arg, doc)
+    return {k: _expr(v, doc) for k, v in e.items()}
+
+
+def _operator(op: str, arg: Any, doc: Dict[str, Any]) -> Any:
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg["if"], arg["then"], arg["else"]]
+        return _expr(arg[1], doc) if _truthy(_expr(arg[0], doc)) else _expr(arg[2], doc)
+
+    args = [_expr(a, doc) for a in arg] if isinstance(arg, list) else [_expr(arg, doc)]
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        a, b = _key(args[0]), _key(args[1])
+        return {"$eq": a == b, "$ne": a != b, "$gt": a > b, "$gte": a >= b, "$lt": a < b, "$lte": a <= b}[op]
+    if op == "$multiply":
+        if any(a is None for a in args):
+            return None
+        total = 1
+        for a in args:
+            total *= a
+        return total
+    if op == "$divide":
+        a, b = args
+        if a is None or b is None:
+            return None
+        if b == 0:
+            raise OperationFailure("can't divide by zero")
+        return a / b
+    if op == "$round":
+        val, places = args[0], int(args[1]) if len(args) > 1 else 0
+        return None if val is None else round(val, places)
+    raise OperationFailure(f"Unrecognized expression '{op}'")
+
+
+def _truthy(v: Any) -> bool:
+    return v not in (None, False, 0, _MISSING)
+
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Tuple, Dict[str, Any]] = {}
+    values: Dict[Tuple, Dict[str, List[Any]]] = {}
+    fields = {k: v for k, v in spec.items() if k != "_id"}
+    for doc in docs:
+        gid = _expr(spec["_id"], doc)
+        gk = _key(gid)
+        if gk not in groups:
+            groups[gk] = {"_id": gid}
+            values[gk] = {k: [] for k in fields}
+        for name, acc in fields.items():
+            (op, arg), = acc.items()
+            values[gk][name].append(_expr(arg, doc))
+    out = []
+    for gk, row in groups.items():
+        for name, acc in fields.items():
+            op = next(iter(acc))
+            vals = values[gk][name]
+            if op == "$sum":
+                row[name] = sum(v for v in vals if _num(v))
+            elif op == "$push":
+                row[name] = vals
+            else:
+                raise OperationFailure(f"unknown group operator '{op}'")
+        out.append(row)
+    return out
+
+
+def _unwind(docs: List[Dict[str, Any]], spec: Any) -> Iterator[Dict[str, Any]]:
+    path = spec if isinstance(spec, str) else spec["path"]
+    keep_empty = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays", False)
+    path = path[1:]
+    for doc in docs:
+        val = _get(doc, path)
+        if isinstance(val, list) and val:
+            for item in val:
+                out = copy.copy(doc)
+                _set_copy(out, path, item)
+                yield out
+        elif isinstance(val, list) or val is _MISSING or val is None:
+            if keep_empty:
+                yield doc
+        else:
+            yield doc
+
+
+def _set_copy(doc: Dict[str, Any], path: str, value: Any) -> None:
+    """_set on a shallow copy, copying each parent dict on the way so the source doc is untouched."""
+    parts = path.split(".")
+    for part in parts[:-1]:
+        nxt = dict(doc.get(part) or {})
+        doc[part] = nxt
+        doc = nxt
+    doc[parts[-1]] = value
+
+
+# ----------------------------
+# Client / database / collection
+# ----------------------------
+
+class MemoryCursor:
+    """Lazy find() result; options can be chained until the first iteration."""
+
+    def __init__(self, coll: "MemoryCollection", query: Optional[Dict[str, Any]], projection: Any) -> None:
+        self._coll = coll
+        self._query = query or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+        self._fold: Fold = None
+        self._it: Optional[Iterator[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def limit(self, n: int) -> "MemoryCursor":
+        self._limit = int(n)
+        return self
+
+    def batch_size(self, n: int) -> "MemoryCursor":
+        return self
+
+    def collation(self, collation: Any) -> "MemoryCursor":
+        self._fold = _fold_for(collation)
+        return self
+
+    def _run(self) -> Iterator[Dict[str, Any]]:
+        docs = [d for d in self._coll._snapshot() if _matches(d, self._query, self._fold)]
+        if self._sort:
+            docs = _sorted(docs, self._sort, self._fold)
+        if self._limit:
+            docs = docs[: abs(self._limit)]
+        return (_project(d, self._projection) for d in docs)
+
+    def __iter__(self) -> "MemoryCursor":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._it is None:
+            self._it = self._run()
+        return next(self._it)
+
+    def close(self) -> None:
+        self._it = iter(())
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str) -> None:
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[str, Any]] = {"_id_": {"key": [("_id", 1)]}}
+        self._lock = threading.RLock()
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        # Writes swap in new dicts instead of mutating, so readers can use the refs unlocked.
+        with self._lock:
+            return list(self._docs.values())
+
+    def _load(self, docs: Iterable[Dict[str, Any]]) -> None:
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            self._docs[doc["_id"]] = doc
+
+    # -- reads --
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Any = None, **kwargs: Any) -> MemoryCursor:
+        cur = MemoryCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cur.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cur.limit(kwargs["limit"])
+        if kwargs.get("collation"):
+            cur.collation(kwargs["collation"])
+        return cur
+
+    def find_one(self, filter: Any = None, projection: Any = None, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        if not kwargs and isinstance(filter, dict) and set(filter) == {"_id"} and not isinstance(filter["_id"], dict):
+            doc = self._docs.get(filter["_id"])
+            return None if doc is None else _project(doc, projection)
+        return next(self.find(filter, projection, **kwargs).limit(1), None)
+
+    def count_documents(self, filter: Dict[str, Any], **kwargs: Any) -> int:
+        return sum(1 for d in self._snapshot() if _matches(d, filter, _fold_for(kwargs.get("collation"))))
+
+    def estimated_document_count(self, **kwargs: Any) -> int:
+        return len(self._docs)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        docs: List[Dict[str, Any]] = self._snapshot()
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [d for d in docs if _matches(d, spec)]
+            elif name == "$unwind":
+                docs = list(_unwind(docs, spec))
+            elif name == "$group":
+                docs = _group(docs, spec)
+            elif name == "$sort":
+                docs = _sorted(docs, _sort_spec(spec))
+            elif name == "$limit":
+                docs = docs[: int(spec)]
+            elif name == "$addFields":
+                out = []
+                for d in docs:
+                    d = copy.copy(d)
+                    for path, e in spec.items():
+                        _set_copy(d, path, _expr(e, d))
+                    out.append(d)
+                docs = out
+            elif name == "$project":
+                docs = [self._project_stage(d, spec) for d in docs]
+            elif name == "$lookup":
+                # Hash join: index the foreign side once by every value of foreignField.
+                by_value: Dict[Tuple, List[Dict[str, Any]]] = {}
+                for f in self.database[spec["from"]]._snapshot():
+                    vals = _resolve(f, spec["foreignField"].split("."))
+                    for x in {_key(x): x for v in vals for x in (v if isinstance(v, list) else [v])} or {_key(None): None}:
+                        by_value.setdefault(x, []).append(f)
+                out = []
+                for d in docs:
+                    local = _resolve(d, spec["localField"].split("."))
+                    local = [x for v in local for x in (v if isinstance(v, list) else [v])] or [None]
+                    hits = list({id(f): f for v in local for f in by_value.get(_key(v), [])}.values())
+                    d = copy.copy(d)
+                    _set_copy(d, spec["as"], hits)
+                    out.append(d)
+                docs = out
+            else:
+                raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'")
+        return iter([copy.deepcopy(d) for d in docs])
+
+    @staticmethod
+    def _project_stage(doc: Dict[str, Any], spec: Dict[str, Any]) -> Dict[str, Any]:
+        flags = {k: v for k, v in spec.items() if isinstance(v, (bool, int)) and not isinstance(v, float)}
+        computed = {k: v for k, v in spec.items() if k not in flags}
+        if not computed and not any(v for k, v in flags.items() if k != "_id"):
+            return _project(doc, flags)  # exclusion
+        out: Dict[str, Any] = {}
+        if flags.get("_id", 1) and "_id" not in computed and "_id" in doc:
+            out["_id"] = copy.deepcopy(doc["_id"])
+        for path, v in flags.items():
+            val = _get(doc, path) if v and path != "_id" else _MISSING
+            if val is not _MISSING:
+                _set(out, path, copy.deepcopy(val))
+        for path, e in computed.items():
+            _set(out, path, _expr(e, doc))
+        return out
+
+    # -- writes --
+    def create_index(self, keys: Any, **kwargs: Any) -> str:
+        spec = _sort_spec(keys)
+        name = kwargs.get("name") or "_".join(f"{k}_{d}" for k, d in spec)
+        with self._lock:
+            self._indexes[name] = {"key": spec, **{k: v for k, v in kwargs.items() if k != "name"}}
+        return name
+
+    def _insert(self, doc: Dict[str, Any]) -> Any:
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} dup key: {{ _id: {doc['_id']!r} }}", 11000)
+        self._docs[doc["_id"]] = doc
+        return doc["_id"]
+
+    def insert_one(self, document: Dict[str, Any], **kwargs: Any) -> InsertOneResult:
+        with self._lock:
+            _id = self._insert(document)
+        document.setdefault("_id", _id)
+        return InsertOneResult(_id, True)
+
+    def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True, **kwargs: Any) -> InsertManyResult:
+        docs = list(documents)
+        ids: List[Any] = []
+        errors: List[Dict[str, Any]] = []
+        with self._lock:
+            for i, doc in enumerate(docs):
+                try:
+                    ids.append(self._insert(doc))
+                    doc.setdefault("_id", ids[-1])
+                except DuplicateKeyError as e:
+                    errors.append({"index": i, "code": 11000, "errmsg": str(e), "op": doc})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": len(ids),
+                                  "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+        return InsertManyResult(ids, True)
+
+    def _write_one(self, query: Dict[str, Any], replacement: Optional[Dict[str, Any]],
+                   update: Optional[Dict[str, Any]], upsert: bool) -> Dict[str, Any]:
+        """Replace or update the first match (caller holds the lock); returns raw counts."""
+        target = None
+        if set(query) == {"_id"} and not isinstance(query["_id"], dict):
+            target = self._docs.get(query["_id"])
+        else:
+            target = next((d for d in self._docs.values() if _matches(d, query)), None)
+
+        if target is None:
+            if not upsert:
+                return {"n": 0, "nModified": 0}
+            doc = _upsert_seed(query)
+            if replacement is not None:
+                doc = {**({"_id": doc["_id"]} if "_id" in doc else {}), **copy.deepcopy(replacement)}
+            else:
+                _apply_update(doc, update)
+            _id = self._insert(doc)
+            return {"n": 1, "nModified": 0, "upserted": _id}
+
+        if replacement is not None:
+            new = copy.deepcopy(replacement)
+            if "_id" in new and new["_id"] != target["_id"]:
+                raise WriteError("the (immutable) field '_id' was found to have been altered", code=66)
+            new["_id"] = target["_id"]
+        else:
+            new = copy.deepcopy(target)
+            _apply_update(new, update)
+        modified = new != target
+        if modified:
+            self._docs[target["_id"]] = new
+        return {"n": 1, "nModified": int(modified)}
+
+    def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        with self._lock:
+            return UpdateResult(self._write_one(filter, replacement, None, upsert), True)
+
+    def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        with self._lock:
+            return UpdateResult(self._write_one(filter, None, update, upsert), True)
+
+    def find_one_and_update(self, filter: Dict[str, Any], update: Dict[str, Any], projection: Any = None,
+                            upsert: bool = False, return_document: bool = False, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        """return_document=ReturnDocument.AFTER (True) returns the updated document."""
+        with self._lock:
+            before = self.find_one(filter)
+            raw = self._write_one(filter, None, update, upsert)
+            if return_document:
+                _id = raw.get("upserted", before["_id"] if before else None)
+                after = self._docs.get(_id)
+                return None if after is None else _project(after, projection)
+            return None if before is None else _project(before, projection)
+
+    def delete_one(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        with self._lock:
+            doc = self.find_one(filter, {"_id": 1})
+            if doc is None:
+                return DeleteResult({"n": 0}, True)
+            del self._docs[doc["_id"]]
+            return DeleteResult({"n": 1}, True)
+
+    def delete_many(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        with self._lock:
+            ids = [d["_id"] for d in self._docs.values() if _matches(d, filter)]
+            for _id in ids:
+                del self._docs[_id]
+            return DeleteResult({"n": len(ids)}, True)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs: Any) -> BulkWriteResult:
+        raw: Dict[str, Any] = {"writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+                               "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        with self._lock:
+            for i, op in enumerate(requests):
+                kind = type(op).__name__
+                try:
+                    if kind == "ReplaceOne":
+                        res = self._write_one(op._filter, op._doc, None, op._upsert)
+                    elif kind == "UpdateOne":
+                        res = self._write_one(op._filter, None, op._doc, op._upsert)
+                    else:
+                        raise OperationFailure(f"unsupported bulk operation {kind}")
+                    if "upserted" in res:
+                        raw["nUpserted"] += 1
+                        raw["upserted"].append({"index": i, "_id": res["upserted"]})
+                    else:
+                        raw["nMatched"] += res["n"]
+                        raw["nModified"] += res["nModified"]
+                except (DuplicateKeyError, WriteError) as e:
+                    raw["writeErrors"].append({"index": i, "code": e.code, "errmsg": str(e), "op": getattr(op, "_doc", None)})
+                    if ordered:
+                        break
+        if raw["writeErrors"]:
+            raise BulkWriteError(raw)
+        return BulkWriteResult(raw, True)
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str, seed_dir: Optional[Path] = None) -> None:
+        self.client = client
+        self.name = name
+        self._seed_dir = seed_dir
+        self._colls: Dict[str, MemoryCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        coll = self._colls.get(name)
+        if coll is not None:
+            return coll
+        with self._lock:
+            if name not in self._colls:
+                coll = MemoryCollection(self, name)
+                if self._seed_dir is not None:
+                    for suffix in (".jsonl", ".json"):
+                        path = self._seed_dir / f"{name}{suffix}"
+                        if path.exists():
+                            coll._load(read_docs(path))
+                            break
+                self._colls[name] = coll
+            return self._colls[name]
+
+    def drop_collection(self, name: str) -> None:
+        with self._lock:
+            # A dropped seeded collection stays empty rather than reloading from disk.
+            self._colls[name] = MemoryCollection(self, name)
+
+    def command(self, command: Any, **kwargs: Any) -> Dict[str, Any]:
+        if command in ("ping", {"ping": 1}):
+            return {"ok": 1.0}
+        raise OperationFailure(f"command {command!r} is not supported by the memory backend")
+
+
+class MemoryClient:
+    """Drop-in for the MongoClient calls db.py makes; `seed_db` is loaded from `seed_dir`."""
+
+    def __init__(self, seed_dir: Optional[Path] = SEED_DIR, seed_db: Optional[str] = None) -> None:
+        self._seed_dir = Path(seed_dir) if seed_dir else None
+        self._seed_db = seed_db
+        self._dbs: Dict[str, MemoryDatabase] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        with self._lock:
+            if name not in self._dbs:
+                seed = self._seed_dir if name == self._seed_db else None
+                self._dbs[name] = MemoryDatabase(self, name, seed)
+            return self._dbs[name]
+
+    def close(self) -> None:
+        pass
+
+
+_SHARED: Dict[Tuple[Optional[str], Optional[str]], MemoryClient] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def connect(seed_dir: Optional[Path] = SEED_DIR, seed_db: Optional[str] = None) -> MemoryClient:
+    """The process-wide store for (seed_dir, seed_db), like connecting to the same server twice."""
+    key = (str(seed_dir) if seed_dir else None, seed_db)
+    with _SHARED_LOCK:
+        if key not in _SHARED:
+            _SHARED[key] = MemoryClient(seed_dir, seed_db)
+        return _SHARED[key]
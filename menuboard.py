@@ -0,0 +1,202 @@
+"""Static menu-board export for in-store screens.
+
+Renders the approved (recipe_ok) menu, grouped by category and temperature
+with per-drink nutrition from the compiled catalog, into files any static file
+server can host:
+
+    <out>/menu.<hash>.json    the board data
+    <out>/menu.<hash>.html    the self-contained board page
+    <out>/index.html          redirects to the current board (serve with no-cache)
+    <out>/manifest.json       {"db", "version", "hash", "json", "html", "generated_at"}
+
+<hash> is taken from the content, so hashed files never change once written and
+can be served with a long immutable cache lifetime. A run whose (database,
+catalog version) matches manifest.json does nothing; a catalog change that does
+not touch the approved menu produces the same hash and rewrites only the
+manifest. Older bundles beyond --keep are removed.
+
+Usage:
+    python menuboard.py                       # ./menuboard, if the catalog changed
+    python menuboard.py --out /srv/board --force
+    python menuboard.py --watch 60            # check every 60 s and re-export on change
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import catalog
+import db
+from config import setting
+from ui import COLORS
+
+CATEGORY_ORDER = ("core", "seasonal")
+TEMPERATURE_ORDER = ("hot", "iced")
+
+
+def board_data(cat: catalog.Catalog) -> Dict[str, Any]:
+    """{"groups": [{"category", "temperature", "items": [...]}]} for the approved menu."""
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for r in cat.recipes:
+        if not r.recipe_ok:
+            continue
+        n = cat.nutrition(r)
+        groups.setdefault((r.category or "other", r.temperature or "other"), []).append({
+            "id": r.id,
+            "name": r.name,
+            "size_ml": r.size_ml,
+            "season": list(r.season),
+            "calories": round(n.get("calories", 0.0)),
+            "sugar_g": round(n.get("sugar_g", 0.0), 1),
+            "caffeine_mg": round(n.get("caffeine_mg", 0.0)),
+        })
+
+    def order(key: tuple) -> tuple:
+        category, temperature = key
+        return (
+            CATEGORY_ORDER.index(category) if category in CATEGORY_ORDER else len(CATEGORY_ORDER), category,
+            TEMPERATURE_ORDER.index(temperature) if temperature in TEMPERATURE_ORDER else len(TEMPERATURE_ORDER),
+            temperature,
+        )
+
+    return {"groups": [
+        {"category": c, "temperature": t, "items": sorted(groups[(c, t)], key=lambda i: (i["name"], i["id"]))}
+        for c, t in sorted(groups, key=order)
+    ]}
+
+
+BOARD_CSS = f"""
+body {{ margin: 0; padding: 2rem; font-family: Nunito, sans-serif; color: {COLORS['espresso']};
+       background: linear-gradient(180deg, {COLORS['paper']} 0%, {COLORS['cream']} 100%); }}
+h1 {{ font-family: 'Playfair Display', serif; margin: 0 0 1.5rem 0; border-bottom: 3px solid {COLORS['caramel']}; }}
+.groups {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(22rem, 1fr)); gap: 1.5rem; }}
+section {{ background: rgba(255,255,255,0.6); border: 1px solid {COLORS['border']}; border-radius: 14px; padding: 1rem 1.25rem; }}
+h2 {{ margin: 0 0 0.5rem 0; color: {COLORS['dark_roast']}; text-transform: capitalize; }}
+table {{ width: 100%; border-collapse: collapse; }}
+td, th {{ padding: 0.3rem 0.25rem; text-align: right; }}
+td:first-child, th:first-child {{ text-align: left; }}
+th {{ font-size: 0.8rem; color: {COLORS['mocha']}; font-weight: 600; }}
+tr + tr td {{ border-top: 1px solid rgba(215,185,138,0.4); }}
+.season {{ font-size: 0.75rem; color: {COLORS['caramel']}; }}
+"""
+
+
+def render_html(data: Dict[str, Any]) -> str:
+    esc = html.escape
+    sections = []
+    for g in data["groups"]:
+        rows = []
+        for i in g["items"]:
+            season = f" <span class='season'>{esc(', '.join(i['season']))}</span>" if i["season"] else ""
+            size = f"{i['size_ml']:g}" if i["size_ml"] is not None else "–"
+            rows.append(
+                f"<tr><td>{esc(i['name'])}{season}</td><td>{size}</td><td>{i['calories']}</td>"
+                f"<td>{i['sugar_g']:g}</td><td>{i['caffeine_mg']}</td></tr>"
+            )
+        sections.append(
+            f"<section><h2>{esc(g['category'])} · {esc(g['temperature'])}</h2><table>"
+            "<tr><th>Drink</th><th>ml</th><th>kcal</th><th>sugar g</th><th>caffeine mg</th></tr>"
+            + "".join(rows) + "</table></section>"
+        )
+    return (
+        "<!doctype html><html><head><meta charset='utf-8'>"
+        "<meta name='viewport' content='width=device-width, initial-scale=1'>"
+        f"<title>Cafe Crunch Menu</title><style>{BOARD_CSS}</style></head>"
+        f"<body><h1>☕ Cafe Crunch Menu</h1><div class='groups'>{''.join(sections)}</div></body></html>"
+    )
+
+
+def _write(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _manifest(out: Path) -> Dict[str, Any]:
+    try:
+        return json.loads((out / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def export(out: Path, force: bool = False, keep: int = 3) -> Optional[Dict[str, Any]]:
+    """Write the board for the current catalog version; returns the new manifest, or None if up to date."""
+    out.mkdir(parents=True, exist_ok=True)
+    cat = catalog.get_catalog()
+    name, version = db.get_db().name, cat.version
+    current = _manifest(out)
+    if not force and current.get("db") == name and current.get("version") == version:
+        return None
+
+    data = board_data(cat)
+    data_json = json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    page = render_html(data)
+    digest = hashlib.sha256((data_json + "\0" + page).encode("utf-8")).hexdigest()[:12]
+    json_name, html_name = f"menu.{digest}.json", f"menu.{digest}.html"
+    if not (out / json_name).exists():
+        _write(out / json_name, data_json)
+    if not (out / html_name).exists():
+        _write(out / html_name, page)
+
+    manifest = {
+        "db": name, "version": version, "hash": digest, "json": json_name, "html": html_name,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    # index.html and manifest.json last, so they never point at a missing bundle.
+    _write(out / "index.html", (
+        "<!doctype html><html><head><meta charset='utf-8'>"
+        f"<meta http-equiv='refresh' content='0; url={html_name}'><title>Cafe Crunch Menu</title></head>"
+        f"<body><a href='{html_name}'>Menu</a></body></html>"
+    ))
+    _write(out / "manifest.json", json.dumps(manifest, indent=2))
+    prune(out, keep, digest)
+    return manifest
+
+
+def prune(out: Path, keep: int, current: str) -> List[str]:
+    """Remove all but the newest `keep` bundles (never the current one)."""
+    bundles: Dict[str, float] = {}
+    for path in out.glob("menu.*.*"):
+        parts = path.name.split(".")
+        if len(parts) == 3 and parts[2] in ("json", "html"):
+            bundles[parts[1]] = max(bundles.get(parts[1], 0.0), path.stat().st_mtime)
+    stale = sorted((h for h in bundles if h != current), key=bundles.get, reverse=True)[max(0, keep - 1):]
+    removed = []
+    for h in stale:
+        for suffix in ("json", "html"):
+            path = out / f"menu.{h}.{suffix}"
+            if path.exists():
+                path.unlink()
+                removed.append(str(path))
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export the approved menu as static, content-hashed files.")
+    parser.add_argument("--out", type=Path, default=Path(setting("MENUBOARD_DIR", "menuboard")))
+    parser.add_argument("--force", action="store_true", help="export even if the catalog version is unchanged")
+    parser.add_argument("--keep", type=int, default=3, help="bundles to keep, the current one included")
+    parser.add_argument("--watch", type=float, default=0, help="re-check every N seconds instead of exiting")
+    args = parser.parse_args(argv)
+
+    while True:
+        manifest = export(args.out, force=args.force, keep=args.keep)
+        if manifest:
+            print(f"v{manifest['version']}: {args.out / manifest['html']} ({manifest['hash']})")
+        elif not args.watch:
+            print(f"up to date: {args.out / 'manifest.json'}")
+        if not args.watch:
+            return 0
+        args.force = False
+        time.sleep(args.watch)
+        db.catalog_version.clear()  # another process may have bumped it
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,16 @@
+from typing import Optional, Tuple
+
 import streamlit as st
 import pandas as pd
-from db import list_recipes
+from catalog import get_catalog
+from ui import keyset_pager
+from instrumentation import query_panel, start_page_run
+import profiler
+import warmup
+
+start_page_run("Menu")
+profiler.start_run("Menu")
+warmup.start()
 
 # ----------------------------
 # Page Header
@@ -32,17 +42,37 @@ with st.sidebar:
         step=10,
     )
 
+profiler.mark("data fetch")
+
 # ----------------------------
 # Data Fetch
 # ----------------------------
-rows = list_recipes(
-    category if category != "All" else None,
-    temperature if temperature != "All" else None,
-    (size_min, size_max),
-    only_ok=only_ok,
-)
+# The recipe index lives in memory as columns (one copy per catalog version), so
+# moving a slider or switching a selectbox is a boolean mask, not a query.
+menu = get_catalog().menu_frame()
+
+profiler.mark("dataframe build")
+mask = menu["size_ml"].between(size_min, size_max).fillna(False).to_numpy(dtype=bool)
+if category != "All":
+    mask &= (menu["category"] == category).to_numpy()
+if temperature != "All":
+    mask &= (menu["temperature"] == temperature).to_numpy()
+if only_ok:
+    mask &= menu["recipe_ok"].to_numpy(dtype=bool)
+matches = menu[mask]
+
 
-df = pd.DataFrame(rows)
+def _page(after: Optional[int], size: int) -> Tuple[pd.DataFrame, Optional[int]]:
+    """Offset cursor over the already filtered (and sorted) frame."""
+    start = after or 0
+    end = start + size
+    return matches.iloc[start:end], end if end < len(matches) else None
+
+
+filters = (category, temperature, (size_min, size_max), only_ok)
+df = keyset_pager("menu_pager", _page, filters=filters, total=len(matches))
+
+profiler.mark("widget render")
 
 # ----------------------------
 # Display Results
@@ -52,7 +82,7 @@ if df.empty:
 else:
     display_cols = ["_id", "name", "category", "temperature", "size_ml", "recipe_ok"]
     st.dataframe(
-        df[display_cols].sort_values(["category", "temperature", "name"]),
+        df[[c for c in display_cols if c in df.columns]],
         use_container_width=True,
         hide_index=True,
     )
@@ -60,3 +90,6 @@ else:
     st.caption(
         "📌 Tip: Copy a recipe **_id** and open **Recipe Details** to view nutrition."
     )
+
+query_panel()
+profiler.finish_run()
@@ -1,79 +1,29 @@
+import math
+from typing import Any, Dict, List, Tuple
+
 import streamlit as st
 import pandas as pd
-from db import list_ingredients, upsert_ingredient, delete_ingredient
+from db import (
+    bulk_update_ingredients,
+    count_ingredients,
+    delete_ingredient,
+    list_ingredients,
+    page_ingredients,
+    upsert_ingredient,
+)
+from ui import apply_theme, keyset_pager
+from instrumentation import query_panel, start_page_run
+import profiler
+import warmup
+
+start_page_run("Ingredients Admin")
+profiler.start_run("Ingredients Admin")
+warmup.start()
 
 # -----------------------------
 # Theme (match Dashboard)
 # -----------------------------
-COLORS = {
-    "espresso": "#1B0E07",
-    "dark_roast": "#3C2415",
-    "mocha": "#5D4037",
-    "caramel": "#C4873A",
-    "latte": "#D4A574",
-    "cream": "#F5E6D3",
-    "paper": "#FBF6EE",
-    "border": "#D7B98A",
-    "sage": "#81C784",
-    "berry": "#E57373",
-    "gold": "#FFB300",
-    "white": "#FFFFFF",
-}
-
-THEME_CSS = f"""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@600;700&family=Nunito:wght@400;600;700&display=swap');
-
-html, body, [class*="css"] {{
-  font-family: 'Nunito', sans-serif;
-}}
-
-.stApp {{
-  background: radial-gradient(1200px 800px at 15% 10%, {COLORS['paper']} 0%, {COLORS['cream']} 60%, #F3E0C9 100%);
-}}
-
-.cc-title {{
-  font-family: 'Playfair Display', serif;
-  color: {COLORS['espresso']};
-  letter-spacing: 0.2px;
-  margin: 0;
-}}
-
-.cc-subtitle {{
-  color: {COLORS['mocha']};
-  margin-top: 0.35rem;
-}}
-
-.cc-divider {{
-  height: 2px;
-  background: linear-gradient(90deg, transparent 0%, {COLORS['border']} 20%, {COLORS['border']} 80%, transparent 100%);
-  margin: 0.75rem 0 1.25rem 0;
-}}
-
-.cc-card {{
-  background: rgba(255,255,255,0.55);
-  border: 1px solid rgba(215,185,138,0.65);
-  border-radius: 16px;
-  padding: 16px 18px;
-  box-shadow: 0 8px 24px rgba(27,14,7,0.06);
-}}
-
-.cc-h3 {{
-  font-family: 'Playfair Display', serif;
-  color: {COLORS['espresso']};
-  margin: 0 0 0.25rem 0;
-}}
-
-div[data-testid="stDataFrame"] {{
-  background: rgba(255,255,255,0.40);
-  border: 1px solid rgba(215,185,138,0.55);
-  border-radius: 14px;
-  padding: 10px;
-}}
-
-</style>
-"""
-st.markdown(THEME_CSS, unsafe_allow_html=True)
+apply_theme()
 
 st.markdown(
     """
@@ -84,13 +34,86 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-tab1, tab2 = st.tabs(["Browse/Delete", "Add/Update"])
+GRID_ROWS = 200
+NUTRITION_FIELDS = ["calories", "protein_g", "fat_g", "carbs_g", "sugar_g", "sodium_mg", "caffeine_mg"]
+
+
+def _grid_rows(docs: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Flatten ingredient docs into editable columns (nutrition_per_unit.* -> one column each)."""
+    rows = []
+    for d in docs:
+        nutr = d.get("nutrition_per_unit", {}) if isinstance(d.get("nutrition_per_unit"), dict) else {}
+        row = {"_id": d.get("_id"), "name": d.get("name"), "unit": d.get("unit"), "unit_ml": d.get("unit_ml")}
+        row.update({f: nutr.get(f) for f in NUTRITION_FIELDS})
+        row["tags"] = ", ".join(t for t in d.get("tags", []) if isinstance(t, str))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["_id", "name", "unit", "unit_ml"] + NUTRITION_FIELDS + ["tags"])
+
+
+def _na(v: Any) -> bool:
+    """True for an empty grid cell (None, NaN or pd.NA, which is what a cleared cell holds)."""
+    return v is None or v is pd.NA or (isinstance(v, float) and math.isnan(v))
+
+
+def _same(a: Any, b: Any) -> bool:
+    if _na(a) or _na(b):
+        return _na(a) and _na(b)
+    return a == b
+
+
+def _diff_rows(before: pd.DataFrame, after: pd.DataFrame) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Return ({_id: {mongo_field_path: new_value}} for cells that changed, ["_id.field" left unchanged]).
+
+    A cleared nutrition cell becomes None, which bulk_update_ingredients() unsets. A cleared
+    (or non-positive) required field is not written at all: unit_ml is a divisor downstream.
+    """
+    patches: Dict[str, Dict[str, Any]] = {}
+    kept: List[str] = []
+    old_by_id = {r["_id"]: r for r in before.to_dict("records")}
+    for new in after.to_dict("records"):
+        old = old_by_id.get(new["_id"])
+        if old is None:
+            continue
+        patch: Dict[str, Any] = {}
+        for col in ["name", "unit"]:
+            if not _same(old[col], new[col]):
+                value = "" if _na(new[col]) else str(new[col]).strip()
+                if value:
+                    patch[col] = value
+                else:
+                    kept.append(f"{new['_id']}.{col}")
+        if not _same(old["unit_ml"], new["unit_ml"]):
+            if not _na(new["unit_ml"]) and float(new["unit_ml"]) > 0:
+                patch["unit_ml"] = float(new["unit_ml"])
+            else:
+                kept.append(f"{new['_id']}.unit_ml")
+        for col in NUTRITION_FIELDS:
+            if not _same(old[col], new[col]):
+                patch[f"nutrition_per_unit.{col}"] = None if _na(new[col]) else float(new[col])
+        if not _same(old["tags"], new["tags"]):
+            tags = "" if _na(new["tags"]) else str(new["tags"])
+            patch["tags"] = [t.strip() for t in tags.split(",") if t.strip()]
+        if patch:
+            patches[new["_id"]] = patch
+    return patches, kept
+
+
+tab1, tab2, tab3 = st.tabs(["Browse/Delete", "Add/Update", "Bulk edit"])
 
 with tab1:
     st.markdown("<div class='cc-card'>", unsafe_allow_html=True)
     st.markdown("<h3 class='cc-h3'>Browse</h3>", unsafe_allow_html=True)
-    df = pd.DataFrame(list_ingredients())
-    st.dataframe(df[["_id","name","unit","unit_ml"]], use_container_width=True, hide_index=True)
+    rows = keyset_pager(
+        "ingredients_pager",
+        lambda after, size: page_ingredients(after=after, page_size=size),
+        total=count_ingredients(),
+    )
+    df = pd.DataFrame(rows)
+    if df.empty:
+        st.info("No ingredients found.")
+    else:
+        cols = [c for c in ["_id", "name", "unit", "unit_ml"] if c in df.columns]
+        st.dataframe(df[cols], use_container_width=True, hide_index=True)
     st.markdown("<h3 class='cc-h3' style='margin-top: 1rem;'>Delete</h3>", unsafe_allow_html=True)
     del_id = st.text_input("Delete ingredient _id", placeholder="e.g., syrup_vanilla")
     if st.button("Delete"):
@@ -107,10 +130,9 @@ with tab2:
     st.caption("Upsert = insert new or replace existing.")
 
     # --- Load existing ingredient (dropdown) ---
-    df_all = pd.DataFrame(list_ingredients())
-    ing_ids = []
-    if not df_all.empty and "_id" in df_all.columns:
-        ing_ids = sorted(df_all["_id"].dropna().astype(str).tolist())
+    # One list_ingredients() per rerun: the picker and the "Load" button share it.
+    ings_by_id = {str(d["_id"]): d for d in list_ingredients() if d.get("_id") is not None}
+    ing_ids = sorted(ings_by_id)
 
     if "ing_loaded" not in st.session_state:
         st.session_state["ing_loaded"] = {}
@@ -119,7 +141,7 @@ with tab2:
         sel_id = st.selectbox("Choose ingredient _id", options=[""] + ing_ids, key="ing_select_id")
         if st.button("Load ingredient"):
             if sel_id:
-                rec = next((x for x in list_ingredients() if x.get("_id") == sel_id), None) or {}
+                rec = ings_by_id.get(sel_id) or {}
                 st.session_state["ing_loaded"] = rec
 
                 # Prefill widget state
@@ -201,3 +223,47 @@ with tab2:
             st.session_state["ing_loaded"] = doc
             st.success("Upserted ✅")
     st.markdown("</div>", unsafe_allow_html=True)
+
+with tab3:
+    st.markdown("<div class='cc-card'>", unsafe_allow_html=True)
+    st.markdown("<h3 class='cc-h3'>Bulk edit</h3>", unsafe_allow_html=True)
+    st.caption("Edit cells in the grid, then save. Only changed fields are written.")
+    if "ing_grid_saved" in st.session_state:
+        st.success(st.session_state.pop("ing_grid_saved"))
+
+    prefix = st.text_input("Filter by _id prefix", placeholder="e.g., syrup_", key="ing_grid_prefix").strip()
+    grid_docs, more = page_ingredients(page_size=GRID_ROWS, prefix=prefix)
+    base_df = _grid_rows(grid_docs)
+    if more:
+        st.caption(f"Showing the first {GRID_ROWS} matches by name; type a longer prefix to narrow them.")
+
+    if base_df.empty:
+        st.info("No ingredients match that prefix.")
+    else:
+        edited_df = st.data_editor(
+            base_df,
+            key=f"ing_grid::{prefix}",
+            disabled=["_id"],
+            num_rows="fixed",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "unit_ml": st.column_config.NumberColumn("unit_ml", min_value=0.000001),
+                **{f: st.column_config.NumberColumn(f, min_value=0.0) for f in NUTRITION_FIELDS},
+            },
+        )
+        patches, kept = _diff_rows(base_df, edited_df)
+        if kept:
+            st.warning("Required fields can't be cleared; left unchanged: " + ", ".join(kept))
+        n_fields = sum(len(p) for p in patches.values())
+        st.caption(f"{len(patches)} ingredients / {n_fields} fields changed.")
+
+        if st.button("Save changes", disabled=not patches, key="ing_grid_save"):
+            modified = bulk_update_ingredients(patches)
+            st.session_state["ing_grid_saved"] = f"Saved ✅ {modified} ingredients updated."
+            del st.session_state[f"ing_grid::{prefix}"]
+            st.rerun()
+    st.markdown("</div>", unsafe_allow_html=True)
+
+query_panel()
+profiler.finish_run()
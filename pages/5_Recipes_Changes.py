@@ -1,90 +1,36 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, List, Optional
 
 import pandas as pd
 import streamlit as st
 
-from db import list_recipes, get_recipe, upsert_recipe, delete_recipe, list_ingredients
+from db import (
+    bulk_upsert_recipes,
+    count_recipes,
+    delete_recipe,
+    export_recipes,
+    get_recipe,
+    ingredient_ids,
+    page_recipes,
+    upsert_recipe,
+)
+from ui import apply_theme, keyset_pager, rerun_fragment
+from instrumentation import query_panel, start_page_run
+import profiler
+import warmup
+
+start_page_run("Recipes Admin")
+profiler.start_run("Recipes Admin")
+warmup.start()
 
 # -----------------------------
 # Theme (match Dashboard)
 # -----------------------------
-COLORS = {
-    "espresso": "#1B0E07",
-    "dark_roast": "#3C2415",
-    "mocha": "#5D4037",
-    "caramel": "#C4873A",
-    "latte": "#D4A574",
-    "cream": "#F5E6D3",
-    "paper": "#FBF6EE",
-    "border": "#D7B98A",
-    "sage": "#81C784",
-    "berry": "#E57373",
-    "gold": "#FFB300",
-    "white": "#FFFFFF",
-}
-
-THEME_CSS = f"""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@600;700&family=Nunito:wght@400;600;700&display=swap');
-
-html, body, [class*="css"] {{
-  font-family: 'Nunito', sans-serif;
-}}
-
-.stApp {{
-  background: radial-gradient(1200px 800px at 15% 10%, {COLORS['paper']} 0%, {COLORS['cream']} 60%, #F3E0C9 100%);
-}}
-
-.cc-title {{
-  font-family: 'Playfair Display', serif;
-  color: {COLORS['espresso']};
-  letter-spacing: 0.2px;
-  margin: 0;
-}}
-
-.cc-subtitle {{
-  color: {COLORS['mocha']};
-  margin-top: 0.35rem;
-}}
-
-.cc-divider {{
-  height: 2px;
-  background: linear-gradient(90deg, transparent 0%, {COLORS['border']} 20%, {COLORS['border']} 80%, transparent 100%);
-  margin: 0.75rem 0 1.25rem 0;
-}}
-
-.cc-card {{
-  background: rgba(255,255,255,0.55);
-  border: 1px solid rgba(215,185,138,0.65);
-  border-radius: 16px;
-  padding: 16px 18px;
-  box-shadow: 0 8px 24px rgba(27,14,7,0.06);
-}}
-
-.cc-h3 {{
-  font-family: 'Playfair Display', serif;
-  color: {COLORS['espresso']};
-  margin: 0 0 0.25rem 0;
-}}
-
-div[data-testid="stDataFrame"] {{
-  background: rgba(255,255,255,0.40);
-  border: 1px solid rgba(215,185,138,0.55);
-  border-radius: 14px;
-  padding: 10px;
-}}
-
-[data-testid="stMetric"] {{
-  background: rgba(255,255,255,0.40);
-  border: 1px solid rgba(215,185,138,0.55);
-  border-radius: 14px;
-  padding: 14px 14px;
-}}
-</style>
-"""
-st.markdown(THEME_CSS, unsafe_allow_html=True)
+apply_theme()
 
 st.markdown(
     """
@@ -98,8 +44,9 @@ st.markdown(
 # Mirror Ingredients Admin layout
 # Tab 1: Browse/Delete
 # Tab 2: Add/Update (Upsert)
+# Tab 3: Bulk import/export
 
-tab1, tab2 = st.tabs(["Browse/Delete", "Add/Update"])
+tab1, tab2, tab3 = st.tabs(["Browse/Delete", "Add/Update", "Bulk import/export"])
 
 
 # ----------------------------
@@ -136,18 +83,144 @@ def _remove_comp_row(i: int) -> None:
         st.session_state["recipe_comp"].pop(i)
 
 
-# Pull ingredients once for dropdowns
-try:
-    ings = list_ingredients(limit=5000)
-except TypeError:
-    ings = list_ingredients()
-ing_ids = sorted([d.get("_id") for d in ings if d.get("_id")])
+@st.fragment
+def composition_editor(temperature: str) -> None:
+    """Composition rows, kept in st.session_state["recipe_comp"].
+
+    Runs as a fragment: adding, removing or editing a row reruns only these rows,
+    not the ingredient lookup or the rest of the form. "Upsert recipe" reads the
+    rows back from session state.
+    """
+    if not st.session_state["recipe_comp"]:
+        if temperature == "iced":
+            st.session_state["recipe_comp"] = [
+                {"ingredient_id": "ice", "amount_type": "ml", "amount": 0.0},
+                {"ingredient_id": "espresso_shot", "amount_type": "shots", "amount": 0.0},
+            ]
+        else:
+            st.session_state["recipe_comp"] = [
+                {"ingredient_id": "espresso_shot", "amount_type": "shots", "amount": 0.0},
+            ]
+
+    add_col, _ = st.columns([1, 4])
+    with add_col:
+        if st.button("+ Add ingredient row"):
+            _add_comp_row()
+
+    for i, row in enumerate(list(st.session_state["recipe_comp"])):
+        c_ing, c_type, c_amt, c_rm = st.columns([3, 2, 2, 1])
+
+        current_ing = str(row.get("ingredient_id") or "")
+        ing_choice = c_ing.selectbox(
+            f"ingredient_{i}",
+            options=[""] + ing_ids,
+            index=_idx([""] + ing_ids, current_ing, default=0),
+            label_visibility="collapsed",
+        )
+
+        amount_type = str(row.get("amount_type") or "ml")
+        type_choice = c_type.selectbox(
+            f"type_{i}",
+            options=["ml", "pumps", "shots"],
+            index=_idx(["ml", "pumps", "shots"], amount_type, default=0),
+            label_visibility="collapsed",
+        )
+
+        amount_val = float(row.get("amount") or 0.0)
+        amount = c_amt.number_input(
+            f"amount_{i}",
+            min_value=0.0,
+            value=float(amount_val),
+            step=1.0,
+            label_visibility="collapsed",
+        )
+
+        if c_rm.button("✕", key=f"rm_{i}"):
+            _remove_comp_row(i)
+            rerun_fragment()
+
+        st.session_state["recipe_comp"][i] = {
+            "ingredient_id": ing_choice,
+            "amount_type": type_choice,
+            "amount": float(amount),
+        }
+
+
+# CSV keeps scalar fields as plain columns and nested fields as JSON text.
+CSV_SCALARS = ["_id", "name", "category", "temperature", "size_ml", "recipe_ok"]
+CSV_NESTED = ["season", "defaults", "composition", "options"]
+
+
+def _csv_bool(val: str) -> bool:
+    return str(val).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _parse_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    doc: Dict[str, Any] = {}
+    for k in CSV_SCALARS:
+        val = (row.get(k) or "").strip()
+        if val == "":
+            continue
+        if k == "size_ml":
+            # Non-numeric sizes are kept as text so validation reports the row instead of failing the file.
+            try:
+                doc[k] = int(float(val))
+            except ValueError:
+                doc[k] = val
+        elif k == "recipe_ok":
+            doc[k] = _csv_bool(val)
+        else:
+            doc[k] = val
+    for k in CSV_NESTED:
+        val = (row.get(k) or "").strip()
+        if not val:
+            continue
+        if k == "season" and not val.startswith("["):
+            doc[k] = [x.strip() for x in val.split(",") if x.strip()]
+        else:
+            doc[k] = json.loads(val)
+    return doc
+
+
+def _parse_upload(filename: str, data: bytes) -> List[Dict[str, Any]]:
+    """Parse a JSON array, JSONL, or CSV upload into recipe docs."""
+    text = data.decode("utf-8-sig")
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return [_parse_csv_row(r) for r in csv.DictReader(io.StringIO(text))]
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    data_obj = json.loads(text)
+    return data_obj if isinstance(data_obj, list) else [data_obj]
+
+
+def _dump_recipes(docs: Iterable[Dict[str, Any]], fmt: str) -> bytes:
+    if fmt == "CSV":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=CSV_SCALARS + CSV_NESTED, extrasaction="ignore")
+        writer.writeheader()
+        for d in docs:
+            row = {k: d.get(k, "") for k in CSV_SCALARS}
+            row.update({k: json.dumps(d[k]) for k in CSV_NESTED if k in d})
+            writer.writerow(row)
+        return buf.getvalue().encode("utf-8")
+    if fmt == "JSONL":
+        return "".join(json.dumps(d, default=str) + "\n" for d in docs).encode("utf-8")
+    return json.dumps(list(docs), indent=2, default=str).encode("utf-8")
+
+
+profiler.mark("data fetch: ingredients")
+
+# Ingredient ids for the dropdowns; the same cached set validates upserts below.
+ing_ids = sorted(ingredient_ids(), key=str)
 
 milk_ids = [i for i in ing_ids if str(i).startswith("milk_")]
 syrup_ids = [i for i in ing_ids if str(i).startswith("syrup_")]
 sauce_ids = [i for i in ing_ids if str(i).startswith("sauce_")]
 
 
+profiler.mark("widget render: browse")
+
 # ----------------------------
 # Tab 1: Browse / Delete
 # ----------------------------
@@ -168,14 +241,21 @@ with tab1:
     cat_f = None if category == "All" else category
     temp_f = None if temperature == "All" else temperature
 
-    df = pd.DataFrame(list_recipes(limit=5000, category=cat_f, temperature=temp_f, only_ok=only_ok))
+    browse_filters = (cat_f, temp_f, None, only_ok)
+    rows = keyset_pager(
+        "recipes_admin_pager",
+        lambda after, size: page_recipes(*browse_filters, after=after, page_size=size),
+        filters=browse_filters,
+        total=count_recipes(*browse_filters),
+    )
+    df = pd.DataFrame(rows)
 
     if df.empty:
         st.info("No recipes found for the current filters.")
     else:
         cols = [c for c in ["_id", "name", "category", "temperature", "size_ml", "recipe_ok"] if c in df.columns]
         st.dataframe(
-            df[cols].sort_values(["category", "temperature", "name"], na_position="last"),
+            df[cols],
             use_container_width=True,
             hide_index=True,
         )
@@ -194,6 +274,8 @@ with tab1:
     st.markdown("</div>", unsafe_allow_html=True)
 
 
+profiler.mark("widget render: composition editor")
+
 # ----------------------------
 # Tab 2: Add / Update (Upsert)
 # ----------------------------
@@ -345,59 +427,7 @@ with tab2:
     st.markdown("---")
     st.markdown("### Composition")
 
-    if not st.session_state["recipe_comp"]:
-        if temperature == "iced":
-            st.session_state["recipe_comp"] = [
-                {"ingredient_id": "ice", "amount_type": "ml", "amount": 0.0},
-                {"ingredient_id": "espresso_shot", "amount_type": "shots", "amount": 0.0},
-            ]
-        else:
-            st.session_state["recipe_comp"] = [
-                {"ingredient_id": "espresso_shot", "amount_type": "shots", "amount": 0.0},
-            ]
-
-    add_col, _ = st.columns([1, 4])
-    with add_col:
-        if st.button("+ Add ingredient row"):
-            _add_comp_row()
-
-    for i, row in enumerate(list(st.session_state["recipe_comp"])):
-        c_ing, c_type, c_amt, c_rm = st.columns([3, 2, 2, 1])
-
-        current_ing = str(row.get("ingredient_id") or "")
-        ing_choice = c_ing.selectbox(
-            f"ingredient_{i}",
-            options=[""] + ing_ids,
-            index=_idx([""] + ing_ids, current_ing, default=0),
-            label_visibility="collapsed",
-        )
-
-        amount_type = str(row.get("amount_type") or "ml")
-        type_choice = c_type.selectbox(
-            f"type_{i}",
-            options=["ml", "pumps", "shots"],
-            index=_idx(["ml", "pumps", "shots"], amount_type, default=0),
-            label_visibility="collapsed",
-        )
-
-        amount_val = float(row.get("amount") or 0.0)
-        amount = c_amt.number_input(
-            f"amount_{i}",
-            min_value=0.0,
-            value=float(amount_val),
-            step=1.0,
-            label_visibility="collapsed",
-        )
-
-        if c_rm.button("✕", key=f"rm_{i}"):
-            _remove_comp_row(i)
-            st.rerun()
-
-        st.session_state["recipe_comp"][i] = {
-            "ingredient_id": ing_choice,
-            "amount_type": type_choice,
-            "amount": float(amount),
-        }
+    composition_editor(temperature)
 
     st.markdown("---")
     st.markdown("### Options")
@@ -507,3 +537,66 @@ with tab2:
                 st.error(f"Upsert failed: {e}")
 
     st.markdown("</div>", unsafe_allow_html=True)
+
+
+profiler.mark("widget render: bulk import/export")
+
+# ----------------------------
+# Tab 3: Bulk import / export
+# ----------------------------
+
+with tab3:
+    st.markdown("<div class='cc-card'>", unsafe_allow_html=True)
+
+    st.markdown("<h3 class='cc-h3'>Bulk import</h3>", unsafe_allow_html=True)
+    st.caption(
+        "Upload a JSON array, JSONL, or CSV file. Each recipe is upserted by _id. "
+        "In CSV, season/defaults/composition/options are JSON text (season may also be comma separated)."
+    )
+
+    upload = st.file_uploader("Recipes file", type=["json", "jsonl", "ndjson", "csv"], key="recipes_bulk_file")
+    if upload is not None:
+        try:
+            bulk_docs = _parse_upload(upload.name, upload.getvalue())
+        except (ValueError, csv.Error) as e:
+            bulk_docs = []
+            st.error(f"Could not parse {upload.name}: {e}")
+
+        if bulk_docs:
+            st.write(f"{len(bulk_docs)} recipes parsed from **{upload.name}**.")
+            if st.button("Import recipes", key="recipes_bulk_import"):
+                try:
+                    res = bulk_upsert_recipes(bulk_docs)
+                except Exception as e:
+                    st.error(f"Import failed: {e}")
+                else:
+                    ok_rows = len(bulk_docs) - len(res["errors"])
+                    st.success(
+                        f"Imported {ok_rows} of {len(bulk_docs)} ✅ "
+                        f"({res['upserted']} new, {res['modified']} updated)"
+                    )
+                    if res["errors"]:
+                        st.warning(f"{len(res['errors'])} rows were not imported.")
+                        st.dataframe(pd.DataFrame(res["errors"]), use_container_width=True, hide_index=True)
+
+    st.markdown("---")
+    st.markdown("<h3 class='cc-h3' style='margin-top: 1rem;'>Bulk export</h3>", unsafe_allow_html=True)
+
+    fmt = st.radio("Format", ["JSON", "JSONL", "CSV"], horizontal=True, key="recipes_export_fmt")
+    if st.button("Prepare export", key="recipes_export_btn"):
+        st.session_state["recipes_export"] = (fmt, _dump_recipes(export_recipes(), fmt))
+
+    prepared = st.session_state.get("recipes_export")
+    if prepared:
+        exp_fmt, payload = prepared
+        st.download_button(
+            f"Download recipes.{exp_fmt.lower()}",
+            data=payload,
+            file_name=f"recipes.{exp_fmt.lower()}",
+            mime="text/csv" if exp_fmt == "CSV" else "application/json",
+        )
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+query_panel()
+profiler.finish_run()
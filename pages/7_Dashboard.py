@@ -1,17 +1,19 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 
 from db import (
     agg_counts_category_temp,
     agg_milk_popularity,
     agg_ingredient_usage_topn,
-    agg_calories_topn,
-    list_recipes,
-    list_ingredients,
-    ingredient_map,
+    dashboard_data,
 )
+from instrumentation import query_panel, start_page_run
+import profiler
+import warmup
+
+start_page_run("Dashboard")
+profiler.start_run("Dashboard")
+warmup.start()
 
 # =============================================================================
 # COFFEE COLOR PALETTE
@@ -92,19 +94,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+profiler.mark("data fetch")
+
 # =============================================================================
 # LOAD ALL DATA
 # =============================================================================
-@st.cache_data(ttl=300)
-def load_all_data():
-    recipes = list_recipes(limit=5000, only_ok=False)
-    ingredients = list_ingredients(limit=5000)
-    nutrition = agg_calories_topn(100)
-    return recipes, ingredients, nutrition
-
 try:
-    all_recipes, all_ingredients, nutrition_data = load_all_data()
-    ing_map = ingredient_map()
+    all_recipes, all_ingredients, nutrition_data = dashboard_data()
 except Exception as e:
     st.error(f"Error loading data: {e}")
     st.stop()
@@ -127,6 +123,8 @@ approved_count = sum(1 for r in all_recipes if r.get("recipe_ok"))
 
 
 
+profiler.mark("dataframe build: nutrition KPIs")
+
 # =============================================================================
 # NUTRITION SUMMARY KPIs
 # =============================================================================
@@ -159,6 +157,12 @@ if nutrition_data:
 
 
 
+profiler.mark("figure build: seasonal")
+
+# plotly is imported after the data load and KPIs so they render before its ~100 ms import.
+import plotly.express as px
+import plotly.graph_objects as go
+
 # =============================================================================
 # ROW 2: SEASONAL ANALYSIS
 # =============================================================================
@@ -233,83 +237,94 @@ with col_s2:
 
 st.divider()
 
+profiler.mark("figure build: ingredients")
+
 # =============================================================================
 # ROW 3: INGREDIENT ANALYSIS
 # =============================================================================
-st.subheader(" Ingredient Analysis")
-
-col_i1, col_i2 = st.columns(2)
-
-with col_i1:
-    # Top 10 Ingredients
-    rows = agg_ingredient_usage_topn(10)
-    if rows:
-        df = pd.DataFrame([
-            {"Ingredient": str(r["_id"]).replace("_", " ").title(), "Usage": r["count"]}
-            for r in rows
-        ]).sort_values("Usage", ascending=True)
+@st.fragment
+def ingredient_analysis() -> None:
+    """Ingredient charts; changing "Show top" reruns only this section."""
+    st.subheader(" Ingredient Analysis")
+
+    top_n = st.select_slider("Show top", options=[5, 10, 15, 20], value=10, key="dash_top_n")
+    col_i1, col_i2 = st.columns(2)
+
+    with col_i1:
+        # Top N Ingredients
+        rows = agg_ingredient_usage_topn(top_n)
+        if rows:
+            df = pd.DataFrame([
+                {"Ingredient": str(r["_id"]).replace("_", " ").title(), "Usage": r["count"]}
+                for r in rows
+            ]).sort_values("Usage", ascending=True)
         
-        fig = go.Figure(data=[go.Bar(
-            x=df["Usage"], y=df["Ingredient"],
-            orientation="h",
-            marker=dict(
-                color=df["Usage"],
-                colorscale=[[0, COLORS["latte"]], [0.5, COLORS["caramel"]], [1, COLORS["dark_roast"]]],
-                line=dict(color=COLORS["espresso"], width=1)
-            ),
-            text=df["Usage"],
-            textposition="outside",
-            hovertemplate="<b>%{y}</b><br>Used in %{x} recipes<extra></extra>"
-        )])
+            fig = go.Figure(data=[go.Bar(
+                x=df["Usage"], y=df["Ingredient"],
+                orientation="h",
+                marker=dict(
+                    color=df["Usage"],
+                    colorscale=[[0, COLORS["latte"]], [0.5, COLORS["caramel"]], [1, COLORS["dark_roast"]]],
+                    line=dict(color=COLORS["espresso"], width=1)
+                ),
+                text=df["Usage"],
+                textposition="outside",
+                hovertemplate="<b>%{y}</b><br>Used in %{x} recipes<extra></extra>"
+            )])
         
-        fig.update_layout(
-            title=dict(text="Top 10 Most Used Ingredients", font=dict(size=16, family="Nunito")),
-            height=400,
-            margin=dict(t=50, l=20, r=60, b=20),
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font=dict(family="Nunito"),
-            xaxis=dict(title="Usage Count", showgrid=True, gridcolor="#E0E0E0"),
-            yaxis=dict(title=""),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(
+                title=dict(text=f"Top {top_n} Most Used Ingredients", font=dict(size=16, family="Nunito")),
+                height=400,
+                margin=dict(t=50, l=20, r=60, b=20),
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                font=dict(family="Nunito"),
+                xaxis=dict(title="Usage Count", showgrid=True, gridcolor="#E0E0E0"),
+                yaxis=dict(title=""),
+            )
+            st.plotly_chart(fig, use_container_width=True)
 
-with col_i2:
-    # Milk Popularity
-    rows = agg_milk_popularity()
-    if rows:
-        df = pd.DataFrame([
-            {"Milk": str(r["_id"]).replace("milk_", "").replace("_", " ").title(), "Count": r["count"]}
-            for r in rows
-        ]).sort_values("Count", ascending=True)
+    with col_i2:
+        # Milk Popularity
+        rows = agg_milk_popularity()
+        if rows:
+            df = pd.DataFrame([
+                {"Milk": str(r["_id"]).replace("milk_", "").replace("_", " ").title(), "Count": r["count"]}
+                for r in rows
+            ]).sort_values("Count", ascending=True)
         
-        fig = go.Figure(data=[go.Bar(
-            x=df["Count"], y=df["Milk"],
-            orientation="h",
-            marker=dict(
-                color=df["Count"],
-                colorscale=[[0, COLORS["cream"]], [0.5, COLORS["latte"]], [1, COLORS["mocha"]]],
-                line=dict(color=COLORS["dark_roast"], width=1)
-            ),
-            text=df["Count"],
-            textposition="outside",
-            hovertemplate="<b>%{y}</b><br>Available in %{x} recipes<extra></extra>"
-        )])
+            fig = go.Figure(data=[go.Bar(
+                x=df["Count"], y=df["Milk"],
+                orientation="h",
+                marker=dict(
+                    color=df["Count"],
+                    colorscale=[[0, COLORS["cream"]], [0.5, COLORS["latte"]], [1, COLORS["mocha"]]],
+                    line=dict(color=COLORS["dark_roast"], width=1)
+                ),
+                text=df["Count"],
+                textposition="outside",
+                hovertemplate="<b>%{y}</b><br>Available in %{x} recipes<extra></extra>"
+            )])
         
-        fig.update_layout(
-            title=dict(text="Milk Options by Availability", font=dict(size=16, family="Nunito")),
-            height=400,
-            margin=dict(t=50, l=20, r=60, b=20),
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font=dict(family="Nunito"),
-            xaxis=dict(title="Available in # Recipes", showgrid=True, gridcolor="#E0E0E0"),
-            yaxis=dict(title=""),
-        )
-        st.plotly_chart(fig, use_container_width=True)
+            fig.update_layout(
+                title=dict(text="Milk Options by Availability", font=dict(size=16, family="Nunito")),
+                height=400,
+                margin=dict(t=50, l=20, r=60, b=20),
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                font=dict(family="Nunito"),
+                xaxis=dict(title="Available in # Recipes", showgrid=True, gridcolor="#E0E0E0"),
+                yaxis=dict(title=""),
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+
+ingredient_analysis()
 
 st.divider()
 
+profiler.mark("figure build: nutrition")
+
 # =============================================================================
 # ROW 4: NUTRITION DEEP DIVE
 # =============================================================================
@@ -436,6 +451,8 @@ if nutrition_data:
 
 st.divider()
 
+profiler.mark("figure build: menu matrix")
+
 # =============================================================================
 # ROW 5: CATEGORY × TEMPERATURE MATRIX
 # =============================================================================
@@ -496,6 +513,8 @@ if rows:
 
 st.divider()
 
+profiler.mark("widget render: footer")
+
 # =============================================================================
 # FOOTER
 # =============================================================================
@@ -515,4 +534,7 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+query_panel()
+profiler.finish_run()
@@ -0,0 +1,236 @@
+"""Opt-in page render profiler for Streamlit reruns.
+
+Enable with PAGE_PROFILE=1 (env or secrets). For every script run it:
+
+  - times named sections, delimited by mark("data fetch"), mark("figure build"), ...
+  - runs cProfile per section on the script thread (merged into <run>.prof);
+    only one session at a time gets cProfile (its hooks are process-wide on
+    Python 3.12+), so sections of overlapping runs record stack samples only
+  - samples the script thread's stack every PAGE_PROFILE_INTERVAL_MS and writes
+    folded stacks (<run>.folded, "page;section;frame;frame count" lines) that
+    flamegraph.pl, speedscope or inferno render directly
+  - writes section timings to <run>.json
+
+Files land in PAGE_PROFILE_DIR (default ./profiles). A run ends at finish_run()
+or, if the page stops early (st.stop), when the sampler sees the page script's
+frame leave the stack. cProfile is only ever disabled on the thread that enabled
+it (its hook is per-thread before 3.12): an early-stopped run keeps the profiler
+until that thread's next start_run(), or until a later run finds the thread gone.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import flag, setting
+
+_local = threading.local()
+
+# The run whose section currently holds cProfile; only one per process can.
+_profile_lock = threading.Lock()
+_profile_owner: Optional["_Run"] = None
+
+
+def enabled() -> bool:
+    return flag("PAGE_PROFILE")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Run:
+    def __init__(self, page: str, script_frame) -> None:
+        self.page = page
+        self.script_frame = script_frame
+        self.thread_id = threading.get_ident()
+        self.t0 = time.perf_counter()
+        self.sections: List[Dict[str, Any]] = []
+        self.profiles: List[cProfile.Profile] = []
+        self.samples: Counter = Counter()
+        self.done = threading.Event()
+        self.abandoned = False
+        self.stopped_at: Optional[float] = None  # when the sampler saw an early stop
+        self._profile: Optional[cProfile.Profile] = None
+
+    @property
+    def section(self) -> str:
+        return self.sections[-1]["name"] if self.sections else "setup"
+
+    def begin_section(self, name: str) -> None:
+        self.sections.append({"name": name, "start_ms": (time.perf_counter() - self.t0) * 1000, "ms": None})
+        self._profile = self._start_profile()
+        self.sections[-1]["cprofile"] = self._profile is not None
+
+    def _start_profile(self) -> Optional[cProfile.Profile]:
+        """A running cProfile for this section, or None if another session owns the profiler."""
+        global _profile_owner
+        with _profile_lock:
+            if _profile_owner is not None and _profile_owner is not self:
+                return None
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:  # "Another profiling tool is already active" (not ours)
+                return None
+            _profile_owner = self
+            return profile
+
+    def end_section(self) -> None:
+        global _profile_owner
+        if self._profile is not None:
+            with _profile_lock:
+                self._profile.disable()
+                self.profiles.append(self._profile)
+                self._profile = None
+                if _profile_owner is self:
+                    _profile_owner = None
+        if self.sections and self.sections[-1]["ms"] is None:
+            s = self.sections[-1]
+            s["ms"] = ((self.stopped_at or time.perf_counter()) - self.t0) * 1000 - s["start_ms"]
+
+    def sample(self) -> bool:
+        """Record one stack sample; False once the page script is no longer running."""
+        frame = sys._current_frames().get(self.thread_id)
+        stack: List[str] = []
+        while frame is not None and frame is not self.script_frame:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        if frame is None:
+            return False
+        stack.append(_frame_label(self.script_frame))
+        self.samples[";".join([self.page, self.section] + stack[::-1])] += 1
+        return True
+
+
+def _write(run: _Run) -> str:
+    out_dir = setting("PAGE_PROFILE_DIR", "profiles")
+    os.makedirs(out_dir, exist_ok=True)
+    slug = re.sub(r"[^a-z0-9]+", "_", run.page.lower()).strip("_")
+    base = os.path.join(out_dir, f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}-{int(run.t0 * 1000) % 1000:03d}")
+
+    with open(f"{base}.folded", "w", encoding="utf-8") as f:
+        for stack, count in sorted(run.samples.items()):
+            f.write(f"{stack} {count}\n")
+
+    if run.profiles:
+        stats = pstats.Stats(run.profiles[0])
+        for p in run.profiles[1:]:
+            stats.add(p)
+        stats.dump_stats(f"{base}.prof")
+
+    total_ms = ((run.stopped_at or time.perf_counter()) - run.t0) * 1000
+    for s in run.sections:
+        if s["ms"] is None:
+            s["ms"] = total_ms - s["start_ms"]
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "page": run.page,
+            "total_ms": round(total_ms, 2),
+            "stopped_early": run.abandoned,
+            "samples": sum(run.samples.values()),
+            "sections": [{**s, "start_ms": round(s["start_ms"], 2), "ms": round(s["ms"], 2)} for s in run.sections],
+        }, f, indent=2)
+    return base
+
+
+def _sampler(run: _Run, interval: float) -> None:
+    while not run.done.wait(interval):
+        if not run.sample():
+            # The frame only leaves after finish_run() has set `done`, so this tells a
+            # normal finish racing the timeout apart from an early stop.
+            run.abandoned = not run.done.is_set()
+            if run.abandoned:
+                run.stopped_at = time.perf_counter()
+            break
+    if run.abandoned:
+        if run._profile is not None:
+            run.done.wait()  # the owning thread (or _reap_abandoned) disables cProfile
+        else:
+            run.end_section()  # timings only; nothing to disable
+    _write(run)
+
+
+def _reap_abandoned() -> None:
+    """Release cProfile from an early-stopped run whose script thread has exited."""
+    global _profile_owner
+    with _profile_lock:
+        run = _profile_owner
+        if run is None or not run.abandoned or run.thread_id in sys._current_frames():
+            return
+        if run._profile is not None:
+            if sys.version_info >= (3, 12):
+                run._profile.disable()  # process-wide hook; it outlives the thread
+            run.profiles.append(run._profile)  # before 3.12 the hook died with the thread
+            run._profile = None
+        _profile_owner = None
+    run.end_section()
+    run.done.set()
+
+
+def start_run(page: str) -> None:
+    """Start profiling the calling page script (call first thing in the page)."""
+    finish_run()
+    _reap_abandoned()
+    if not enabled():
+        return
+    script_frame = sys._getframe(1)
+    while script_frame is not None and script_frame.f_code.co_name != "<module>":
+        script_frame = script_frame.f_back
+    if script_frame is None:
+        return
+    run = _Run(page, script_frame)
+    _local.run = run
+    run.begin_section("setup")
+    interval = float(setting("PAGE_PROFILE_INTERVAL_MS", 5)) / 1000
+    threading.Thread(target=_sampler, args=(run, interval), name="page-profiler", daemon=True).start()
+
+
+def mark(name: str) -> None:
+    """End the current section and start `name` (no-op when profiling is off)."""
+    run: Optional[_Run] = getattr(_local, "run", None)
+    if run is None or run.done.is_set() or run.abandoned:
+        return
+    run.end_section()
+    run.begin_section(name)
+
+
+def finish_run() -> None:
+    """Close this thread's current run (also one that stopped early); the sampler thread writes its files."""
+    run: Optional[_Run] = getattr(_local, "run", None)
+    _local.run = None
+    if run is None or run.done.is_set():
+        return
+    run.end_section()
+    run.done.set()
+
+
+def summarize(path: str, top: int = 25) -> Tuple[Dict[str, Any], str]:
+    """Section timings plus the top cumulative functions for a written run (CLI helper)."""
+    base = os.path.splitext(path)[0]
+    with open(f"{base}.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    text = ""
+    if os.path.exists(f"{base}.prof"):
+        buf = io.StringIO()
+        pstats.Stats(f"{base}.prof", stream=buf).sort_stats("cumulative").print_stats(top)
+        text = buf.getvalue()
+    return meta, text
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        meta, text = summarize(arg)
+        print(f"{meta['page']}: {meta['total_ms']} ms, {meta['samples']} samples"
+              + (" (stopped early)" if meta["stopped_early"] else ""))
+        for s in meta["sections"]:
+            print(f"  {s['name']:32} {s['ms']:>9.1f} ms" + ("" if s.get("cprofile", True) else "  (samples only)"))
+        print(text)
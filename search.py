@@ -0,0 +1,65 @@
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.ids: Set[str] = set()
+
+
+class PrefixIndex:
+    """In-memory trie over recipe names and ids for search-as-you-type.
+
+    Every entry is indexed under its full lower-cased name, its id, and each word
+    of both, so "lat" matches "Iced Flavored Latte" as well as "hot_latte_small".
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()) -> None:
+        self._root = _Node()
+        self._names: Dict[str, str] = {}
+        for rid, name in entries:
+            self.add(rid, name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, rid: str, name: str) -> None:
+        rid = str(rid)
+        self._names[rid] = name or rid
+        keys = {rid.lower(), (name or "").lower()}
+        keys.update(_WORD.findall(rid.lower()))
+        keys.update(_WORD.findall((name or "").lower()))
+        for key in keys:
+            if key:
+                self._insert(key, rid)
+
+    def _insert(self, key: str, rid: str) -> None:
+        node = self._root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+        node.ids.add(rid)
+
+    def search(self, text: str, limit: int = 25) -> List[Tuple[str, str]]:
+        """Return up to `limit` (id, name) pairs matching the prefix, sorted by name."""
+        text = (text or "").strip().lower()
+        if not text:
+            found: Set[str] = set(self._names)
+        else:
+            node = self._root
+            for ch in text:
+                node = node.children.get(ch)
+                if node is None:
+                    return []
+            found = set()
+            stack = [node]
+            while stack:
+                cur = stack.pop()
+                found.update(cur.ids)
+                stack.extend(cur.children.values())
+        ranked = sorted(found, key=lambda rid: (self._names[rid].lower(), rid))
+        return [(rid, self._names[rid]) for rid in ranked[: int(limit)]]
@@ -1,8 +1,14 @@
+import argparse
 import json
+import sys
 from pathlib import Path
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne
 import streamlit as st
 
+import batch
+from db import bump_catalog_version, record_changes
+from validate import format_report, read_docs
+
 def get_client():
     # Prefer a URI that already includes the database if you store one.
     mongo_cfg = st.secrets.get("mongo", {})
@@ -63,24 +69,79 @@ def load_json_to_collection(json_path, collection_name, db=None, *, key_field=No
         # single document
         coll.insert_one(data)
 
-def main():
+def load_jsonl_to_collection(jsonl_path, collection_name, db=None, *, key_field=None, batch_size=1000):
+    """Stream a JSONL file into MongoDB as batched, unordered upserts.
+
+    Memory stays flat regardless of file size (only one batch is held at a time),
+    so generator.py output with millions of docs can be loaded directly.
+    Returns the number of documents written.
+    """
+    if db is None:
+        db = get_db()
+    coll = db[collection_name]
+
+    ops = []
+    count = 0
+    for doc in read_docs(Path(jsonl_path)):
+        if not isinstance(doc, dict):
+            continue
+        key = key_field if key_field and key_field in doc else "_id"
+        ops.append(ReplaceOne({key: doc[key]}, doc, upsert=True))
+        if len(ops) >= batch_size:
+            coll.bulk_write(ops, ordered=False)
+            count += len(ops)
+            ops = []
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+        count += len(ops)
+    return count
+
+def _source(data_dir, name):
+    """Prefer <name>.jsonl (generator output) over <name>.json in `data_dir`."""
+    for suffix in (".jsonl", ".json"):
+        path = data_dir / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return data_dir / f"{name}.json"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load seed (or generated) data into MongoDB.")
+    parser.add_argument("--data", type=Path, default=Path(__file__).parent,
+                        help="directory with ingredients/recipes/inventory(/orders) .json or .jsonl files")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for validation (default: BATCH_WORKERS or CPU count)")
+    args = parser.parse_args(argv)
+    base = args.data
+
+    # Refuse to load a catalog that fails validation.
+    report = batch.validate(read_docs(_source(base, "recipes")), read_docs(_source(base, "ingredients")), args.workers)
+    print(format_report(report))
+    if report["issues"]:
+        sys.exit(1)
+
     db = get_db()
-    base = Path(__file__).parent
 
     # Use consistent, idempotent upserts for list-based JSON files
     to_load = [
-        ("ingredients.json", "ingredients", "ingredient_id"),
-        ("recipes.json", "recipes", "_id"),
-        ("inventory.json", "inventory", "ingredient_id"),
+        ("ingredients", "ingredients", "ingredient_id"),
+        ("recipes", "recipes", "_id"),
+        ("inventory", "inventory", "ingredient_id"),
+        ("orders", "orders", "_id"),
     ]
 
-    for fname, coll, key_field in to_load:
-        path = base / fname
-        if path.exists():
+    for name, coll, key_field in to_load:
+        path = _source(base, name)
+        if not path.exists():
+            print(f"Skipping missing {path}")
+        elif path.suffix == ".jsonl":
+            n = load_jsonl_to_collection(path, coll, db, key_field=key_field)
+            print(f"Loaded {n} docs from {path} into {coll}")
+        else:
             load_json_to_collection(path, coll, db, key_field=key_field)
             print(f"Loaded {path} into {coll}")
-        else:
-            print(f"Skipping missing {path}")
+    bump_catalog_version(db)
+    # Bulk loads are not itemised in the change feed; tell syncing clients to reload.
+    record_changes("catalog", ["*"], op="reset", database=db)
 
 if __name__ == "__main__":
     main()
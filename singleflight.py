@@ -0,0 +1,110 @@
+"""Thread-safe single-flight cache with stale-while-revalidate.
+
+    @singleflight(ttl=300, stale=300)
+    def dashboard_data(): ...
+
+For each argument tuple:
+
+  - fresh (age < ttl): the cached value is returned.
+  - stale (ttl <= age < ttl + stale): the previous value is returned at once and
+    one background thread recomputes it; concurrent callers keep getting the
+    stale value instead of queueing behind (or duplicating) the refresh.
+  - missing or too old: exactly one caller computes while the others wait for
+    its result (or its exception).
+
+Unlike st.cache_data this works from any thread (warm-up, background refresh,
+CLIs) and never leaves sessions blocked at a TTL boundary. Values are shared
+between callers, not copied: treat them as read-only. clear() drops every
+entry; a computation already running when clear() is called still answers its
+waiters but is not stored.
+"""
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, fn: Callable, ttl: float, stale: float = 0.0) -> None:
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.ttl = ttl
+        self.stale = stale
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._generation = 0
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, at = entry
+                if now - at < self.ttl:
+                    self.stats["hits"] += 1
+                    return value
+                if now - at < self.ttl + self.stale:
+                    self.stats["stale_hits"] += 1
+                    if key not in self._flights:
+                        self._start(key, args, kwargs, background=True)
+                    return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                self.stats["misses"] += 1
+                flight = self._start(key, args, kwargs, background=False)
+        if leader:
+            self._run(key, flight, self._generation, args, kwargs)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _start(self, key: Hashable, args: tuple, kwargs: dict, background: bool) -> _Flight:
+        """Register a flight for `key` (caller holds the lock)."""
+        flight = self._flights[key] = _Flight()
+        if background:
+            self.stats["refreshes"] += 1
+            threading.Thread(
+                target=self._run, args=(key, flight, self._generation, args, kwargs),
+                name=f"refresh:{self.__name__}", daemon=True,
+            ).start()
+        return flight
+
+    def _run(self, key: Hashable, flight: _Flight, generation: int, args: tuple, kwargs: dict) -> None:
+        try:
+            flight.value = self.fn(*args, **kwargs)
+        except Exception as e:
+            flight.error = e
+        with self._lock:
+            if flight.error is not None:
+                self.stats["errors"] += 1
+            elif generation == self._generation:
+                self._entries[key] = (flight.value, time.monotonic())
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._flights.clear()
+
+
+def singleflight(ttl: float, stale: float = 0.0) -> Callable[[Callable], SingleFlight]:
+    """Decorator form of SingleFlight (see the module docstring)."""
+    return lambda fn: SingleFlight(fn, ttl, stale)
@@ -0,0 +1,244 @@
+"""Versioned on-disk catalog snapshots shared by every server process on a host.
+
+With CATALOG_SNAPSHOT=1, catalog.get_catalog() looks for a snapshot of the
+current (database, catalog version) before reading MongoDB, and writes one after
+compiling from the database. A snapshot is a directory:
+
+    <CATALOG_SNAPSHOT_DIR>/<db>-v<version>/
+        meta.json          ids, names, vocabularies, per-row ingredient ids
+        <column>.npy       numeric columns (composition CSR arrays, unit_ml,
+                           nutrition matrix), opened with np.load(mmap_mode="r")
+
+The .npy columns are memory-mapped read-only, so their pages live once in the
+OS page cache however many processes serve from them; only the id/name tuples
+are rebuilt per process. Directories are written under a temporary name and
+renamed into place, so readers never see a half-written snapshot and concurrent
+writers race harmlessly. CATALOG_SNAPSHOT_DIR defaults to ./snapshots.
+
+The catalog version itself is shared through <db>.version in the same
+directory: whichever process finds it older than CATALOG_SNAPSHOT_VERSION_TTL
+seconds (default 5) asks MongoDB and rewrites it, and every other process on the
+host reads the file instead, so the version check costs one query per host per
+interval rather than one per process. A catalog write publishes its new version
+there at once, and the file never moves backwards, so a process that read
+MongoDB just before that write cannot put the old version back.
+
+    python snapshot.py              # write the current version, keep the newest 2 per database
+    python snapshot.py --keep 5
+    python snapshot.py --list
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from catalog import MEASURES, NUTRIENTS, Catalog, Ingredient, Recipe
+from config import setting
+
+FORMAT = 1
+
+# Catalog attribute -> on-disk dtype. ing_nutrition is stored as one
+# (len(NUTRIENTS), n_ingredients) matrix.
+COLUMNS = {
+    "ing_unit_ml": np.float64,
+    "ing_nutrition": np.float64,
+    "comp_start": np.int64,
+    "comp_ingredient": np.int64,
+    "comp_measure": np.int8,
+    "comp_amount": np.float64,
+    "comp_units": np.float64,
+}
+
+
+def snapshot_dir() -> Path:
+    return Path(setting("CATALOG_SNAPSHOT_DIR", "snapshots"))
+
+
+def path_for(db_name: str, version: int) -> Path:
+    return snapshot_dir() / f"{db_name}-v{int(version)}"
+
+
+def _version_path(db_name: str) -> Path:
+    return snapshot_dir() / f"{db_name}.version"
+
+
+def current_version(db_name: str, fetch: Callable[[], int]) -> int:
+    """The catalog version for db_name from <db>.version, calling `fetch` (and publishing it) when stale."""
+    path = _version_path(db_name)
+    ttl = float(setting("CATALOG_SNAPSHOT_VERSION_TTL", 5))
+    try:
+        if time.time() - path.stat().st_mtime < ttl:
+            return int(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pass
+    return publish_version(db_name, int(fetch()))
+
+
+def publish_version(db_name: str, version: int) -> int:
+    """Share `version` through <db>.version unless it already holds a newer one; returns the newer."""
+    path = _version_path(db_name)
+    try:
+        shared = int(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        shared = None
+    if shared is not None and shared > version:
+        return shared  # `version` was read before a write another process already published
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(str(int(version)), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # unshared, but still correct for this process
+    return int(version)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def write(cat: Catalog, db_name: str) -> Path:
+    """Write `cat` as the snapshot for (db_name, cat.version); a no-op if it already exists."""
+    path = path_for(db_name, cat.version)
+    if path.exists():
+        return path
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        for name, dtype in COLUMNS.items():
+            np.save(tmp / f"{name}.npy", np.asarray(getattr(cat, name), dtype=dtype))
+        meta = {
+            "format": FORMAT,
+            "db": db_name,
+            "version": cat.version,
+            "nutrients": list(NUTRIENTS),
+            "measures": list(MEASURES),
+            "ingredients": [[i.id, i.name, i.unit] for i in cat.ingredients],
+            "recipes": [
+                [r.id, r.name, r.category, r.temperature, r.size_ml, r.recipe_ok, list(r.season)]
+                for r in cat.recipes
+            ],
+            "comp_ids": cat.comp_ids,
+        }
+        # meta.json last: a directory without it is never treated as a snapshot.
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not path.exists():
+            raise
+    return path
+
+
+def load(db_name: str, version: int) -> Optional[Catalog]:
+    """The snapshot for (db_name, version) as a Catalog, or None if there is no usable one."""
+    path = path_for(db_name, version)
+    try:
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (meta.get("format") != FORMAT or meta.get("nutrients") != list(NUTRIENTS)
+            or meta.get("measures") != list(MEASURES)):
+        return None
+    try:
+        cols = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in COLUMNS}
+    except (OSError, ValueError):
+        return None  # pruned or damaged since meta.json was read; compile instead
+
+    cat = Catalog(int(version))
+    nutrition = cols["ing_nutrition"]
+    cat.ing_unit_ml = cols["ing_unit_ml"]
+    cat.ing_nutrition = tuple(nutrition[n] for n in range(len(NUTRIENTS)))
+    cat.ingredients = tuple(
+        Ingredient(
+            idx=i,
+            id=_intern(iid),
+            name=name,
+            unit=_intern(unit),
+            unit_ml=float(cat.ing_unit_ml[i]),
+            nutrition=tuple(float(v) for v in nutrition[:, i]),
+        )
+        for i, (iid, name, unit) in enumerate(meta["ingredients"])
+    )
+    cat.ingredient_index = {ing.id: ing.idx for ing in cat.ingredients}
+    cat.recipes = tuple(
+        Recipe(
+            idx=i,
+            id=_intern(rid),
+            name=name,
+            category=_intern(category),
+            temperature=_intern(temperature),
+            size_ml=size_ml,
+            recipe_ok=recipe_ok,
+            season=tuple(_intern(s) for s in season),
+        )
+        for i, (rid, name, category, temperature, size_ml, recipe_ok, season) in enumerate(meta["recipes"])
+    )
+    cat.recipe_index = {r.id: r.idx for r in cat.recipes}
+    for name in ("comp_start", "comp_ingredient", "comp_measure", "comp_amount", "comp_units"):
+        setattr(cat, name, cols[name])
+    cat.comp_ids = [_intern(i) for i in meta["comp_ids"]]
+    return cat
+
+
+def listing() -> List[Dict[str, Any]]:
+    """[{"db", "version", "path", "bytes"}] for every complete snapshot, oldest version first."""
+    out: List[Dict[str, Any]] = []
+    root = snapshot_dir()
+    if not root.is_dir():
+        return out
+    for path in root.iterdir():
+        db_name, sep, version = path.name.rpartition("-v")
+        if not sep or not version.isdigit() or not (path / "meta.json").exists():
+            continue
+        size = sum(f.stat().st_size for f in path.iterdir())
+        out.append({"db": db_name, "version": int(version), "path": str(path), "bytes": size})
+    return sorted(out, key=lambda s: (s["db"], s["version"]))
+
+
+def prune(keep: int = 2) -> List[str]:
+    """Remove all but the newest `keep` snapshots per database; returns the removed paths.
+
+    Processes that still map an older snapshot keep reading it until they close
+    it (the files are unlinked, not truncated).
+    """
+    by_db: Dict[str, List[Dict[str, Any]]] = {}
+    for s in listing():
+        by_db.setdefault(s["db"], []).append(s)
+    removed: List[str] = []
+    for snaps in by_db.values():
+        for s in snaps[:max(0, len(snaps) - keep)]:
+            shutil.rmtree(s["path"], ignore_errors=True)
+            removed.append(s["path"])
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Write or list shared catalog snapshots.")
+    parser.add_argument("--keep", type=int, default=2, help="snapshots to keep per database")
+    parser.add_argument("--list", action="store_true", help="only list existing snapshots")
+    args = parser.parse_args(argv)
+
+    if not args.list:
+        import catalog
+        import db
+
+        cat = catalog.get_catalog()
+        path = write(cat, db.get_db().name)
+        print(f"wrote {path} ({len(cat.recipes)} recipes, {len(cat.ingredients)} ingredients)")
+        for p in prune(args.keep):
+            print(f"removed {p}")
+    for s in listing():
+        print(f"{s['db']:24} v{s['version']:<8} {s['bytes'] / 1024:>9.1f} KiB  {s['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""db.py on BACKEND=memory must answer exactly like it does on a real mongod.
+
+memstore only implements the operators db.py sends, so every query shape db.py
+gains should show up in scenario() below. Skipped unless MONGO_PARITY_URI points
+at a scratch server; database PARITY_DB there is dropped and re-seeded:
+
+    MONGO_PARITY_URI=mongodb://localhost:27017 python -m pytest tests
+"""
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import db  # noqa: E402
+import memstore  # noqa: E402
+from singleflight import SingleFlight  # noqa: E402
+from validate import read_docs  # noqa: E402
+
+PARITY_URI = os.environ.get("MONGO_PARITY_URI")
+PARITY_DB = "cafecrunch_parity"
+SEED_FILES = ("ingredients.json", "recipes.json", "inventory.json")
+
+pytestmark = pytest.mark.skipif(not PARITY_URI, reason="set MONGO_PARITY_URI to compare against mongod")
+
+
+def _norm(value: Any) -> Any:
+    """JSON-comparable form: floats rounded, ObjectIds and datetimes as strings."""
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {str(k): _norm(v) for k, v in value.items() if k != "ts"}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_norm(v) for v in value]
+        return sorted(items, key=json.dumps) if isinstance(value, (set, frozenset)) else items
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return str(value)
+
+
+def _unordered(rows: List[Any]) -> List[Any]:
+    """For results whose order only differs between servers on ties."""
+    return sorted((_norm(r) for r in rows), key=json.dumps)
+
+
+def scenario() -> List[Tuple[str, Any]]:
+    """The reads and writes the pages, API and CLIs make, in order."""
+    out: List[Tuple[str, Any]] = []
+    out.append(("count_recipes", db.count_recipes(only_ok=False)))
+    out.append(("count_ingredients", db.count_ingredients()))
+    out.append(("list_recipes", [r["_id"] for r in db.list_recipes(only_ok=False, limit=50)]))
+    page, after = db.page_recipes(category="core", only_ok=False, page_size=5)
+    out.append(("page_recipes", ([r["_id"] for r in page], after)))
+    out.append(("page_recipes.next", [r["_id"] for r in db.page_recipes(category="core", only_ok=False, page_size=5, after=after)[0]]))
+    out.append(("page_ingredients.prefix", db.page_ingredients(page_size=3, prefix="syrup_")))
+    for text in ("", "ice", "Lat", "latte", "zzz"):
+        out.append((f"search_recipes({text!r})", db.search_recipes(text, limit=10)))
+    first = db.list_recipes(only_ok=False, limit=1)[0]["_id"]
+    out.append(("get_recipe", db.get_recipe(first)))
+    out.append(("get_recipes", db.get_recipes([first, "missing"], projection={"name": 1})))
+    out.append(("ingredient_options", db.ingredient_options()))
+    out.append(("catalog_docs", db.catalog_docs()))
+    out.append(("catalog_stats", db.catalog_stats()))
+    out.append(("agg_counts_category_temp", db.agg_counts_category_temp()))
+    out.append(("agg_milk_popularity", _unordered(db.agg_milk_popularity())))
+    out.append(("agg_ingredient_usage_topn", _unordered(db.agg_ingredient_usage_topn(1000))))
+    out.append(("agg_calories_topn", _unordered(db.agg_calories_topn(1000))))
+
+    draft = {**db.get_recipe(first), "_id": "parity_draft", "name": "Parity Draft", "recipe_ok": False}
+    db.upsert_recipe(draft)
+    out.append(("update_recipe_defaults", db.update_recipe_defaults("parity_draft", {"ice_pct": 10})))
+    ing_id = db.list_ingredients(limit=1)[0]["_id"]
+    out.append(("bulk_update_ingredients", db.bulk_update_ingredients(
+        {ing_id: {"unit_ml": 5.0, "nutrition_per_unit.calories": None}},
+    )))
+    out.append(("ingredient_map", db.ingredient_map()[ing_id]))
+    out.append(("delete_recipe", db.delete_recipe("parity_draft")))
+    repo = db.inventory()
+    items = repo.get_many()
+    if items:
+        item_id = sorted(items)[0]
+        out.append(("inventory.adjust", repo.adjust(item_id, 3, {"type": "receive", "qty": 3})))
+        out.append(("inventory.get", repo.get(item_id)))
+    out.append(("inventory.get_many", repo.get_many()))
+    out.append(("changes_since", db.changes_since(0)))
+    out.append(("catalog_version", db.catalog_version()))
+    return [(label, _norm(result)) for label, result in out]
+
+
+def _reset_caches() -> None:
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    for value in vars(db).values():
+        if isinstance(value, SingleFlight):
+            value.clear()
+    db._indexed.clear()
+
+
+def _run_on(monkeypatch: pytest.MonkeyPatch, backend: str) -> List[Tuple[str, Any]]:
+    for name in ("MONGODB_URI", "MONGODB_DB", "MEMORY_SEED_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("DB_NAME", PARITY_DB)
+    monkeypatch.setenv("BACKEND", backend)
+    if backend == "mongo":
+        from pymongo import MongoClient
+
+        monkeypatch.setenv("MONGO_URI", PARITY_URI)
+        client = MongoClient(PARITY_URI)
+        client.drop_database(PARITY_DB)
+        for name in SEED_FILES:
+            client[PARITY_DB][Path(name).stem].insert_many(list(read_docs(memstore.SEED_DIR / name)))
+    else:
+        memstore._SHARED.clear()
+    _reset_caches()
+    return scenario()
+
+
+def test_memory_backend_matches_mongod(monkeypatch):
+    memory = _run_on(monkeypatch, "memory")
+    mongo = _run_on(monkeypatch, "mongo")
+    assert [label for label, _ in memory] == [label for label, _ in mongo]
+    for (label, got), (_, want) in zip(memory, mongo):
+        assert got == want, label
@@ -0,0 +1,182 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+from db import search_recipes
+
+PAGE_SIZES = (25, 50, 100, 200)
+
+# ----------------------------
+# Theme (shared look & feel)
+# ----------------------------
+COLORS = {
+    "espresso": "#1B0E07",
+    "dark_roast": "#3C2415",
+    "mocha": "#5D4037",
+    "caramel": "#C4873A",
+    "latte": "#D4A574",
+    "cream": "#F5E6D3",
+    "paper": "#FBF6EE",
+    "border": "#D7B98A",
+    "sage": "#81C784",
+    "berry": "#E57373",
+    "gold": "#FFB300",
+    "white": "#FFFFFF",
+}
+
+THEME_CSS = f"""
+@import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@600;700&family=Nunito:wght@400;600;700&display=swap');
+
+html, body, [class*="css"] {{
+  font-family: 'Nunito', sans-serif;
+}}
+
+.stApp {{
+  background: radial-gradient(1200px 800px at 15% 10%, {COLORS['paper']} 0%, {COLORS['cream']} 60%, #F3E0C9 100%);
+}}
+
+.cc-title {{
+  font-family: 'Playfair Display', serif;
+  color: {COLORS['espresso']};
+  letter-spacing: 0.2px;
+  margin: 0;
+}}
+
+.cc-subtitle {{
+  color: {COLORS['mocha']};
+  margin-top: 0.35rem;
+}}
+
+.cc-divider {{
+  height: 2px;
+  background: linear-gradient(90deg, transparent 0%, {COLORS['border']} 20%, {COLORS['border']} 80%, transparent 100%);
+  margin: 0.75rem 0 1.25rem 0;
+}}
+
+.cc-card {{
+  background: rgba(255,255,255,0.55);
+  border: 1px solid rgba(215,185,138,0.65);
+  border-radius: 16px;
+  padding: 16px 18px;
+  box-shadow: 0 8px 24px rgba(27,14,7,0.06);
+}}
+
+.cc-h3 {{
+  font-family: 'Playfair Display', serif;
+  color: {COLORS['espresso']};
+  margin: 0 0 0.25rem 0;
+}}
+
+[data-testid="stMetric"] {{
+  background: rgba(255,255,255,0.40);
+  border: 1px solid rgba(215,185,138,0.55);
+  border-radius: 14px;
+  padding: 14px 14px;
+}}
+
+div[data-testid="stDataFrame"] {{
+  background: rgba(255,255,255,0.40);
+  border: 1px solid rgba(215,185,138,0.55);
+  border-radius: 14px;
+  padding: 10px;
+}}
+"""
+
+
+def apply_theme(extra_css: str = "") -> None:
+    """Emit the shared theme (plus page-specific rules) as a single <style> block."""
+    st.markdown(f"<style>{THEME_CSS}{extra_css}</style>", unsafe_allow_html=True)
+
+
+def rerun_fragment() -> None:
+    """Rerun just the calling @st.fragment, or the whole page if it ran as part of one.
+
+    Streamlit only allows a fragment-scoped rerun while the fragment is rerunning
+    on its own; during a full-page run (first load, AppTest) it raises instead.
+    """
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+def _reset_pager(state: Dict[str, Any]) -> None:
+    state["stack"] = [None]
+    state["next"] = None
+
+
+def _next_page(key: str) -> None:
+    state = st.session_state[key]
+    if state.get("next") is not None:
+        state["stack"].append(state["next"])
+
+
+def _prev_page(key: str) -> None:
+    state = st.session_state[key]
+    if len(state["stack"]) > 1:
+        state["stack"].pop()
+
+
+def keyset_pager(
+    key: str,
+    fetch: Callable[[Any, int], Tuple[List[Dict[str, Any]], Any]],
+    filters: Tuple = (),
+    total: Optional[int] = None,
+    sizes: Sequence[int] = PAGE_SIZES,
+) -> List[Dict[str, Any]]:
+    """Render page-size / prev / next controls and return the rows of the current page.
+
+    `fetch(after, page_size)` must return `(rows, next_cursor)`, rows being a list of
+    dicts or a DataFrame; cursors for the pages
+    already visited are kept in session state so "Prev" does not need an offset query.
+    Changing `filters` (or the page size) jumps back to the first page.
+    """
+    state = st.session_state.setdefault(key, {"filters": filters, "stack": [None], "next": None})
+    if state["filters"] != filters:
+        state["filters"] = filters
+        _reset_pager(state)
+
+    c_size, c_info, c_prev, c_next = st.columns([1.2, 2, 1, 1])
+    with c_size:
+        page_size = st.selectbox(
+            "Rows per page",
+            options=list(sizes),
+            index=min(1, len(sizes) - 1),
+            key=f"{key}_size",
+            on_change=_reset_pager,
+            args=(state,),
+        )
+
+    rows, state["next"] = fetch(state["stack"][-1], int(page_size))
+
+    page_no = len(state["stack"])
+    start = (page_no - 1) * int(page_size)
+    shown = f"{start + 1}–{start + len(rows)}" if len(rows) else "0"
+    of_total = f" of {total}" if total is not None else ""
+    c_info.markdown(f"<div style='padding-top: 2rem;'>Page {page_no} · rows {shown}{of_total}</div>", unsafe_allow_html=True)
+    c_prev.button("◀ Prev", key=f"{key}_prev", on_click=_prev_page, args=(key,),
+                  disabled=page_no <= 1, use_container_width=True)
+    c_next.button("Next ▶", key=f"{key}_next", on_click=_next_page, args=(key,),
+                  disabled=state["next"] is None, use_container_width=True)
+    return rows
+
+
+def recipe_picker(key: str, label: str = "Select a recipe", limit: int = 25) -> Optional[str]:
+    """Search box + selectbox over the top `limit` matching recipes; returns the chosen _id."""
+    query = st.text_input(
+        "Search recipes",
+        key=f"{key}_query",
+        placeholder="Type a name or _id, e.g. latte",
+        help=f"Shows the first {limit} recipes whose name or _id starts with the text.",
+    )
+    matches = search_recipes(query, limit=limit)
+    id_by_label = {}
+    for m in matches:
+        rid = str(m["_id"])
+        name = m.get("name")
+        id_by_label[f"{rid} — {name}" if name else rid] = rid
+    sel = st.selectbox(label, options=[""] + list(id_by_label), key=f"{key}_label")
+    if query.strip() and not matches:
+        st.caption("No recipes match that search.")
+    return id_by_label.get(sel)
@@ -0,0 +1,178 @@
+"""Recipe catalog validation.
+
+Checks every recipe against the ingredient catalog in a single pass:
+
+  - unknown_ingredient: composition / defaults / options reference a missing ingredient
+  - default_not_in_composition: defaults.syrup_id / defaults.sauce_id has no composition row
+  - ml_exceeds_size: the amount_ml rows add up to more than size_ml
+  - ice_mismatch: defaults.ice_pct disagrees with the ice row (amount_ml / size_ml)
+  - bad_number: size_ml, a composition amount_ml or defaults.ice_pct is not a number
+
+Usage:
+    python validate.py                        # recipes.json vs ingredients.json
+    python validate.py --recipes new.jsonl    # JSON array or JSONL files
+    python validate.py --db                   # the live catalog (uses Streamlit secrets / env)
+"""
+import argparse
+import json
+import math
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# Allowed |ice_pct - ice_ml / size_ml| before the two are considered to disagree.
+ICE_TOLERANCE = 0.02
+
+DEFAULT_IDS = ("milk_id", "syrup_id", "sauce_id")
+OPTION_KEYS = ("milks", "syrups", "sauces")
+
+
+@dataclass(frozen=True)
+class Issue:
+    recipe_id: Optional[str]
+    rule: str
+    message: str
+    row: Optional[int] = None
+
+
+def compile_lookup(ingredients: Iterable[Dict[str, Any]]) -> frozenset:
+    """Precompile the ingredient catalog into an id set (built once per validation run)."""
+    return frozenset(str(d["_id"]) for d in ingredients if isinstance(d, dict) and d.get("_id"))
+
+
+def _dict(val: Any) -> Dict[str, Any]:
+    return val if isinstance(val, dict) else {}
+
+
+def _number(val: Any) -> Optional[float]:
+    """`val` as a finite float (None / "" count as 0), or None if it is not a number."""
+    if val is None or val == "":
+        return 0.0
+    if isinstance(val, bool):
+        return None
+    try:
+        num = float(val)
+    except (TypeError, ValueError):
+        return None
+    return num if math.isfinite(num) else None
+
+
+def validate_recipe(doc: Dict[str, Any], known: frozenset, row: Optional[int] = None) -> List[Issue]:
+    """Return every rule violation for one recipe doc (empty list = valid)."""
+    if not isinstance(doc, dict) or not doc.get("_id"):
+        return [Issue(None, "missing_id", "recipe has no _id", row)]
+    rid = str(doc["_id"])
+    issues: List[Issue] = []
+
+    comp = [x for x in doc.get("composition") or [] if isinstance(x, dict)]
+    comp_ids = {x.get("ingredient_id") for x in comp}
+    defaults = _dict(doc.get("defaults"))
+    options = _dict(doc.get("options"))
+
+    refs = set(comp_ids)
+    refs.update(defaults.get(k) for k in DEFAULT_IDS)
+    for k in OPTION_KEYS:
+        refs.update(options.get(k) or [])
+    for ref in sorted(str(r) for r in refs if r and r not in known):
+        issues.append(Issue(rid, "unknown_ingredient", f"unknown ingredient: {ref}", row))
+
+    for k in ("syrup_id", "sauce_id"):
+        sid = defaults.get(k)
+        if sid and sid not in comp_ids:
+            issues.append(Issue(rid, "default_not_in_composition", f"defaults.{k} {sid} is not in composition", row))
+
+    size_ml = doc.get("size_ml")
+    if size_ml is not None and _number(size_ml) is None:
+        issues.append(Issue(rid, "bad_number", f"size_ml {size_ml!r} is not a number", row))
+    total_ml = ice_ml = 0.0
+    for n, x in enumerate(comp):
+        amount = _number(x.get("amount_ml"))
+        if amount is None:
+            issues.append(Issue(
+                rid, "bad_number", f"composition[{n}].amount_ml {x.get('amount_ml')!r} is not a number", row,
+            ))
+            continue
+        total_ml += amount
+        if x.get("ingredient_id") == "ice":
+            ice_ml += amount
+    if isinstance(size_ml, (int, float)) and size_ml > 0 and total_ml > size_ml:
+        issues.append(Issue(rid, "ml_exceeds_size", f"ml total {total_ml:g} exceeds size_ml {size_ml}", row))
+
+    ice_pct = defaults.get("ice_pct")
+    if ice_pct is not None:
+        raw, ice_pct = ice_pct, _number(ice_pct)
+        if ice_pct is None:
+            issues.append(Issue(rid, "bad_number", f"defaults.ice_pct {raw!r} is not a number", row))
+    if isinstance(size_ml, (int, float)) and size_ml > 0:
+        if ice_pct is not None and ice_ml and abs(float(ice_pct) - ice_ml / size_ml) > ICE_TOLERANCE:
+            issues.append(Issue(
+                rid, "ice_mismatch",
+                f"ice_pct {float(ice_pct):g} but ice row is {ice_ml:g} ml ({ice_ml / size_ml:.2f} of size)", row,
+            ))
+        elif ice_pct and not ice_ml:
+            issues.append(Issue(rid, "ice_mismatch", f"ice_pct {float(ice_pct):g} but no ice row", row))
+        elif ice_ml and ice_pct is None:
+            issues.append(Issue(rid, "ice_mismatch", f"ice row of {ice_ml:g} ml but no defaults.ice_pct", row))
+
+    return issues
+
+
+def validate_catalog(recipes: Iterable[Dict[str, Any]], ingredients: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate every recipe in one pass; returns {"checked", "invalid", "issues"}."""
+    known = compile_lookup(ingredients)
+    issues: List[Issue] = []
+    checked = 0
+    for i, doc in enumerate(recipes):
+        checked += 1
+        issues.extend(validate_recipe(doc, known, row=i))
+    invalid = len({(x.row, x.recipe_id) for x in issues})
+    return {"checked": checked, "invalid": invalid, "issues": issues}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{report['checked']} recipes checked, {report['invalid']} invalid, {len(report['issues'])} issues"]
+    for x in report["issues"]:
+        lines.append(f"  [{x.rule}] {x.recipe_id or f'row {x.row}'}: {x.message}")
+    return "\n".join(lines)
+
+
+def read_docs(path: Path) -> Iterable[Dict[str, Any]]:
+    """Yield docs from a JSON array file or stream them from a JSONL file."""
+    if path.suffix in (".jsonl", ".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from (data if isinstance(data, list) else [data])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    base = Path(__file__).parent
+    parser = argparse.ArgumentParser(description="Validate the recipe catalog.")
+    parser.add_argument("--recipes", type=Path, default=base / "recipes.json")
+    parser.add_argument("--ingredients", type=Path, default=base / "ingredients.json")
+    parser.add_argument("--db", action="store_true", help="validate the live MongoDB catalog instead of files")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        from db import colls
+
+        ing, rec = colls()
+        report = validate_catalog(rec.find({}).batch_size(1000), ing.find({}, {"_id": 1}))
+    else:
+        report = validate_catalog(read_docs(args.recipes), read_docs(args.ingredients))
+
+    if args.json:
+        print(json.dumps({**report, "issues": [asdict(x) for x in report["issues"]]}, indent=2))
+    else:
+        print(format_report(report))
+    return 1 if report["issues"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Background warm-up for a fresh server process.
+
+Every page calls start() at the top. The first call in a process starts one
+daemon thread that, in order:
+
+  - connects (ping), which creates the pool and pays server selection
+  - runs the index checks (db.colls, db.inventory)
+  - compiles the shared catalog (catalog.get_catalog) and the Menu's columns
+  - fills the search, ingredient, home-page stats and dashboard caches
+
+Later calls return immediately, so only the very first session waits on a cold
+server. If a step fails, the next start() after a backoff (RETRY_MIN seconds,
+doubling up to RETRY_MAX) runs the warm-up again. The thread runs without any
+session's script-run context: st.cache_data / st.cache_resource entries are
+process-wide either way, and borrowing a context would tie the thread to the
+session that happened to start it. status() / ready() report progress; the home
+page shows them. Disable with WARMUP=0.
+
+    python warmup.py      # run the steps in the foreground and print their timings
+"""
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import catalog
+import db
+from config import flag
+
+STEPS: List[Tuple[str, Callable[[], Any]]] = [
+    ("connect", lambda: db.get_db().command("ping")),
+    ("indexes", lambda: (db.colls(), db.inventory())),
+    ("catalog", lambda: catalog.get_catalog().menu_frame()),
+    ("recipe search index", db.recipe_prefix_index),
+    ("ingredient ids", db.ingredient_ids),
+    ("ingredient options", db.ingredient_options),
+    ("home stats", db.catalog_stats),
+    ("dashboard data", lambda: (
+        db.dashboard_data(), db.agg_counts_category_temp(), db.agg_milk_popularity(), db.agg_ingredient_usage_topn(10),
+    )),
+]
+
+# Seconds before a failed warm-up is retried; doubles after each failure.
+RETRY_MIN = 5.0
+RETRY_MAX = 300.0
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_retry_at = 0.0
+_backoff = RETRY_MIN
+_status: Dict[str, Any] = {"state": "idle", "steps": [], "ms": None, "error": None}
+
+
+def run() -> Dict[str, Any]:
+    """Run every step in the calling thread, stopping at the first failure."""
+    t0 = time.perf_counter()
+    with _lock:
+        _status.update(state="running", steps=[], ms=None, error=None)
+    for name, step in STEPS:
+        s0 = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            with _lock:
+                _status["steps"].append({"name": name, "ms": (time.perf_counter() - s0) * 1000, "error": str(e)})
+                _status.update(state="failed", error=f"{name}: {e}", ms=(time.perf_counter() - t0) * 1000)
+            return status()
+        with _lock:
+            _status["steps"].append({"name": name, "ms": (time.perf_counter() - s0) * 1000, "error": None})
+    with _lock:
+        _status.update(state="ready", ms=(time.perf_counter() - t0) * 1000)
+    return status()
+
+
+class _NoContextWarning(logging.Filter):
+    """Drops Streamlit's "missing ScriptRunContext" warnings for the warm-up thread only."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.threadName != "warmup"
+
+
+logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").addFilter(_NoContextWarning())
+
+
+def _warm() -> None:
+    global _thread, _retry_at, _backoff
+    result = run()
+    with _lock:
+        if result["state"] == "failed":
+            _retry_at = time.monotonic() + _backoff
+            _backoff = min(_backoff * 2, RETRY_MAX)
+            _thread = None
+        else:
+            _backoff = RETRY_MIN
+
+
+def start() -> None:
+    """Start the warm-up thread once per process (no-op afterwards or with WARMUP=0).
+
+    After a failed warm-up it starts again, once the retry backoff has passed.
+    """
+    global _thread
+    if _thread is not None or not flag("WARMUP", True):
+        return
+    with _lock:
+        if _thread is not None or time.monotonic() < _retry_at:
+            return
+        _thread = threading.Thread(target=_warm, name="warmup", daemon=True)
+        _status["state"] = "running"
+    _thread.start()
+
+
+def status() -> Dict[str, Any]:
+    """{"state": idle|running|ready|failed, "steps": [{name, ms, error}], "ms", "error"}."""
+    with _lock:
+        return {**_status, "steps": [dict(s) for s in _status["steps"]], "total": len(STEPS)}
+
+
+def ready() -> bool:
+    return status()["state"] == "ready"
+
+
+if __name__ == "__main__":
+    result = run()
+    for s in result["steps"]:
+        print(f"{s['name']:24} {s['ms']:>9.1f} ms" + (f"  error: {s['error']}" if s["error"] else ""))
+    print(f"{result['state']} in {result['ms']:.1f} ms")
+    sys.exit(0 if result["state"] == "ready" else 1)